@@ -0,0 +1,29 @@
+"""Add change_version to projects for conditional GETs
+
+Revision ID: 4c2e8d1a9b37
+Revises: 8be2436779fe
+Create Date: 2026-10-18 09:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c2e8d1a9b37'
+down_revision: Union[str, Sequence[str], None] = '8be2436779fe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('projects', sa.Column('change_version', sa.Integer(), nullable=True))
+    op.execute("UPDATE projects SET change_version = 0 WHERE change_version IS NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('projects', 'change_version')
@@ -0,0 +1,36 @@
+"""Add indexes backing the project list filters
+
+Revision ID: 9d3f5b2c6e81
+Revises: 4c2e8d1a9b37
+Create Date: 2026-10-18 11:02:17.284906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f5b2c6e81'
+down_revision: Union[str, Sequence[str], None] = '4c2e8d1a9b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_projects_risk', 'projects', ['risk'])
+    op.create_index('ix_projects_location', 'projects', ['location'])
+    op.create_index('ix_projects_transaction_type', 'projects', ['transaction_type'])
+    op.create_index('ix_projects_client_id', 'projects', ['client_id'])
+    op.create_index('ix_projects_target_close_date', 'projects', ['target_close_date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_projects_target_close_date', 'projects')
+    op.drop_index('ix_projects_client_id', 'projects')
+    op.drop_index('ix_projects_transaction_type', 'projects')
+    op.drop_index('ix_projects_location', 'projects')
+    op.drop_index('ix_projects_risk', 'projects')
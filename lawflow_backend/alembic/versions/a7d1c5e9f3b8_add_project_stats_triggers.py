@@ -0,0 +1,32 @@
+"""Maintain project_stats with triggers
+
+Revision ID: a7d1c5e9f3b8
+Revises: f6a2c8e4b0d9
+Create Date: 2026-10-19 16:40:27.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.stats import create_stats_triggers, drop_stats_triggers
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d1c5e9f3b8'
+down_revision: Union[str, Sequence[str], None] = 'f6a2c8e4b0d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rollup rows are already current; from here on the triggers rewrite them
+    create_stats_triggers(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Older code refreshes the rollup itself after each write
+    drop_stats_triggers(op.get_bind())
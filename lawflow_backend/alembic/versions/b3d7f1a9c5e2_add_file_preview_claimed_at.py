@@ -0,0 +1,29 @@
+"""Add preview claim time to files
+
+Revision ID: b3d7f1a9c5e2
+Revises: e4b8a2c6d0f3
+Create Date: 2026-10-18 23:10:42.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d7f1a9c5e2'
+down_revision: Union[str, Sequence[str], None] = 'e4b8a2c6d0f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL for claims made before this column existed; those count as abandoned
+    op.add_column('files', sa.Column('preview_claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('files', 'preview_claimed_at')
@@ -0,0 +1,29 @@
+"""Add text extraction claim time to files
+
+Revision ID: c5e9a3b7d1f4
+Revises: b3d7f1a9c5e2
+Create Date: 2026-10-18 23:41:17.502936
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e9a3b7d1f4'
+down_revision: Union[str, Sequence[str], None] = 'b3d7f1a9c5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL for claims made before this column existed; those count as abandoned
+    op.add_column('files', sa.Column('extract_claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('files', 'extract_claimed_at')
@@ -0,0 +1,37 @@
+"""Add preview job status to files
+
+Revision ID: c8d4b6a2e9f1
+Revises: a5c1e9d7f3b2
+Create Date: 2026-10-18 16:48:09.552170
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d4b6a2e9f1'
+down_revision: Union[str, Sequence[str], None] = 'a5c1e9d7f3b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # preview_path / thumbnail_path already exist (b99ab0f91d48). Existing rows keep a NULL
+    # status, i.e. they are not queued; new uploads start as pending or skipped.
+    op.add_column('files', sa.Column('preview_status', sa.String(length=20), nullable=True))
+    op.add_column('files', sa.Column('preview_attempts', sa.Integer(), nullable=True))
+    op.add_column('files', sa.Column('preview_error', sa.Text(), nullable=True))
+    op.execute("UPDATE files SET preview_attempts = 0 WHERE preview_attempts IS NULL")
+    op.create_index(op.f('ix_files_preview_status'), 'files', ['preview_status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_files_preview_status'), table_name='files')
+    op.drop_column('files', 'preview_error')
+    op.drop_column('files', 'preview_attempts')
+    op.drop_column('files', 'preview_status')
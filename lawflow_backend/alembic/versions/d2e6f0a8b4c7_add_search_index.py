@@ -0,0 +1,35 @@
+"""Add full-text search index
+
+Revision ID: d2e6f0a8b4c7
+Revises: c8d4b6a2e9f1
+Create Date: 2026-10-18 19:12:40.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.search_index import SOURCE_BY_KIND, create_search_index, drop_search_index
+
+# The sources that existed at this revision; later ones are added by their own migration
+SOURCES = [SOURCE_BY_KIND[kind] for kind in ('task', 'checklist', 'timeline', 'file', 'activity')]
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e6f0a8b4c7'
+down_revision: Union[str, Sequence[str], None] = 'c8d4b6a2e9f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite: FTS5 table + sync triggers, filled from existing rows.
+    # Postgres: expression GIN indexes on the searchable tables.
+    create_search_index(op.get_bind(), SOURCES)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_search_index(op.get_bind(), SOURCES)
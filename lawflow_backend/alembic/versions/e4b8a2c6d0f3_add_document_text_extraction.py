@@ -0,0 +1,56 @@
+"""Add extracted document text for search
+
+Revision ID: e4b8a2c6d0f3
+Revises: d2e6f0a8b4c7
+Create Date: 2026-10-18 21:05:31.640218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.search_index import SOURCE_BY_KIND, create_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8a2c6d0f3'
+down_revision: Union[str, Sequence[str], None] = 'd2e6f0a8b4c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows keep a NULL extract_status; the extraction worker queues them on startup.
+    op.add_column('files', sa.Column('extract_status', sa.String(length=20), nullable=True))
+    op.create_index(op.f('ix_files_extract_status'), 'files', ['extract_status'], unique=False)
+    op.create_table('document_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('file_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['file_id'], ['files.id'], ),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_document_chunks_file_id'), 'document_chunks', ['file_id'], unique=False)
+    op.create_index(op.f('ix_document_chunks_project_id'), 'document_chunks', ['project_id'], unique=False)
+    # document_chunks triggers (SQLite) or GIN index (Postgres)
+    create_search_index(op.get_bind(), [SOURCE_BY_KIND['document']])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_document_chunks_search")
+    else:
+        for suffix in ('ai', 'au', 'ad'):
+            op.execute(f"DROP TRIGGER IF EXISTS document_chunks_search_{suffix}")
+        op.execute("DELETE FROM search_index WHERE kind = 'document'")
+    op.drop_index(op.f('ix_document_chunks_project_id'), table_name='document_chunks')
+    op.drop_index(op.f('ix_document_chunks_file_id'), table_name='document_chunks')
+    op.drop_table('document_chunks')
+    op.drop_index(op.f('ix_files_extract_status'), table_name='files')
+    op.drop_column('files', 'extract_status')
@@ -0,0 +1,45 @@
+"""Add project_stats rollup table for dashboard counters
+
+Revision ID: e71a0c4d8f52
+Revises: 9d3f5b2c6e81
+Create Date: 2026-10-18 12:40:55.917364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e71a0c4d8f52'
+down_revision: Union[str, Sequence[str], None] = '9d3f5b2c6e81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows are filled in by the application on startup (backfill_project_stats).
+    op.create_table('project_stats',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=30), nullable=False),
+    sa.Column('risk', sa.String(length=20), nullable=False),
+    sa.Column('target_close_date', sa.Date(), nullable=True),
+    sa.Column('open_tasks', sa.Integer(), nullable=False),
+    sa.Column('done_tasks', sa.Integer(), nullable=False),
+    sa.Column('overdue_tasks', sa.Integer(), nullable=False),
+    sa.Column('next_due_date', sa.Date(), nullable=True),
+    sa.Column('checklist_total', sa.Integer(), nullable=False),
+    sa.Column('checklist_done', sa.Integer(), nullable=False),
+    sa.Column('checklist_by_stage', sa.JSON(), nullable=False),
+    sa.Column('computed_on', sa.Date(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('project_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('project_stats')
@@ -0,0 +1,31 @@
+"""Add content hash to files
+
+Revision ID: f3a9c7e2b1d4
+Revises: e71a0c4d8f52
+Create Date: 2026-10-18 14:05:12.381907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c7e2b1d4'
+down_revision: Union[str, Sequence[str], None] = 'e71a0c4d8f52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # file_size already exists (b99ab0f91d48); both are filled in by the upload path.
+    op.add_column('files', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_files_sha256'), 'files', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_files_sha256'), table_name='files')
+    op.drop_column('files', 'sha256')
@@ -0,0 +1,29 @@
+"""Add finalize claim time to upload sessions
+
+Revision ID: f6a2c8e4b0d9
+Revises: c5e9a3b7d1f4
+Create Date: 2026-10-19 10:12:44.381920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a2c8e4b0d9'
+down_revision: Union[str, Sequence[str], None] = 'c5e9a3b7d1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL for sessions claimed before this column existed; those count as abandoned
+    op.add_column('upload_sessions', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_sessions', 'claimed_at')
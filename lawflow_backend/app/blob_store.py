@@ -0,0 +1,205 @@
+"""
+Content-addressed store for uploaded file bodies.
+
+Each distinct body is kept once, at ``BLOB_STORE_DIR/ab/cd/<sha256>``. A blob
+is referenced by every FileItem whose sha256 matches, so the reference
+count is simply a count over the files table; blobs nobody references are
+removed by ``gc``. Existing flat uploads are converted with::
+
+    python -m app.blob_store migrate
+    python -m app.blob_store gc [--dry-run]
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator, Optional
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from .models import FileItem
+
+BLOB_STORE_DIR = Path(os.getenv("BLOB_STORE_DIR", "./uploads/blobs"))
+# Unreferenced blobs and temp files younger than this are left alone by gc: an
+# upload writes its blob before the FileItem row referencing it is committed.
+BLOB_GC_GRACE_SECONDS = int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+TMP_DIR_NAME = "tmp"
+SESSIONS_DIR_NAME = "sessions"  # resumable uploads; cleaned up by session expiry, not gc
+
+def blob_path(sha256: str) -> Path:
+    """Location of a blob, sharded on the first two bytes of its hash."""
+    return BLOB_STORE_DIR / sha256[:2] / sha256[2:4] / sha256
+
+def new_temp_path() -> Path:
+    """
+    A fresh temporary path inside the store.
+
+    Temp files live on the same filesystem as the blobs so that commit()
+    is a rename, never a copy.
+    """
+    tmp_dir = BLOB_STORE_DIR / TMP_DIR_NAME
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    return tmp_dir / f"{uuid.uuid4().hex}.part"
+
+def session_path(session_id: str) -> Path:
+    """Assembly file of a resumable upload session, on the same filesystem as the blobs."""
+    sessions_dir = BLOB_STORE_DIR / SESSIONS_DIR_NAME
+    sessions_dir.mkdir(parents=True, exist_ok=True)
+    return sessions_dir / f"{session_id}.part"
+
+def commit(tmp: Path, sha256: str) -> Path:
+    """
+    Move a fully written temp file to its content address.
+
+    If the blob already exists the temp file is discarded instead, which is
+    what deduplicates identical uploads.
+
+    Args:
+        tmp: Temp file from new_temp_path, already closed
+        sha256: Hex SHA-256 of its contents
+
+    Returns:
+        Path of the blob
+    """
+    dest = blob_path(sha256)
+    if dest.exists():
+        tmp.unlink(missing_ok=True)
+        os.utime(dest)  # restart the gc grace period for the new reference
+        return dest
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp, dest)
+    return dest
+
+def refcount(db: Session, sha256: str) -> int:
+    """Number of file rows (including soft-deleted ones) referencing a blob."""
+    return db.execute(select(func.count(FileItem.id)).where(FileItem.sha256 == sha256)).scalar_one()
+
+def iter_blobs() -> Iterator[Path]:
+    """All blobs currently on disk."""
+    for shard in BLOB_STORE_DIR.glob("[0-9a-f][0-9a-f]/[0-9a-f][0-9a-f]"):
+        yield from (p for p in shard.iterdir() if p.is_file())
+
+def gc(db: Session, dry_run: bool = False, now: Optional[float] = None) -> dict:
+    """
+    Delete blobs no FileItem references, and abandoned temp files.
+
+    Soft-deleted rows still count as references, so their content can be
+    restored. Anything modified within BLOB_GC_GRACE_SECONDS is kept.
+
+    Args:
+        db: Database session
+        dry_run: Only report what would be deleted
+        now: Reference time (defaults to the current time)
+
+    Returns:
+        Counts and bytes of removed blobs and temp files
+    """
+    now = now or time.time()
+    cutoff = now - BLOB_GC_GRACE_SECONDS
+    referenced = set(db.execute(select(FileItem.sha256).where(FileItem.sha256.isnot(None)).distinct()).scalars())
+
+    result = {"blobs": 0, "blob_bytes": 0, "temp_files": 0, "kept": 0}
+    for path in iter_blobs():
+        st = path.stat()
+        if path.name in referenced or st.st_mtime > cutoff:
+            result["kept"] += 1
+            continue
+        result["blobs"] += 1
+        result["blob_bytes"] += st.st_size
+        if not dry_run:
+            path.unlink(missing_ok=True)
+
+    tmp_dir = BLOB_STORE_DIR / TMP_DIR_NAME
+    if tmp_dir.is_dir():
+        for path in tmp_dir.iterdir():
+            if path.stat().st_mtime <= cutoff:
+                result["temp_files"] += 1
+                if not dry_run:
+                    path.unlink(missing_ok=True)
+    return result
+
+def hash_file(path: Path) -> tuple[str, int]:
+    """SHA-256 and size of a file, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def migrate(db: Session) -> dict:
+    """
+    Convert files stored outside the blob store in place.
+
+    Each file is hashed and moved to its content address (or dropped if an
+    identical blob already exists), and every row pointing at it is updated.
+    Rows are committed one source file at a time and the source is removed
+    only afterwards, so an interrupted run can simply be restarted. Rows
+    whose file is missing (seed metadata) are skipped.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Counts of migrated rows, moved files, deduplicated files and missing files
+    """
+    store_root = BLOB_STORE_DIR.resolve()
+    result = {"rows": 0, "moved": 0, "deduplicated": 0, "missing": 0}
+    paths = db.execute(select(FileItem.stored_path).distinct()).scalars().all()
+    for stored_path in paths:
+        src = Path(stored_path)
+        if src.resolve().is_relative_to(store_root):
+            continue
+        if not src.is_file():
+            result["missing"] += 1
+            continue
+
+        sha256, size = hash_file(src)
+        if blob_path(sha256).exists():
+            result["deduplicated"] += 1
+        else:
+            # Link (or copy) rather than move: the source is only removed once the rows
+            # pointing at it are committed, so an interrupted run loses nothing.
+            tmp = new_temp_path()
+            try:
+                os.link(src, tmp)
+            except OSError:
+                shutil.copyfile(src, tmp)
+            commit(tmp, sha256)
+            result["moved"] += 1
+
+        rows = db.execute(select(FileItem).where(FileItem.stored_path == stored_path)).scalars().all()
+        for item in rows:
+            item.stored_path = str(blob_path(sha256))
+            item.sha256 = sha256
+            item.file_size = size
+        db.commit()
+        src.unlink()
+        result["rows"] += len(rows)
+    return result
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.blob_store", description="Maintain the upload blob store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="move existing uploads into the blob store")
+    gc_parser = sub.add_parser("gc", help="delete unreferenced blobs")
+    gc_parser.add_argument("--dry-run", action="store_true", help="report without deleting")
+    args = parser.parse_args(argv)
+
+    from .db import SessionLocal
+    db = SessionLocal()
+    try:
+        if args.command == "migrate":
+            print(migrate(db))
+        else:
+            print(gc(db, dry_run=args.dry_run))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
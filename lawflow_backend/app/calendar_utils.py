@@ -0,0 +1,207 @@
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional
+from pydantic import BaseModel
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from .models import Project, Task, TimelineItem
+
+# Rows fetched per round trip from the server-side cursor, and bytes of
+# calendar text buffered before a chunk is sent.
+FEED_FETCH_SIZE = 500
+FEED_CHUNK_SIZE = 64 * 1024
+
+# RFC 5545 3.1: lines longer than 75 octets are folded
+ICS_LINE_LIMIT = 75
+
+CALENDAR_HEADER = [
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//LawFlow//Calendar//EN",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH",
+]
+CALENDAR_FOOTER = ["END:VCALENDAR"]
+
+class FeedFilters(BaseModel):
+    project_id: Optional[List[int]] = None
+    project_status: Optional[List[str]] = None
+    assignee: Optional[List[str]] = None
+    task_status: Optional[List[str]] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+def ics_escape(s: str) -> str:
+    return s.replace('\\', '\\\\').replace(';','\\;').replace(',','\\,').replace('\n','\\n')
+
+def fold_line(line: str) -> str:
+    """
+    Fold a content line to at most 75 octets per physical line (RFC 5545 3.1).
+
+    Continuation lines start with a single space, which counts towards
+    their length. Splits never fall inside a multi-byte UTF-8 sequence.
+
+    Args:
+        line: Unfolded content line, without the trailing CRLF
+
+    Returns:
+        The line, with CRLF + space inserted where needed
+    """
+    data = line.encode("utf-8")
+    if len(data) <= ICS_LINE_LIMIT:
+        return line
+    parts = []
+    start, limit = 0, ICS_LINE_LIMIT
+    while len(data) - start > limit:
+        end = start + limit
+        while data[end] & 0xC0 == 0x80:  # back off to a character boundary
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start, limit = end, ICS_LINE_LIMIT - 1
+    parts.append(data[start:].decode("utf-8"))
+    return "\r\n ".join(parts)
+
+def format_event(uid: str, title: str, day: date, stamp: Optional[datetime], description: Optional[str] = None) -> str:
+    """
+    Render one all-day VEVENT, folded and CRLF-terminated.
+
+    DTSTAMP comes from the row's last change rather than the wall clock, so
+    an unchanged feed renders byte-for-byte identically.
+    """
+    stamp = (stamp or datetime(day.year, day.month, day.day)).strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{(day + timedelta(days=1)).strftime('%Y%m%d')}",  # DTEND is exclusive
+        f"SUMMARY:{ics_escape(title)}",
+    ]
+    if description:
+        lines.append(f"DESCRIPTION:{ics_escape(description)}")
+    lines.append("END:VEVENT")
+    return "".join(fold_line(line) + "\r\n" for line in lines)
+
+def _project_conditions(filters: FeedFilters) -> list:
+    conds = [Project.is_deleted.isnot(True)]
+    if filters.project_id:
+        conds.append(Project.id.in_(filters.project_id))
+    if filters.project_status:
+        conds.append(Project.status.in_(filters.project_status))
+    return conds
+
+def _task_conditions(filters: FeedFilters) -> list:
+    conds = [Task.is_deleted.isnot(True), Task.due_date.isnot(None)]
+    if filters.assignee:
+        conds.append(Task.assignee.in_(filters.assignee))
+    if filters.task_status:
+        conds.append(Task.status.in_(filters.task_status))
+    if filters.date_from:
+        conds.append(Task.due_date >= filters.date_from)
+    if filters.date_to:
+        conds.append(Task.due_date <= filters.date_to)
+    return conds + _project_conditions(filters)
+
+def _milestone_conditions(filters: FeedFilters) -> list:
+    conds = [
+        TimelineItem.is_deleted.isnot(True),
+        TimelineItem.kind == "Milestone",
+        TimelineItem.start_date.isnot(None),
+    ]
+    if filters.date_from:
+        conds.append(TimelineItem.start_date >= filters.date_from)
+    if filters.date_to:
+        conds.append(TimelineItem.start_date <= filters.date_to)
+    return conds + _project_conditions(filters)
+
+def _includes_milestones(filters: FeedFilters) -> bool:
+    # Milestones have no assignee or task status; a feed filtered on those is about tasks only
+    return not filters.assignee and not filters.task_status
+
+def task_events_query(filters: FeedFilters):
+    """Statement selecting the columns needed to render task events, in date order."""
+    return (
+        select(Task.id, Task.title, Task.assignee, Task.due_date, Task.updated_at, Project.title.label("project_title"))
+        .join(Project, Project.id == Task.project_id)
+        .where(*_task_conditions(filters))
+        .order_by(Task.due_date.asc(), Task.id.asc())
+    )
+
+def milestone_events_query(filters: FeedFilters):
+    """Statement selecting the columns needed to render milestone events, in date order."""
+    return (
+        select(TimelineItem.id, TimelineItem.label, TimelineItem.start_date, TimelineItem.updated_at, Project.title.label("project_title"))
+        .join(Project, Project.id == TimelineItem.project_id)
+        .where(*_milestone_conditions(filters))
+        .order_by(TimelineItem.start_date.asc(), TimelineItem.id.asc())
+    )
+
+def feed_etag(db: Session, filters: FeedFilters) -> str:
+    """
+    Validator for a feed, from aggregates over the filtered rows.
+
+    Any edit moves a max(updated_at) and any insert or (soft) delete moves a
+    count, so the tag changes exactly when the rendered feed would. Matter
+    titles appear in the events, hence the projects aggregate.
+
+    Args:
+        db: Database session
+        filters: Feed filters (resolved, so a default date window is part of the tag)
+
+    Returns:
+        Quoted ETag value
+    """
+    parts = [filters.model_dump_json()]
+    parts.extend(db.execute(
+        select(func.count(Task.id), func.max(Task.updated_at), func.max(Project.updated_at))
+        .join(Project, Project.id == Task.project_id)
+        .where(*_task_conditions(filters))
+    ).one())
+    if _includes_milestones(filters):
+        parts.extend(db.execute(
+            select(func.count(TimelineItem.id), func.max(TimelineItem.updated_at), func.max(Project.updated_at))
+            .join(Project, Project.id == TimelineItem.project_id)
+            .where(*_milestone_conditions(filters))
+        ).one())
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"ics-{digest}"'
+
+def iter_feed(db: Session, filters: FeedFilters) -> Iterator[str]:
+    """
+    Render a calendar feed incrementally.
+
+    Rows are pulled from a server-side cursor (yield_per) FEED_FETCH_SIZE at
+    a time and the text is emitted in chunks of about FEED_CHUNK_SIZE, so
+    memory stays flat however many matters are covered.
+
+    Args:
+        db: Session used only for this feed (it must stay open while iterating)
+        filters: Feed filters
+
+    Yields:
+        Chunks of iCalendar text
+    """
+    buf: list[str] = [fold_line(line) + "\r\n" for line in CALENDAR_HEADER]
+    size = 0
+
+    rows = db.execute(task_events_query(filters).execution_options(yield_per=FEED_FETCH_SIZE))
+    for r in rows:
+        event = format_event(f"task-{r.id}@lawflow", f"[Task] {r.title} · {r.assignee}", r.due_date, r.updated_at, r.project_title)
+        buf.append(event)
+        size += len(event)
+        if size >= FEED_CHUNK_SIZE:
+            yield "".join(buf)
+            buf, size = [], 0
+
+    if _includes_milestones(filters):
+        rows = db.execute(milestone_events_query(filters).execution_options(yield_per=FEED_FETCH_SIZE))
+        for r in rows:
+            event = format_event(f"milestone-{r.id}@lawflow", f"[Milestone] {r.label}", r.start_date, r.updated_at, r.project_title)
+            buf.append(event)
+            size += len(event)
+            if size >= FEED_CHUNK_SIZE:
+                yield "".join(buf)
+                buf, size = [], 0
+
+    buf.extend(fold_line(line) + "\r\n" for line in CALENDAR_FOOTER)
+    yield "".join(buf)
@@ -0,0 +1,252 @@
+"""
+Per-project change stream, served over Server-Sent Events by
+app/routers/changes.py.
+
+Session hooks record the ORM rows each transaction inserts, updates or
+deletes. Once the transaction commits, they publish one compact message per
+project to the in-process broker:
+
+    {"project_id": 3, "version": 42,
+     "changes": [{"table": "tasks", "op": "upsert", "id": 7, "row": {...}},
+                 {"table": "activities", "op": "upsert", "id": 912, "row": {...}}]}
+
+``row`` is the same shape the list endpoints return, and ``op`` is "upsert"
+or "delete" (soft deletes included), so clients apply changes the way they
+apply /sync deltas. ``version`` is the project's change_version after the
+commit, or null for writes that don't bump it (background preview and
+extraction status updates).
+
+The broker only reaches subscribers in this process. With several workers
+on Postgres, set CHANGE_STREAM_RELAY=postgres: messages are then sent with
+NOTIFY inside the committing transaction, and a listener thread in every
+worker hands them to its local broker.
+"""
+import asyncio
+import json
+import logging
+import os
+import select as select_module
+import threading
+from typing import Optional
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from .db import engine
+from .etag import PROJECT_VERSIONS_KEY
+from .models import Activity, ChecklistItem, FileItem, Project, Task, TimelineItem
+from .schemas import ActivityOut, ChecklistItemOut, FileItemOut, ProjectOut, TaskOut, TimelineItemOut
+
+logger = logging.getLogger(__name__)
+
+CHANGE_STREAM_RELAY = os.getenv("CHANGE_STREAM_RELAY", "local")  # local | postgres
+CHANGE_STREAM_QUEUE_SIZE = int(os.getenv("CHANGE_STREAM_QUEUE_SIZE", "256"))  # messages buffered per subscriber
+NOTIFY_CHANNEL = "lawflow_changes"
+NOTIFY_MAX_BYTES = 7900  # Postgres rejects NOTIFY payloads of 8000 bytes or more
+
+# Table name in messages (the same keys /sync uses) and row schema per model
+STREAMED_MODELS = {
+    Task: ("tasks", TaskOut),
+    ChecklistItem: ("checklist_items", ChecklistItemOut),
+    TimelineItem: ("timeline_items", TimelineItemOut),
+    Activity: ("activities", ActivityOut),
+    FileItem: ("files", FileItemOut),
+    Project: ("projects", ProjectOut),
+}
+
+_CHANGES_KEY = "stream_changes"  # db.info: {(model, id): (op, instance)} written this transaction
+_MESSAGES_KEY = "stream_messages"  # db.info: messages to publish once committed
+
+RESYNC = object()  # queued instead of messages a slow subscriber missed
+
+# ---------------------------------------------------------------------------
+# Broker
+# ---------------------------------------------------------------------------
+
+class Subscription:
+    """One stream client: a bounded queue of (version, encoded message), fed from any thread."""
+
+    def __init__(self, project_id: int, loop: asyncio.AbstractEventLoop):
+        self.project_id = project_id
+        self.loop = loop
+        self.queue: "asyncio.Queue" = asyncio.Queue(maxsize=CHANGE_STREAM_QUEUE_SIZE)
+
+    def _deliver(self, data) -> None:
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # The client fell behind; drop what it has queued and tell it to resync instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+class ChangeBroker:
+    """In-process fan-out of change messages to the subscribers of each project."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[Subscription]] = {}
+
+    def subscribe(self, project_id: int) -> Subscription:
+        sub = Subscription(project_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(project_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.project_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.project_id]
+
+    def has_subscribers(self, project_id: int) -> bool:
+        with self._lock:
+            return project_id in self._subscribers
+
+    def publish(self, project_id: int, version: Optional[int], data: str) -> None:
+        """Hand an encoded message to every subscriber of ``project_id``. Safe from any thread."""
+        with self._lock:
+            subs = list(self._subscribers.get(project_id, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._deliver, (version, data))
+            except RuntimeError:
+                self.unsubscribe(sub)  # its event loop is gone
+
+broker = ChangeBroker()
+
+# ---------------------------------------------------------------------------
+# Session hooks
+# ---------------------------------------------------------------------------
+
+def _relay_via_postgres(session: Session) -> bool:
+    return CHANGE_STREAM_RELAY == "postgres" and session.get_bind().dialect.name == "postgresql"
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session: Session, flush_context) -> None:
+    # session.new / dirty / deleted still describe what this flush wrote
+    changes = session.info.setdefault(_CHANGES_KEY, {})
+    for op, instances in (("upsert", session.new), ("upsert", session.dirty), ("delete", session.deleted)):
+        for obj in instances:
+            if type(obj) in STREAMED_MODELS and (op != "upsert" or session.is_modified(obj) or obj in session.new):
+                changes[(type(obj), obj.id)] = (op, obj)
+
+def record_written(session: Session, instances) -> None:
+    """
+    Stream rows written with ORM-enabled bulk INSERT/UPDATE ... RETURNING.
+
+    Those statements bypass the unit of work, so the flush hook never sees
+    them; pass the returned instances here before committing.
+    """
+    changes = session.info.setdefault(_CHANGES_KEY, {})
+    for obj in instances:
+        if type(obj) in STREAMED_MODELS:
+            changes[(type(obj), obj.id)] = ("upsert", obj)
+
+@event.listens_for(Session, "before_commit")
+def _build_messages(session: Session) -> None:
+    session.flush()  # commit would only flush after this hook; record those writes now
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if not changes:
+        return
+    relay = _relay_via_postgres(session)
+    versions = session.info.get(PROJECT_VERSIONS_KEY, {})
+    by_project: dict[int, list[dict]] = {}
+    for (model, row_id), (op, obj) in changes.items():
+        table, schema = STREAMED_MODELS[model]
+        project_id = obj.id if model is Project else obj.project_id
+        if not relay and not broker.has_subscribers(project_id):
+            continue  # nobody in this process is watching; skip serialising the row
+        if op == "upsert" and getattr(obj, "is_deleted", False):
+            op = "delete"
+        change = {"table": table, "op": op, "id": row_id}
+        if op == "upsert":
+            change["row"] = schema.model_validate(obj).model_dump(mode="json")
+        by_project.setdefault(project_id, []).append(change)
+    messages = [
+        (project_id, {"project_id": project_id, "version": versions.get(project_id), "changes": project_changes})
+        for project_id, project_changes in by_project.items()
+    ]
+    if relay:
+        # NOTIFY is transactional: listeners get it on commit, never on rollback
+        for project_id, message in messages:
+            session.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": _notify_payload(message)})
+        return
+    session.info[_MESSAGES_KEY] = messages
+
+@event.listens_for(Session, "after_commit")
+def _publish_messages(session: Session) -> None:
+    session.info.pop(PROJECT_VERSIONS_KEY, None)
+    for project_id, message in session.info.pop(_MESSAGES_KEY, ()):
+        broker.publish(project_id, message["version"], json.dumps(message, separators=(",", ":")))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    for key in (_CHANGES_KEY, _MESSAGES_KEY, PROJECT_VERSIONS_KEY):
+        session.info.pop(key, None)
+
+def _notify_payload(message: dict) -> str:
+    payload = json.dumps(message, separators=(",", ":"))
+    if len(payload.encode()) <= NOTIFY_MAX_BYTES:
+        return payload
+    # Too big for NOTIFY: send ids only; clients fetch the rows with /sync
+    message = {**message, "partial": True, "changes": [{k: v for k, v in c.items() if k != "row"} for c in message["changes"]]}
+    payload = json.dumps(message, separators=(",", ":"))
+    if len(payload.encode()) <= NOTIFY_MAX_BYTES:
+        return payload
+    return json.dumps({"project_id": message["project_id"], "version": message["version"], "partial": True, "changes": []})
+
+# ---------------------------------------------------------------------------
+# Postgres relay
+# ---------------------------------------------------------------------------
+
+_relay_thread: Optional[threading.Thread] = None
+_relay_stop = threading.Event()
+
+def _relay_loop() -> None:
+    while not _relay_stop.is_set():
+        try:
+            raw = engine.raw_connection()
+        except Exception:
+            logger.exception("Change relay could not connect; retrying")
+            _relay_stop.wait(5)
+            continue
+        try:
+            conn = raw.driver_connection
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            while not _relay_stop.is_set():
+                if select_module.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    message = json.loads(notify.payload)
+                    broker.publish(message["project_id"], message["version"], notify.payload)
+        except Exception:
+            logger.exception("Change relay connection lost; reconnecting")
+            _relay_stop.wait(1)
+        finally:
+            raw.invalidate()  # LISTEN state must not go back to the pool
+
+def start_change_relay() -> None:
+    """Start the LISTEN thread when relaying through Postgres (no-op otherwise)."""
+    global _relay_thread
+    if CHANGE_STREAM_RELAY != "postgres" or _relay_thread is not None:
+        return
+    if engine.dialect.name != "postgresql":
+        logger.warning("CHANGE_STREAM_RELAY=postgres needs a Postgres DATABASE_URL; using the in-process broker")
+        return
+    _relay_stop.clear()
+    _relay_thread = threading.Thread(target=_relay_loop, name="change-relay", daemon=True)
+    _relay_thread.start()
+
+def stop_change_relay() -> None:
+    """Signal the LISTEN thread to exit and wait briefly for it."""
+    global _relay_thread
+    _relay_stop.set()
+    if _relay_thread is not None:
+        _relay_thread.join(timeout=5)
+        _relay_thread = None
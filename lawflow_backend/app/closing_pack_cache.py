@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import select
+from .db import SessionLocal
+from .models import Project
+from .closing_pack_utils import pack_fingerprint, load_pack_snapshot, stream_pack
+from .disk_cache import touch, evict_lru
+
+logger = logging.getLogger(__name__)
+
+CLOSING_PACK_CACHE_DIR = Path(os.getenv("CLOSING_PACK_CACHE_DIR", "./cache/closing_packs"))
+CLOSING_PACK_CACHE_MAX_MB = int(os.getenv("CLOSING_PACK_CACHE_MAX_MB", "1024"))
+# Prebuild packs for projects closing within this many days; interval 0 disables the job
+CLOSING_PACK_PREBUILD_DAYS = int(os.getenv("CLOSING_PACK_PREBUILD_DAYS", "7"))
+CLOSING_PACK_PREBUILD_INTERVAL = int(os.getenv("CLOSING_PACK_PREBUILD_INTERVAL", "900"))  # seconds
+
+_prebuild_stop = threading.Event()
+_prebuild_thread: Optional[threading.Thread] = None
+
+def cache_path(project_id: int, fingerprint: str) -> Path:
+    """Location of the cached pack for a project at a given fingerprint."""
+    return CLOSING_PACK_CACHE_DIR / f"{project_id}_{fingerprint}.zip"
+
+def lookup(project_id: int, fingerprint: str) -> Optional[Path]:
+    """
+    Return the cached pack if present, marking it as recently used.
+
+    Args:
+        project_id: Project the pack belongs to
+        fingerprint: Result of pack_fingerprint
+
+    Returns:
+        Path of the cached ZIP, or None on a miss
+    """
+    path = cache_path(project_id, fingerprint)
+    return path if touch(path) else None
+
+def tee_to_cache(chunks: Iterable[bytes], project_id: int, fingerprint: str) -> Iterator[bytes]:
+    """
+    Pass a pack stream through while writing it into the cache.
+
+    The copy is written to a temporary file and only renamed into place once
+    the whole archive has been produced, so a dropped connection or a failed
+    build never leaves a truncated pack behind.
+
+    Args:
+        chunks: ZIP byte stream (from stream_zip)
+        project_id: Project the pack belongs to
+        fingerprint: Result of pack_fingerprint
+
+    Yields:
+        The same chunks, unchanged
+    """
+    CLOSING_PACK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    final = cache_path(project_id, fingerprint)
+    tmp = final.with_name(f".{final.name}.{uuid.uuid4().hex}.tmp")
+    completed = False
+    try:
+        with tmp.open("wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+                yield chunk
+        os.replace(tmp, final)
+        completed = True
+    finally:
+        if not completed:
+            tmp.unlink(missing_ok=True)
+    drop_stale(project_id, keep=final)
+    evict()
+
+def build(project_id: int, fingerprint: str, snapshot: dict) -> Path:
+    """
+    Generate a pack straight into the cache without serving it.
+
+    Args:
+        project_id: Project the pack belongs to
+        fingerprint: Result of pack_fingerprint
+        snapshot: Result of load_pack_snapshot
+
+    Returns:
+        Path of the cached ZIP
+    """
+    for _ in tee_to_cache(stream_pack(snapshot), project_id, fingerprint):
+        pass
+    return cache_path(project_id, fingerprint)
+
+def drop_stale(project_id: int, keep: Path) -> None:
+    """Remove packs of a project that were built for older contents."""
+    for path in CLOSING_PACK_CACHE_DIR.glob(f"{project_id}_*.zip"):
+        if path != keep:
+            path.unlink(missing_ok=True)
+
+def evict() -> None:
+    """Delete least recently used packs until the cache fits CLOSING_PACK_CACHE_MAX_MB."""
+    evict_lru(CLOSING_PACK_CACHE_DIR, "*.zip", CLOSING_PACK_CACHE_MAX_MB * 1024 * 1024)
+
+def prebuild_upcoming(today: Optional[date] = None) -> int:
+    """
+    Make sure every project completing soon has an up-to-date cached pack.
+
+    Args:
+        today: Reference day (defaults to today)
+
+    Returns:
+        Number of packs built
+    """
+    today = today or date.today()
+    horizon = today + timedelta(days=CLOSING_PACK_PREBUILD_DAYS)
+    built = 0
+    db = SessionLocal()
+    try:
+        project_ids = db.execute(
+            select(Project.id).where(
+                Project.target_close_date >= today,
+                Project.target_close_date <= horizon,
+                Project.is_deleted.isnot(True),
+            )
+        ).scalars().all()
+        for project_id in project_ids:
+            fingerprint = pack_fingerprint(db, project_id)
+            if fingerprint is None or lookup(project_id, fingerprint):
+                continue
+            snapshot = load_pack_snapshot(db, project_id)
+            db.rollback()  # don't hold a transaction open while compressing
+            if snapshot:
+                build(project_id, fingerprint, snapshot)
+                built += 1
+    finally:
+        db.close()
+    return built
+
+def _prebuild_loop():
+    while not _prebuild_stop.is_set():
+        try:
+            built = prebuild_upcoming()
+            if built:
+                logger.info("Prebuilt %d closing pack(s)", built)
+        except Exception:
+            logger.exception("Closing pack prebuild failed")
+        _prebuild_stop.wait(CLOSING_PACK_PREBUILD_INTERVAL)
+
+def start_prebuilder() -> None:
+    """Start the background prebuild thread (no-op when the interval is 0)."""
+    global _prebuild_thread
+    if CLOSING_PACK_PREBUILD_INTERVAL <= 0 or _prebuild_thread is not None:
+        return
+    _prebuild_stop.clear()
+    _prebuild_thread = threading.Thread(target=_prebuild_loop, name="closing-pack-prebuild", daemon=True)
+    _prebuild_thread.start()
+
+def stop_prebuilder() -> None:
+    """Signal the prebuild thread to exit and wait briefly for it."""
+    global _prebuild_thread
+    _prebuild_stop.set()
+    if _prebuild_thread is not None:
+        _prebuild_thread.join(timeout=5)
+        _prebuild_thread = None
@@ -0,0 +1,194 @@
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional, List
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .models import Client, Project, Task, ChecklistItem, FileItem
+from .zip_utils import ZipMember, stream_zip
+
+DOCUMENTS_DIR = "documents"
+
+# Bump when the pack layout or generated text changes so cached packs are rebuilt
+PACK_FORMAT_VERSION = 2
+
+def md(title: str, body: str) -> str:
+    return f"# {title}\n\n{body}\n"
+
+def pack_fingerprint(db: Session, project_id: int) -> Optional[str]:
+    """
+    Content hash identifying the closing pack a project would produce now.
+
+    Everything the pack contains changes the project's change_version (or
+    the client's updated_at), so the hash is built from those plus the size
+    and mtime of each uploaded document instead of from the full contents.
+
+    Args:
+        db: Database session
+        project_id: Project to fingerprint
+
+    Returns:
+        Hex digest, or None if the project does not exist
+    """
+    row = db.execute(
+        select(Project.change_version, Client.updated_at)
+        .outerjoin(Client, Client.id == Project.client_id)
+        .where(Project.id == project_id)
+    ).first()
+    if row is None:
+        return None
+
+    h = hashlib.sha256()
+    h.update(f"v{PACK_FORMAT_VERSION}|{project_id}|{row.change_version}|{row.updated_at}".encode())
+    for file_id, stored_path in db.execute(
+        select(FileItem.id, FileItem.stored_path)
+        .where(FileItem.project_id == project_id, FileItem.is_deleted.isnot(True))
+        .order_by(FileItem.id.asc())
+    ):
+        try:
+            st = Path(stored_path).stat()
+            h.update(f"|{file_id}:{st.st_size}:{st.st_mtime_ns}".encode())
+        except OSError:
+            h.update(f"|{file_id}:missing".encode())
+    return h.hexdigest()
+
+def load_pack_snapshot(db: Session, project_id: int) -> Optional[dict]:
+    """
+    Read everything a closing pack needs from the database.
+
+    The pack itself is streamed after the request's session has closed, so
+    the data is copied into plain values up front.
+
+    Args:
+        db: Database session
+        project_id: Project to pack
+
+    Returns:
+        Snapshot dict, or None if the project does not exist
+    """
+    p = db.get(Project, project_id)
+    if not p:
+        return None
+
+    tasks = db.query(Task).filter(Task.project_id == project_id).all()
+    checklist = db.query(ChecklistItem).filter(ChecklistItem.project_id == project_id).all()
+    files = (
+        db.query(FileItem)
+        .filter(FileItem.project_id == project_id, FileItem.is_deleted.isnot(True))
+        .order_by(FileItem.id.asc())
+        .all()
+    )
+    # Moves whenever change_version or the client (both fingerprinted) does, and only then
+    as_of = max((t for t in (p.updated_at, p.client.updated_at if p.client else None) if t is not None), default=datetime(1980, 1, 1))
+    return {
+        "as_of": as_of,
+        "project": {
+            "id": p.id,
+            "title": p.title,
+            "client": p.client.name if p.client else None,
+            "transaction_type": p.transaction_type,
+            "location": p.location,
+            "status": p.status,
+            "target_close_date": p.target_close_date,
+        },
+        "tasks": [
+            {"title": t.title, "assignee": t.assignee, "due_date": t.due_date, "priority": t.priority, "status": t.status}
+            for t in tasks
+        ],
+        "checklist": [
+            {"stage": it.stage, "label": it.label, "is_done": it.is_done, "due_date": it.due_date}
+            for it in checklist
+        ],
+        "files": [
+            {"id": f.id, "filename": f.filename, "stored_path": f.stored_path}
+            for f in files
+        ],
+    }
+
+def pack_members(snapshot: dict) -> List[ZipMember]:
+    """
+    Lay out the closing pack for a snapshot.
+
+    Generated documents are included as text; uploaded documents are
+    referenced by path and read from disk while the archive streams.
+
+    Args:
+        snapshot: Result of load_pack_snapshot
+
+    Returns:
+        List of (archive name, content or path) pairs for stream_zip
+    """
+    p = snapshot["project"]
+    members: List[ZipMember] = []
+
+    members.append(("00_Project_Summary.md", md("Project summary", f"""**Matter:** {p['title']}
+**Client:** {p['client'] or '—'}
+**Type:** {p['transaction_type']}
+**Location:** {p['location']}
+**Status:** {p['status']}
+**Target close:** {p['target_close_date']}
+""")))
+
+    # Completion agenda
+    agenda = "\n".join([
+        "- Confirm notary appointment (Escritura) time & attendees",
+        "- Confirm funds routing / completion statement approved",
+        "- Confirm IDs/NIE and powers of attorney if applicable",
+        "- Confirm taxes filing plan (ITP/AJD / Plusvalía)",
+        "- Confirm post-completion: Land Registry submission + utilities/HOA notifications",
+    ])
+    members.append(("01_Notary_Agenda.md", md("Notary agenda (Escritura)", agenda)))
+
+    # Checklist export
+    by_stage = {}
+    for it in snapshot["checklist"]:
+        by_stage.setdefault(it["stage"], []).append(it)
+    lines = []
+    for stage, items in by_stage.items():
+        lines.append(f"## {stage}")
+        for it in items:
+            lines.append(f"- [{'x' if it['is_done'] else ' '}] {it['label']} (due: {it['due_date']})")
+        lines.append("")
+    members.append(("02_Conveyancing_Checklist.md", "# Conveyancing checklist\n\n" + "\n".join(lines)))
+
+    # Open tasks
+    open_tasks = [t for t in snapshot["tasks"] if t["status"] != "Done"]
+    tlines = ["| Task | Assignee | Due | Priority |", "|---|---|---|---|"]
+    for t in open_tasks:
+        tlines.append(f"| {t['title']} | {t['assignee']} | {t['due_date']} | {t['priority']} |")
+    members.append(("03_Open_Tasks.md", "# Open tasks\n\n" + "\n".join(tlines) + "\n"))
+
+    # Uploaded documents; entries without content on disk (seed metadata) are listed as missing
+    documents, missing = [], []
+    for f in snapshot["files"]:
+        path = Path(f["stored_path"])
+        if path.is_file():
+            arcname = f"{DOCUMENTS_DIR}/{f['id']}_{f['filename']}"
+            members.append((arcname, path))
+            documents.append(arcname)
+        else:
+            missing.append(f["filename"])
+
+    # Closing pack manifest
+    manifest = {
+        "generated_at": snapshot["as_of"].isoformat() + "Z",  # data timestamp, not build time: rebuilds are byte-identical
+        "project_id": p["id"],
+        "title": p["title"],
+        "includes": [name for name, _ in members if not name.startswith(DOCUMENTS_DIR + "/")],
+        "documents": documents,
+        "missing_documents": missing,
+    }
+    members.append(("manifest.json", json.dumps(manifest, indent=2, ensure_ascii=False)))
+    return members
+
+def stream_pack(snapshot: dict) -> Iterator[bytes]:
+    """
+    ZIP bytes of the closing pack for a snapshot.
+
+    Output depends only on the snapshot and the documents on disk, so a
+    rebuild is byte-identical to the cached copy it replaces and Range
+    requests under the pack's strong ETag can be resumed across the two.
+    """
+    date_time = max(snapshot["as_of"], datetime(1980, 1, 1)).timetuple()[:6]  # ZIP dates start in 1980
+    return stream_zip(pack_members(snapshot), date_time=date_time)
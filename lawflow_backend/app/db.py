@@ -1,12 +1,152 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./lawflow.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}, future=True)
+# Pool sizing (Postgres, and file-backed SQLite).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; Postgres only
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")  # Postgres only
+
+# Per-connection SQLite settings. WAL lets readers and the writer proceed concurrently.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+def async_database_url(url: str) -> str:
+    # Same database, async driver: aiosqlite for SQLite, asyncpg for Postgres.
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+
+class PoolWaitStats:
+    """Running totals of how long callers waited to check a connection out."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avg = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(avg * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+class _TimedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return conn
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _is_sqlite_memory(url: str) -> bool:
+    return url.split("?")[0].rstrip("/").endswith(("sqlite:", "aiosqlite:", ":memory:"))
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    Backend-specific keyword arguments for create_engine/create_async_engine.
+
+    Args:
+        url: Database URL the engine will connect to
+        is_async: Whether the options are for the async engine
+
+    Returns:
+        Dict of engine options
+    """
+    options = {"future": True}
+    if url.startswith("sqlite"):
+        if not is_async:
+            options["connect_args"] = {"check_same_thread": False}
+        if _is_sqlite_memory(url):
+            return options
+    else:
+        options["pool_recycle"] = DB_POOL_RECYCLE
+        options["pool_pre_ping"] = DB_POOL_PRE_PING
+    options["poolclass"] = TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool
+    options["pool_size"] = DB_POOL_SIZE
+    options["max_overflow"] = DB_MAX_OVERFLOW
+    options["pool_timeout"] = DB_POOL_TIMEOUT
+    return options
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    finally:
+        cursor.close()
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+if DATABASE_URL.startswith("sqlite") and not _is_sqlite_memory(DATABASE_URL):
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+if ASYNC_DATABASE_URL.startswith("sqlite") and not _is_sqlite_memory(ASYNC_DATABASE_URL):
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+
+def pool_status(engine) -> dict:
+    """Live statistics for an engine's connection pool."""
+    pool = engine.pool
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    if isinstance(pool, _TimedPoolMixin):
+        status.update(pool.wait_stats.snapshot())
+    return status
+
 class Base(DeclarativeBase):
     pass
 
@@ -16,3 +156,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    # For async endpoints: waiting on the database no longer holds a threadpool slot.
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,53 @@
+import os
+import threading
+from pathlib import Path
+
+_evict_lock = threading.Lock()
+
+def touch(path: Path) -> bool:
+    """
+    Mark a cache entry as recently used.
+
+    The file's mtime doubles as the LRU timestamp.
+
+    Args:
+        path: Cache entry
+
+    Returns:
+        True if the entry exists
+    """
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+def evict_lru(root: Path, pattern: str, max_bytes: int) -> int:
+    """
+    Delete least recently used entries until a cache fits its budget.
+
+    Args:
+        root: Cache directory
+        pattern: Glob (relative to root) matching the cache entries
+        max_bytes: Size budget for all matching entries
+
+    Returns:
+        Number of entries deleted
+    """
+    with _evict_lock:
+        entries = []
+        for path in root.glob(pattern):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,107 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from .models import Project
+
+# db.info key: {project_id: change_version} bumped by the current transaction
+PROJECT_VERSIONS_KEY = "project_versions"
+
+def bump_project_version(db: Session, project_id: int) -> None:
+    """
+    Record that something belonging to a project changed.
+
+    Must be called inside the same transaction as the write so that the
+    new version only becomes visible together with the data it describes.
+    The new version is also kept in ``db.info`` for the change stream,
+    which sends it along with the transaction's changes.
+
+    Args:
+        db: Database session carrying the write
+        project_id: Project whose data changed
+    """
+    version = db.execute(
+        update(Project)
+        .where(Project.id == project_id)
+        .values(change_version=Project.change_version + 1)
+        .returning(Project.change_version)
+    ).scalar()
+    remember_project_version(db, project_id, version)
+
+def remember_project_version(db: Session, project_id: int, version: Optional[int]) -> None:
+    """Keep a version bumped by the current transaction for the change stream."""
+    db.info.setdefault(PROJECT_VERSIONS_KEY, {})[project_id] = version
+
+def project_version_query(project_id: int):
+    """Statement selecting the current change version of a project."""
+    return select(Project.change_version).where(Project.id == project_id)
+
+def make_etag(resource: str, project_id: int, version: int, request: Request) -> str:
+    """
+    Build a strong ETag for a per-project resource.
+
+    The query string is folded in so that differently filtered or paged
+    views of the same list never share a tag.
+
+    Args:
+        resource: Name of the list being served (e.g. "tasks")
+        project_id: Project the list belongs to
+        version: Current change version of the project
+        request: Incoming request
+
+    Returns:
+        Quoted ETag value
+    """
+    query = hashlib.sha1(request.url.query.encode()).hexdigest()[:12]
+    return f'"{resource}-{project_id}-{version}-{query}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check an ETag against the request's If-None-Match header (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [t.strip() for t in header.split(",")]
+    return any(t.removeprefix("W/") == etag for t in candidates)
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the validator."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def conditional_get(
+    db: Session,
+    request: Request,
+    response: Response,
+    resource: str,
+    project_id: int,
+) -> Optional[Response]:
+    """
+    Answer a conditional GET for a per-project list from the project version alone.
+
+    Only the projects row is read. When the client's copy is current a 304
+    response is returned and the caller should return it as-is; otherwise
+    the ETag is set on ``response`` and None is returned so the caller can
+    build the full body. Async endpoints call it through
+    ``AsyncSession.run_sync``.
+
+    Args:
+        db: Database session
+        request: Incoming request
+        response: Response the endpoint will populate
+        resource: Name of the list being served
+        project_id: Project the list belongs to
+
+    Returns:
+        A 304 Response, or None if the body must be sent
+    """
+    version = db.execute(project_version_query(project_id)).scalar()
+    if version is None:
+        return None
+    etag = make_etag(resource, project_id, version, request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return None
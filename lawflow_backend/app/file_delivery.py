@@ -0,0 +1,90 @@
+import os
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from .etag import etag_matches
+from .models import FileItem
+
+# When set (e.g. "/_files/"), downloads are handed to nginx with X-Accel-Redirect
+# instead of being streamed by a Python worker. The prefix must be an `internal`
+# nginx location aliased to FILE_ACCEL_ROOT (see nginx/default.conf).
+FILE_ACCEL_REDIRECT_PREFIX = os.getenv("FILE_ACCEL_REDIRECT_PREFIX", "")
+FILE_ACCEL_ROOT = Path(os.getenv("FILE_ACCEL_ROOT", "./uploads"))
+
+# Downloads are access-checked per request, so shared caches must not keep them,
+# but browsers can revalidate with If-None-Match.
+DOWNLOAD_CACHE_CONTROL = "private, no-cache"
+
+def file_etag(item: FileItem, path: Path) -> str:
+    """Strong ETag of a stored file: its content hash, or size and mtime for legacy rows."""
+    if item.sha256:
+        return f'"{item.sha256[:32]}"'
+    st = path.stat()
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+def nginx_etag(path: Path) -> str:
+    """
+    The ETag nginx's static handler gives a file (``"<mtime hex>-<size hex>"``).
+
+    In accel mode nginx serves the body and evaluates If-Range against its own
+    ETag, so the backend must hand out the same one for If-Range to match.
+    """
+    st = path.stat()
+    return f'"{int(st.st_mtime):x}-{st.st_size:x}"'
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """Content-Disposition value for a download, RFC 5987-encoded when needed (as Starlette does)."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+def accel_redirect_uri(path: Path) -> Optional[str]:
+    """Internal nginx URI for a stored file, or None if offloading is off or the file is outside FILE_ACCEL_ROOT."""
+    if not FILE_ACCEL_REDIRECT_PREFIX:
+        return None
+    try:
+        relative = path.resolve().relative_to(FILE_ACCEL_ROOT.resolve())
+    except ValueError:
+        return None
+    return FILE_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(relative.as_posix())
+
+def file_download(request: Request, item: FileItem, path: Path) -> Response:
+    """
+    Response serving a stored file as a download.
+
+    The backend always answers If-None-Match itself. The body is either
+    streamed by Starlette or, with FILE_ACCEL_REDIRECT_PREFIX set, left to
+    nginx via X-Accel-Redirect. In both modes the response carries an ETag,
+    Content-Type and Content-Disposition, and Range / If-Range requests are
+    honoured (by Starlette or by nginx's static file handler). Each mode uses
+    the ETag of whoever evaluates If-Range: the content hash for Starlette,
+    nginx's own mtime/size ETag when offloaded.
+
+    Args:
+        request: Incoming request
+        item: File row, already authorised
+        path: Its stored file
+
+    Returns:
+        304, FileResponse, or an empty response with X-Accel-Redirect
+    """
+    uri = accel_redirect_uri(path)
+    etag = file_etag(item, path) if uri is None else nginx_etag(path)
+    headers = {"ETag": etag, "Cache-Control": DOWNLOAD_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = item.mime_type or "application/octet-stream"
+    if uri is None:
+        return FileResponse(path, filename=item.filename, media_type=media_type, headers=headers)
+    headers.update({
+        "X-Accel-Redirect": uri,
+        "Content-Disposition": content_disposition(item.filename),
+        "Accept-Ranges": "bytes",
+    })
+    # nginx keeps Content-Type, Content-Disposition and Cache-Control from this response
+    # and sends its own ETag for the file, which is the one computed above
+    return Response(headers=headers, media_type=media_type)
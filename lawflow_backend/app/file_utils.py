@@ -1,7 +1,15 @@
+import codecs
+import hashlib
 import os
 from pathlib import Path
-from typing import Optional, List
-from fastapi import UploadFile, HTTPException
+from typing import Optional, List, BinaryIO
+from fastapi import UploadFile, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from python_multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+from . import blob_store
 
 # File validation constants
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
@@ -31,6 +39,347 @@ ALLOWED_MIME_TYPES = {
     'application/x-7z-compressed': ['.7z'],
 }
 
+# Upload bodies are read in chunks of this size; the first chunk is also used to sniff the type
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Allowance on top of MAX_FILE_SIZE for boundaries, part headers and the other form fields
+MULTIPART_OVERHEAD = 64 * 1024
+FORM_FIELD_MAX_SIZE = 16 * 1024  # non-file form fields
+
+# Leading bytes of each binary format. Container formats map to every MIME
+# type they may legitimately carry (OOXML documents are ZIP files, legacy
+# Office documents are OLE2 compound files).
+MAGIC_SIGNATURES = [
+    (b"%PDF-", {'application/pdf'}),
+    (b"PK\x03\x04", {
+        'application/zip',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    }),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", {'application/msword', 'application/vnd.ms-excel', 'application/vnd.ms-powerpoint'}),
+    (b"\xff\xd8\xff", {'image/jpeg'}),
+    (b"\x89PNG\r\n\x1a\n", {'image/png'}),
+    (b"GIF87a", {'image/gif'}),
+    (b"GIF89a", {'image/gif'}),
+    (b"II*\x00", {'image/tiff'}),
+    (b"MM\x00*", {'image/tiff'}),
+    (b"Rar!\x1a\x07", {'application/x-rar-compressed'}),
+    (b"7z\xbc\xaf\x27\x1c", {'application/x-7z-compressed'}),
+]
+TEXT_MIME_TYPES = {'text/plain', 'text/csv', 'image/svg+xml'}
+# Text that is not UTF-8 (cp1252/latin-1 exports from Excel and Windows tools) is accepted
+# when at least this share of its bytes are not control characters
+TEXT_MIN_PRINTABLE = 0.95
+_CONTROL_BYTES = bytes(set(range(32)) - {9, 10, 12, 13}) + b"\x7f"
+
+class StoredUpload(BaseModel):
+    path: str
+    mime_type: str
+    size: int
+    sha256: str
+
+def sniff_mime_types(head: bytes) -> set:
+    """
+    Identify what a file can be from its first bytes.
+
+    Args:
+        head: Leading bytes of the file
+
+    Returns:
+        Set of allowed MIME types consistent with the content (empty if unrecognised)
+    """
+    for magic, mime_types in MAGIC_SIGNATURES:
+        if head.startswith(magic):
+            return mime_types
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return {'image/webp'}
+    if b"\x00" not in head:
+        try:
+            # Incremental decoder: a multi-byte character cut at the end of the chunk is not an error
+            codecs.getincrementaldecoder("utf-8")().decode(head)
+        except UnicodeDecodeError:
+            # Single-byte encodings decode anything, so judge by the share of control bytes instead
+            if len(head.translate(None, _CONTROL_BYTES)) < TEXT_MIN_PRINTABLE * len(head):
+                return set()
+        if b"<svg" in head[:4096].lower():
+            return {'image/svg+xml'}
+        return {'text/plain', 'text/csv'}
+    return set()
+
+def resolve_upload_type(head: bytes, filename: str, declared: Optional[str]) -> str:
+    """
+    Decide the real MIME type of an upload from its content.
+
+    The declared Content-Type is only trusted to pick between types that
+    share a container format (e.g. .docx vs .zip); otherwise the extension
+    decides. The type must be allowed and the extension must match it.
+
+    Args:
+        head: First chunk of the file
+        filename: Sanitized client filename
+        declared: Content-Type sent by the client
+
+    Returns:
+        MIME type to record for the file
+
+    Raises:
+        HTTPException: If the content is not an allowed type or does not match the filename
+    """
+    candidates = sniff_mime_types(head)
+    if not candidates:
+        raise HTTPException(status_code=400, detail="File type not allowed or not recognised from its content")
+
+    file_ext = Path(filename).suffix.lower()
+    if declared in candidates and file_ext in ALLOWED_MIME_TYPES[declared]:
+        return declared
+    for mime_type in sorted(candidates):
+        if file_ext in ALLOWED_MIME_TYPES[mime_type]:
+            return mime_type
+    raise HTTPException(
+        status_code=400,
+        detail=f"File extension '{file_ext}' doesn't match file content ({', '.join(sorted(candidates))})"
+    )
+
+class UploadWriter:
+    """
+    Incremental form of store_upload, for bodies that arrive in pieces.
+
+    Pieces are buffered until UPLOAD_CHUNK_SIZE bytes are available to
+    sniff the type (or the body ends), then counted against MAX_FILE_SIZE,
+    hashed and written to a temporary file in the blob store. Blocking;
+    call it from a worker thread.
+    """
+
+    def __init__(self, filename: str, declared: Optional[str]):
+        self.filename = filename
+        self.declared = declared
+        self.tmp = blob_store.new_temp_path()
+        self._out = self.tmp.open("wb")
+        self._digest = hashlib.sha256()
+        self._head: list[bytes] = []  # buffered until the type is known
+        self._head_size = 0
+        self.size = 0
+        self.mime_type: Optional[str] = None
+
+    def write(self, data: bytes) -> None:
+        """Add the next piece of the body."""
+        if self.mime_type is None:
+            self._head.append(data)
+            self._head_size += len(data)
+            if self._head_size < UPLOAD_CHUNK_SIZE:
+                return
+            self._sniff()
+            return
+        self._append(data)
+
+    def _sniff(self) -> None:
+        head = b"".join(self._head)
+        self._head, self._head_size = [], 0
+        self.mime_type = resolve_upload_type(head, self.filename, self.declared)
+        self._append(head)
+
+    def _append(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024*1024):.0f}MB"
+            )
+        self._digest.update(data)
+        self._out.write(data)
+
+    def finish(self) -> StoredUpload:
+        """
+        Commit the body to the blob store under its SHA-256.
+
+        Raises:
+            HTTPException: If the file is empty or not an allowed type
+        """
+        if self.mime_type is None and self._head_size:
+            self._sniff()  # body shorter than one sniffing chunk
+        self._out.close()
+        if self.size == 0:
+            raise HTTPException(status_code=400, detail="Empty file not allowed")
+        sha256 = self._digest.hexdigest()
+        path = blob_store.commit(self.tmp, sha256)
+        return StoredUpload(path=str(path), mime_type=self.mime_type, size=self.size, sha256=sha256)
+
+    def discard(self) -> None:
+        """Remove the temporary file (a no-op once finish has committed it)."""
+        self._out.close()
+        self.tmp.unlink(missing_ok=True)
+
+def store_upload(src: BinaryIO, filename: str, declared: Optional[str]) -> StoredUpload:
+    """
+    Validate, hash and store an upload in a single pass over its body.
+
+    The body is read once in UPLOAD_CHUNK_SIZE chunks: the first chunk is
+    sniffed, every chunk is counted against MAX_FILE_SIZE, hashed and
+    written to a temporary file in the blob store, which is committed under
+    its SHA-256 only after the whole body has been accepted. A body that is
+    already stored is not kept twice. Blocking; call it from a worker thread.
+
+    Args:
+        src: Readable binary stream of the upload body
+        filename: Sanitized client filename
+        declared: Content-Type sent by the client
+
+    Returns:
+        Where the blob is stored, its MIME type, size and SHA-256
+
+    Raises:
+        HTTPException: If the file is empty, too large or not an allowed type
+    """
+    writer = UploadWriter(filename, declared)
+    try:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            writer.write(chunk)
+        return writer.finish()
+    finally:
+        writer.discard()
+
+async def receive_multipart_upload(request: Request, file_field: str = "file") -> tuple[dict, str, StoredUpload]:
+    """
+    Parse a multipart/form-data upload straight off the request stream.
+
+    The file part goes to an UploadWriter as it arrives, so the body is
+    read exactly once and nothing is spooled first. An oversized file is
+    refused as soon as it passes MAX_FILE_SIZE, or before anything is read
+    if Content-Length already says so.
+
+    Args:
+        request: Incoming request
+        file_field: Name of the form field carrying the file
+
+    Returns:
+        (other form fields as strings, sanitized filename, stored upload)
+
+    Raises:
+        HTTPException: If the body is not valid multipart, has no file part,
+            or the file is rejected by UploadWriter
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024*1024):.0f}MB"
+        )
+
+    # Parser callbacks are synchronous; they only record what was parsed, and the file
+    # writes happen below, off the event loop
+    fields: dict[str, str] = {}
+    part: dict = {}
+    header: list[bytes] = [b"", b""]
+    started: list[tuple[str, Optional[str]]] = []  # file parts begun in the current network chunk
+    data: list[bytes] = []  # file bytes parsed from the current network chunk
+
+    def on_part_begin():
+        part.clear()
+        part.update(headers={}, value=[], size=0, is_file=False)
+
+    def on_header_field(buf, start, end):
+        header[0] += buf[start:end]
+
+    def on_header_value(buf, start, end):
+        header[1] += buf[start:end]
+
+    def on_header_end():
+        part["headers"][header[0].lower()] = header[1]
+        header[0], header[1] = b"", b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["name"] = disposition.get(b"name", b"").decode("utf-8", "replace")
+        filename = disposition.get(b"filename")
+        if part["name"] == file_field and filename is not None:
+            part["is_file"] = True
+            declared = part["headers"].get(b"content-type")
+            started.append((filename.decode("utf-8", "replace"), declared.decode("latin-1") if declared else None))
+
+    def on_part_data(buf, start, end):
+        if part["is_file"]:
+            data.append(bytes(buf[start:end]))
+            return
+        part["size"] += end - start
+        if part["size"] > FORM_FIELD_MAX_SIZE:
+            raise HTTPException(status_code=413, detail=f"Form field '{part['name']}' too large")
+        part["value"].append(bytes(buf[start:end]))
+
+    def on_part_end():
+        if not part["is_file"]:
+            fields[part["name"]] = b"".join(part["value"]).decode("utf-8", "replace")
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    writer: Optional[UploadWriter] = None
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError:
+                raise HTTPException(status_code=400, detail="Malformed multipart body")
+            for filename, declared in started:
+                if writer is not None:
+                    raise HTTPException(status_code=400, detail="Only one file per upload")
+                safe_name = get_safe_filename(filename)
+                writer = await run_in_threadpool(UploadWriter, safe_name, declared)
+            started.clear()
+            if data:
+                await run_in_threadpool(writer.write, b"".join(data))
+                data.clear()
+        parser.finalize()
+        if writer is None:
+            raise HTTPException(status_code=400, detail=f"Missing file part '{file_field}'")
+        stored = await run_in_threadpool(writer.finish)
+    finally:
+        if writer is not None:
+            await run_in_threadpool(writer.discard)
+    return fields, safe_name, stored
+
+def inspect_assembled_upload(path: Path, filename: str, declared: Optional[str], expected_sha256: Optional[str] = None) -> StoredUpload:
+    """
+    Validate and hash a file assembled on disk, without moving it.
+
+    The file is read once to sniff its type and compute the SHA-256.
+    Blocking; call it from a worker thread.
+
+    Args:
+        path: Fully assembled file inside the blob store
+        filename: Sanitized client filename
+        declared: Content-Type declared by the client
+        expected_sha256: Hash announced by the client, if any
+
+    Returns:
+        The file's current path, MIME type, size and SHA-256
+
+    Raises:
+        HTTPException: If the file is not an allowed type or does not match expected_sha256
+    """
+    digest = hashlib.sha256()
+    size = 0
+    mime_type = None
+    with path.open("rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            if mime_type is None:
+                mime_type = resolve_upload_type(chunk, filename, declared)
+            size += len(chunk)
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+    if expected_sha256 and sha256 != expected_sha256:
+        raise HTTPException(status_code=400, detail="Assembled file does not match the announced SHA-256")
+    return StoredUpload(path=str(path), mime_type=mime_type, size=size, sha256=sha256)
+
 def validate_file(file: UploadFile) -> None:
     """
     Validate file type and size.
@@ -1,12 +1,19 @@
 import os
 from datetime import datetime
-from sqlalchemy import text
+from sqlalchemy import text, inspect, bindparam
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .db import engine, SessionLocal
+from .db import engine, async_engine, SessionLocal, pool_status
 from .models import Base
 from .seed import seed_if_empty
-from .routers import projects, tasks, checklists, timeline, activity, files, templates, calendar, closing_pack
+from .stats import backfill_project_stats, ensure_stats_triggers, start_stats_refresher, stop_stats_refresher
+from .change_stream import start_change_relay, stop_change_relay
+from .closing_pack_cache import start_prebuilder, stop_prebuilder
+from .pdf_pages import close_all as close_pdf_handles
+from .preview_worker import start_preview_workers, stop_preview_workers
+from .search_index import ensure_search_index
+from .text_extraction import start_extractor, stop_extractor
+from .routers import projects, tasks, checklists, timeline, activity, files, templates, calendar, closing_pack, sync, uploads, search, changes, batch
 
 app = FastAPI(title="LawFlow API", version="0.1.0")
 
@@ -18,28 +25,58 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Accept-Ranges", "Content-Range", "X-Next-Cursor", "X-Total-Count", "X-Total-Estimated"],
 )
 
-def ensure_bg_color_column():
-    # Add the bg_color column on existing SQLite DBs without recreating tables.
-    try:
-        with engine.connect() as conn:
-            cols = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(projects);")]
-            if "bg_color" not in cols:
-                conn.exec_driver_sql("ALTER TABLE projects ADD COLUMN bg_color VARCHAR(20) DEFAULT '#0b1220'")
-    except Exception:
-        # Table doesn't exist yet, which is fine - it will be created by create_all
-        pass
+def ensure_columns():
+    # Bring databases created by an older create_all up to date with the models: add any
+    # missing columns (backfilled from the column default) and any missing indexes,
+    # without recreating tables.
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}")
+                if col.default is not None and (col.default.is_scalar or col.default.is_callable):
+                    value = col.default.arg if col.default.is_scalar else col.default.arg(None)
+                    backfill = text(f"UPDATE {table.name} SET {col.name} = :value WHERE {col.name} IS NULL")
+                    conn.execute(backfill.bindparams(bindparam("value", type_=col.type)), {"value": value})
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
-    ensure_bg_color_column()
+    ensure_columns()
+    ensure_search_index(engine)
+    ensure_stats_triggers(engine)
     db = SessionLocal()
     try:
         seed_if_empty(db)
+        backfill_project_stats(db)
     finally:
         db.close()
+    start_prebuilder()
+    start_stats_refresher()
+    start_preview_workers()
+    start_extractor()
+    start_change_relay()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    stop_prebuilder()
+    stop_stats_refresher()
+    stop_preview_workers()
+    stop_extractor()
+    stop_change_relay()
+    close_pdf_handles()
+    await async_engine.dispose()
 
 app.include_router(projects.router)
 app.include_router(tasks.router)
@@ -47,9 +84,14 @@ app.include_router(checklists.router)
 app.include_router(timeline.router)
 app.include_router(activity.router)
 app.include_router(files.router)
+app.include_router(uploads.router)
 app.include_router(templates.router)
 app.include_router(calendar.router)
 app.include_router(closing_pack.router)
+app.include_router(sync.router)
+app.include_router(search.router)
+app.include_router(changes.router)
+app.include_router(batch.router)
 
 @app.get("/health")
 def health():
@@ -77,5 +119,9 @@ def detailed_health():
         "components": {
             "database": db_status,
             "api": "ok"
+        },
+        "pools": {
+            "sync": pool_status(engine),
+            "async": pool_status(async_engine.sync_engine),
         }
     }
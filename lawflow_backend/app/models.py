@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, Date, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import String, Integer, Date, DateTime, ForeignKey, Text, Boolean, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from .db import Base
@@ -10,21 +10,27 @@ class Client(Base):
     email: Mapped[str | None] = mapped_column(String(200), nullable=True)
     phone: Mapped[str | None] = mapped_column(String(50), nullable=True)
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime | None] = mapped_column(DateTime, default=datetime.utcnow, nullable=True)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
     projects: Mapped[list["Project"]] = relationship(back_populates="client")
 
 class Project(Base):
     __tablename__ = "projects"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(240))
-    transaction_type: Mapped[str] = mapped_column(String(30))  # Purchase | Sale
-    location: Mapped[str] = mapped_column(String(120))
-    status: Mapped[str] = mapped_column(String(30))
-    risk: Mapped[str] = mapped_column(String(20), default="Normal")
+    transaction_type: Mapped[str] = mapped_column(String(30), index=True)  # Purchase | Sale
+    location: Mapped[str] = mapped_column(String(120), index=True)
+    status: Mapped[str] = mapped_column(String(30), index=True)
+    risk: Mapped[str] = mapped_column(String(20), default="Normal", index=True)
     bg_color: Mapped[str] = mapped_column(String(20), default="#0b1220")
+    change_version: Mapped[int] = mapped_column(Integer, default=0)  # bumped by every write to the matter
     start_date: Mapped[datetime | None] = mapped_column(Date, nullable=True)
-    target_close_date: Mapped[datetime | None] = mapped_column(Date, nullable=True)
+    target_close_date: Mapped[datetime | None] = mapped_column(Date, nullable=True, index=True)
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
-    client_id: Mapped[int | None] = mapped_column(ForeignKey("clients.id"), nullable=True)
+    client_id: Mapped[int | None] = mapped_column(ForeignKey("clients.id"), nullable=True, index=True)
     client: Mapped["Client | None"] = relationship(back_populates="projects")
 
     tasks: Mapped[list["Task"]] = relationship(back_populates="project", cascade="all, delete-orphan")
@@ -35,54 +41,130 @@ class Project(Base):
 class Task(Base):
     __tablename__ = "tasks"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"))
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), index=True)
     title: Mapped[str] = mapped_column(String(240))
-    status: Mapped[str] = mapped_column(String(30))  # Backlog | In Progress | Review | Done
+    status: Mapped[str] = mapped_column(String(30), index=True)  # Backlog | In Progress | Review | Done
     assignee: Mapped[str] = mapped_column(String(80))
-    due_date: Mapped[datetime | None] = mapped_column(Date, nullable=True)
+    due_date: Mapped[datetime | None] = mapped_column(Date, nullable=True, index=True)
     priority: Mapped[str] = mapped_column(String(20), default="Medium")  # Low | Medium | High
     tags: Mapped[str | None] = mapped_column(String(200), nullable=True)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     project: Mapped["Project"] = relationship(back_populates="tasks")
 
 class ChecklistItem(Base):
     __tablename__ = "checklist_items"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"))
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), index=True)
     stage: Mapped[str] = mapped_column(String(40))
     label: Mapped[str] = mapped_column(String(300))
     is_done: Mapped[bool] = mapped_column(Boolean, default=False)
-    due_date: Mapped[datetime | None] = mapped_column(Date, nullable=True)
+    due_date: Mapped[datetime | None] = mapped_column(Date, nullable=True, index=True)
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     project: Mapped["Project"] = relationship(back_populates="checklist_items")
 
 class TimelineItem(Base):
     __tablename__ = "timeline_items"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"))
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), index=True)
     label: Mapped[str] = mapped_column(String(240))
     start_date: Mapped[datetime] = mapped_column(Date)
     end_date: Mapped[datetime] = mapped_column(Date)
     kind: Mapped[str] = mapped_column(String(30), default="Milestone")  # Phase | Milestone
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     project: Mapped["Project"] = relationship(back_populates="timeline_items")
 
 class Activity(Base):
     __tablename__ = "activities"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"))
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
     actor: Mapped[str] = mapped_column(String(120))
     verb: Mapped[str] = mapped_column(String(120))
     detail: Mapped[str | None] = mapped_column(Text, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
     project: Mapped["Project"] = relationship(back_populates="activities")
 
 class FileItem(Base):
     __tablename__ = "files"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"))
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), index=True)
     filename: Mapped[str] = mapped_column(String(260))
     stored_path: Mapped[str] = mapped_column(String(520))
     mime_type: Mapped[str | None] = mapped_column(String(120), nullable=True)
     uploaded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     uploader: Mapped[str] = mapped_column(String(120), default="Ana López")
+    file_size: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    preview_path: Mapped[str | None] = mapped_column(String(520), nullable=True)
+    thumbnail_path: Mapped[str | None] = mapped_column(String(520), nullable=True)
+    preview_status: Mapped[str | None] = mapped_column(String(20), nullable=True, index=True)  # pending | processing | ready | failed | skipped
+    preview_attempts: Mapped[int] = mapped_column(Integer, default=0)
+    preview_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    preview_claimed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)  # when a worker took the job
+    extract_status: Mapped[str | None] = mapped_column(String(20), nullable=True, index=True)  # pending | processing | ready | failed | skipped
+    extract_claimed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)  # renewed while a worker extracts
+    is_deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     project: Mapped["Project"] = relationship()
+
+class DocumentChunk(Base):
+    # Text extracted from an uploaded document (app/text_extraction.py), one row per page
+    # or ~TEXT_CHUNK_CHARS of text, indexed for search as kind "document".
+    __tablename__ = "document_chunks"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    file_id: Mapped[int] = mapped_column(ForeignKey("files.id"), index=True)
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), index=True)  # denormalised for search filters
+    seq: Mapped[int] = mapped_column(Integer)  # 0-based position; PDFs: page number - 1
+    text: Mapped[str] = mapped_column(Text)
+
+class UploadSession(Base):
+    # Resumable upload in progress (app/routers/uploads.py). The body is assembled in a
+    # preallocated file in the blob store; each received byte range is an UploadChunk.
+    __tablename__ = "upload_sessions"
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), index=True)
+    filename: Mapped[str] = mapped_column(String(260))
+    mime_type: Mapped[str | None] = mapped_column(String(120), nullable=True)  # as declared by the client; sniffed once stored
+    uploader: Mapped[str] = mapped_column(String(120), default="Ana López")
+    size: Mapped[int] = mapped_column(Integer)
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)  # optional, checked on finalize; actual once stored
+    status: Mapped[str] = mapped_column(String(20), default="open")  # open | finalizing | stored | linking | complete
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)  # when a finalize took the session
+    file_id: Mapped[int | None] = mapped_column(ForeignKey("files.id"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    chunks: Mapped[list["UploadChunk"]] = relationship(cascade="all, delete-orphan", order_by="UploadChunk.offset")
+
+class UploadChunk(Base):
+    __tablename__ = "upload_chunks"
+    session_id: Mapped[str] = mapped_column(ForeignKey("upload_sessions.id"), primary_key=True)
+    offset: Mapped[int] = mapped_column(Integer, primary_key=True)
+    length: Mapped[int] = mapped_column(Integer)
+
+class ProjectStats(Base):
+    # Dashboard rollup, one row per project, rewritten by database triggers in the same
+    # statement as every write that can change it (see app/stats.py).
+    __tablename__ = "project_stats"
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), primary_key=True)
+    status: Mapped[str] = mapped_column(String(30))
+    risk: Mapped[str] = mapped_column(String(20))
+    target_close_date: Mapped[datetime | None] = mapped_column(Date, nullable=True)
+    open_tasks: Mapped[int] = mapped_column(Integer, default=0)
+    done_tasks: Mapped[int] = mapped_column(Integer, default=0)
+    overdue_tasks: Mapped[int] = mapped_column(Integer, default=0)
+    next_due_date: Mapped[datetime | None] = mapped_column(Date, nullable=True)  # earliest open task not yet overdue
+    checklist_total: Mapped[int] = mapped_column(Integer, default=0)
+    checklist_done: Mapped[int] = mapped_column(Integer, default=0)
+    checklist_by_stage: Mapped[dict] = mapped_column(JSON, default=dict)  # {stage: {"done": n, "total": n}}
+    computed_on: Mapped[datetime] = mapped_column(Date)  # day overdue_tasks/next_due_date were evaluated for
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
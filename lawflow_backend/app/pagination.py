@@ -1,7 +1,12 @@
-from typing import Generic, TypeVar, Optional, List
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Generic, TypeVar, Optional, List, Dict
+from fastapi import HTTPException, Query as QueryParam, Response
 from pydantic import BaseModel, Field
-from sqlalchemy import desc, asc
-from sqlalchemy.orm import Query
+from sqlalchemy import desc, asc, and_, or_, func, select, text
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import Select
 
 T = TypeVar('T')
 
@@ -67,4 +72,257 @@ def paginate_query(
         pages=pages,
         has_next=has_next,
         has_prev=has_prev
-    )
\ No newline at end of file
+    )
+
+
+# ---------------------------------------------------------------------------
+# Keyset (cursor) pagination
+#
+# Instead of OFFSET, each page continues from the sort key and id of the last
+# row the client saw, so page N costs the same as page 1 and rows inserted
+# meanwhile never shift the window. Totals are optional because counting is
+# usually the most expensive part of a page.
+# ---------------------------------------------------------------------------
+
+class CursorParams(BaseModel):
+    cursor: Optional[str] = Field(None, description="Opaque cursor from X-Next-Cursor")
+    limit: Optional[int] = Field(None, gt=0, le=500, description="Items per page")
+    sort_by: Optional[str] = Field(None, description="Field to sort by")
+    sort_order: Optional[str] = Field(None, pattern="^(asc|desc)$", description="Sort order: 'asc' or 'desc'")
+    total: str = Field("none", pattern="^(none|exact|estimate)$", description="Total count: 'none', 'exact' or 'estimate'")
+
+def cursor_params(
+    cursor: Optional[str] = QueryParam(None, description="Opaque cursor from X-Next-Cursor"),
+    limit: Optional[int] = QueryParam(None, gt=0, le=500, description="Items per page"),
+    sort_by: Optional[str] = QueryParam(None, description="Field to sort by"),
+    sort_order: Optional[str] = QueryParam(None, pattern="^(asc|desc)$", description="Sort order: 'asc' or 'desc'"),
+    total: str = QueryParam("none", pattern="^(none|exact|estimate)$", description="Total count: 'none', 'exact' or 'estimate'"),
+) -> CursorParams:
+    """FastAPI dependency collecting keyset pagination query parameters."""
+    return CursorParams(cursor=cursor, limit=limit, sort_by=sort_by, sort_order=sort_order, total=total)
+
+class SortKey:
+    """
+    A whitelisted sort field.
+
+    Nullable columns are given a ``null_value`` so they sort (and compare in
+    the keyset condition) as that value instead of NULL.
+    """
+
+    def __init__(self, column, null_value: Any = None):
+        self.column = column
+        self.null_value = null_value
+
+    @property
+    def expression(self):
+        if self.null_value is None:
+            return self.column
+        return func.coalesce(self.column, self.null_value)
+
+    def value_of(self, obj) -> Any:
+        value = getattr(obj, self.column.key)
+        return self.null_value if value is None else value
+
+    def check(self, value: Any) -> Any:
+        """
+        Validate a key read back from a cursor before it is bound into the query.
+
+        Raises:
+            ValueError: If the value is not of the column's Python type
+        """
+        if value is None and self.null_value is not None:
+            return self.null_value
+        if type(value) is not self.column.type.python_type:
+            raise ValueError(f"cursor key of type {type(value).__name__}")
+        return value
+
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_estimated: bool = False
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    if isinstance(value, dict) and "d" in value:
+        return date.fromisoformat(value["d"])
+    return value
+
+def encode_cursor(sort_by: str, sort_order: str, key: Any, last_id: int) -> str:
+    """Pack the position after the last returned row into an opaque cursor."""
+    raw = json.dumps([sort_by, sort_order, _encode_value(key), last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str, sort_key: Optional[SortKey] = None) -> tuple[Any, int]:
+    """
+    Unpack a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Opaque cursor from a previous page
+        sort_by: Requested sort field
+        sort_order: "asc" or "desc"
+        sort_key: The field's SortKey; the decoded key is checked against its column type
+
+    Raises:
+        HTTPException: If the cursor is malformed or was issued for a different sort
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        c_sort_by, c_sort_order, key, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        key = _decode_value(key)
+        if sort_key is not None:
+            key = sort_key.check(key)
+        if type(last_id) is not int:
+            raise TypeError("cursor id must be an integer")
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (c_sort_by, c_sort_order) != (sort_by, sort_order):
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+    return key, last_id
+
+def estimate_count(db: Session, stmt: Select) -> Optional[int]:
+    """
+    Row estimate for a query from the Postgres planner, without running it.
+
+    Returns:
+        Estimated row count, or None on backends without planner statistics
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    sql = stmt.order_by(None).compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def count_rows(db: Session, stmt: Select, mode: str) -> tuple[Optional[int], bool]:
+    """
+    Total for a paginated query according to the requested mode.
+
+    Args:
+        db: Database session
+        stmt: The unpaginated query
+        mode: 'none', 'exact' or 'estimate' ('estimate' falls back to an exact
+            count where no planner estimate is available)
+
+    Returns:
+        Tuple of (total, whether the total is an estimate)
+    """
+    if mode == "none":
+        return None, False
+    if mode == "estimate":
+        estimate = estimate_count(db, stmt)
+        if estimate is not None:
+            return estimate, True
+    total = db.execute(select(func.count()).select_from(stmt.order_by(None).subquery())).scalar()
+    return total, False
+
+def keyset_statement(
+    stmt: Select,
+    params: CursorParams,
+    sort_key: SortKey,
+    id_column,
+    sort_by: str,
+    sort_order: str,
+) -> Select:
+    """
+    Apply keyset ordering, the cursor condition and the page limit to a query.
+
+    One extra row is requested so the caller can tell whether another page exists.
+    """
+    key_expr = sort_key.expression
+    if sort_order == "desc":
+        stmt = stmt.order_by(desc(key_expr), desc(id_column))
+    else:
+        stmt = stmt.order_by(asc(key_expr), asc(id_column))
+
+    if params.cursor:
+        key, last_id = decode_cursor(params.cursor, sort_by, sort_order, sort_key)
+        if sort_order == "desc":
+            stmt = stmt.where(or_(key_expr < key, and_(key_expr == key, id_column < last_id)))
+        else:
+            stmt = stmt.where(or_(key_expr > key, and_(key_expr == key, id_column > last_id)))
+
+    if params.limit is not None:
+        stmt = stmt.limit(params.limit + 1)
+    return stmt
+
+def build_page(rows: list, params: CursorParams, sort_key: SortKey, sort_by: str, sort_order: str) -> CursorPage:
+    """Trim the look-ahead row and compute the cursor for the next page."""
+    next_cursor = None
+    if params.limit is not None and len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_by, sort_order, sort_key.value_of(last), last.id)
+    return CursorPage(items=rows, next_cursor=next_cursor)
+
+def resolve_sort(
+    params: CursorParams,
+    sort_fields: Dict[str, SortKey],
+    default_sort: str,
+    default_order: str,
+) -> tuple[str, str]:
+    """
+    Validate the requested sort against the endpoint's whitelist.
+
+    Raises:
+        HTTPException: If the sort field is not allowed
+    """
+    sort_by = params.sort_by or default_sort
+    if sort_by not in sort_fields:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot sort by '{sort_by}'. Allowed: {', '.join(sort_fields)}"
+        )
+    return sort_by, params.sort_order or default_order
+
+def keyset_paginate(
+    db: Session,
+    stmt: Select,
+    params: CursorParams,
+    sort_fields: Dict[str, SortKey],
+    id_column,
+    default_sort: str,
+    default_order: str = "asc",
+) -> CursorPage:
+    """
+    Run one page of a keyset-paginated query.
+
+    Takes a sync session; async endpoints call it through ``AsyncSession.run_sync``.
+
+    Args:
+        db: Database session
+        stmt: Filtered, unordered select of ORM entities
+        params: Cursor pagination parameters
+        sort_fields: Whitelisted sort fields for this endpoint
+        id_column: Primary key column used as the tie-breaker
+        default_sort: Sort field used when none is requested
+        default_order: Sort order used when none is requested
+
+    Returns:
+        CursorPage with the items, next cursor and optional total
+    """
+    sort_by, sort_order = resolve_sort(params, sort_fields, default_sort, default_order)
+    sort_key = sort_fields[sort_by]
+    page_stmt = keyset_statement(stmt, params, sort_key, id_column, sort_by, sort_order)
+    rows = list(db.execute(page_stmt).scalars().all())
+    page = build_page(rows, params, sort_key, sort_by, sort_order)
+    page.total, page.total_estimated = count_rows(db, stmt, params.total)
+    return page
+
+def set_page_headers(response: Response, page: CursorPage) -> None:
+    """Expose paging metadata as headers so list endpoints can keep returning plain arrays."""
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if page.total is not None:
+        response.headers["X-Total-Count"] = str(page.total)
+        if page.total_estimated:
+            response.headers["X-Total-Estimated"] = "true"
@@ -0,0 +1,116 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+import fitz  # PyMuPDF
+from .preview_utils import UNBOUNDED, rasterise_page, save_image
+
+# Open documents kept around for the page viewer. Reopening a large PDF means
+# re-reading its xref and page tree, which costs more than rendering one page.
+PDF_HANDLE_CACHE_SIZE = int(os.getenv("PDF_HANDLE_CACHE_SIZE", "8"))
+
+# path -> (document, lock). MuPDF documents are not thread-safe, so each handle
+# is used by one request thread at a time.
+_handles: "OrderedDict[str, tuple[fitz.Document, threading.Lock]]" = OrderedDict()
+_handles_lock = threading.Lock()
+
+@contextmanager
+def open_pdf(path: Path) -> Iterator[fitz.Document]:
+    """
+    Borrow an open document from the handle cache, opening it on a miss.
+
+    The least recently used handle is closed once more than
+    PDF_HANDLE_CACHE_SIZE documents are open. Stored files are content
+    addressed and never rewritten, so a cached handle cannot go stale.
+
+    Args:
+        path: Stored PDF
+
+    Yields:
+        The document, locked for the caller until the block exits
+    """
+    key = str(path)
+    while True:
+        with _handles_lock:
+            entry = _handles.get(key)
+            if entry is not None:
+                _handles.move_to_end(key)
+        if entry is None:
+            entry = _add_handle(key, fitz.open(path))
+        doc, lock = entry
+        with lock:
+            if doc.is_closed:
+                continue  # evicted between lookup and lock; open it again
+            yield doc
+            return
+
+def _add_handle(key: str, doc: fitz.Document) -> tuple:
+    evicted = []
+    with _handles_lock:
+        existing = _handles.get(key)
+        if existing is not None:
+            entry = existing  # another thread opened it meanwhile
+            evicted.append((doc, threading.Lock()))
+        else:
+            entry = _handles[key] = (doc, threading.Lock())
+            while len(_handles) > PDF_HANDLE_CACHE_SIZE:
+                evicted.append(_handles.popitem(last=False)[1])
+    for old_doc, old_lock in evicted:
+        with old_lock:  # wait for a render in progress on it
+            old_doc.close()
+    return entry
+
+def close_all() -> None:
+    """Close every cached document handle."""
+    with _handles_lock:
+        entries = list(_handles.values())
+        _handles.clear()
+    for doc, lock in entries:
+        with lock:
+            doc.close()
+
+def page_count(path: Path) -> int:
+    """Number of pages of a stored PDF."""
+    with open_pdf(path) as doc:
+        return doc.page_count
+
+def page_sizes(path: Path) -> list[tuple[float, float]]:
+    """
+    Size of every page in PDF points, after rotation.
+
+    Args:
+        path: Stored PDF
+
+    Returns:
+        (width, height) per page, in page order
+    """
+    with open_pdf(path) as doc:
+        return [(page.rect.width, page.rect.height) for page in doc]
+
+def render_page(path: Path, page_number: int, width: int, image_format: str, output_path: Path) -> bool:
+    """
+    Render one page of a PDF at a given width.
+
+    Args:
+        path: Stored PDF
+        page_number: One-based page number
+        width: Target width in pixels
+        image_format: "webp" or "jpeg"
+        output_path: Path where to save the image
+
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        with open_pdf(path) as doc:
+            if not 1 <= page_number <= doc.page_count:
+                return False
+            img = rasterise_page(doc[page_number - 1], (width, UNBOUNDED))
+        with img:  # encoding doesn't need the document
+            save_image(img, image_format, output_path)
+        return True
+    except Exception as e:
+        print(f"Error rendering page {page_number} of {path}: {e}")
+        return False
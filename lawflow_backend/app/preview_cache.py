@@ -0,0 +1,128 @@
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Optional
+from fastapi import HTTPException
+from .disk_cache import touch, evict_lru
+from .pdf_pages import render_page
+from .preview_utils import render_preview
+
+PREVIEW_CACHE_DIR = Path(os.getenv("PREVIEW_CACHE_DIR", "./previews"))
+PREVIEW_CACHE_MAX_MB = int(os.getenv("PREVIEW_CACHE_MAX_MB", "512"))
+PREVIEW_RENDER_CONCURRENCY = int(os.getenv("PREVIEW_RENDER_CONCURRENCY", "2"))  # cache misses rendered at once per process
+PREVIEW_RENDER_WAIT = float(os.getenv("PREVIEW_RENDER_WAIT", "10"))  # seconds a request waits for a render slot
+
+# Requested widths are rounded up to one of these so the cache holds a handful of
+# variants per file instead of one per pixel width a client happens to ask for.
+PREVIEW_WIDTHS = (160, 320, 640, 1280)
+# Variants rendered ahead of time by the preview worker (grid thumbnail, drawer preview)
+THUMBNAIL_WIDTH = 320
+PREVIEW_WIDTH = 1280
+
+IMAGE_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+_render_slots = threading.BoundedSemaphore(PREVIEW_RENDER_CONCURRENCY)
+
+def snap_width(width: int) -> int:
+    """Smallest supported width that is at least ``width`` (or the largest one)."""
+    for w in PREVIEW_WIDTHS:
+        if w >= width:
+            return w
+    return PREVIEW_WIDTHS[-1]
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """WebP for clients that advertise it, JPEG otherwise."""
+    return "webp" if accept and "image/webp" in accept else "jpeg"
+
+def cache_path(key: str, width: int, image_format: str) -> Path:
+    """Location of a rendered variant; ``key`` identifies the file content (its sha256)."""
+    ext = "jpg" if image_format == "jpeg" else image_format
+    return PREVIEW_CACHE_DIR / key[:2] / f"{key}_{width}.{ext}"
+
+def page_cache_path(key: str, page_number: int, width: int, image_format: str) -> Path:
+    """Location of a rendered PDF page; pages share the preview cache and its size limit."""
+    ext = "jpg" if image_format == "jpeg" else image_format
+    return PREVIEW_CACHE_DIR / key[:2] / f"{key}_p{page_number}_{width}.{ext}"
+
+def _get_or_create(path: Path, render: Callable[[Path], bool]) -> Optional[Path]:
+    # Cache lookup / atomic render / eviction shared by previews and PDF pages
+    if touch(path):
+        return path
+    # Renders run on request threads; a burst of cold previews must not take them all
+    if not _render_slots.acquire(timeout=PREVIEW_RENDER_WAIT):
+        raise HTTPException(status_code=503, detail="Too many previews being rendered", headers={"Retry-After": "2"})
+    try:
+        if touch(path):
+            return path  # rendered by the request we waited behind
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{uuid.uuid4().hex}.tmp")
+        try:
+            if not render(tmp):
+                return None
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+    finally:
+        _render_slots.release()
+    evict_lru(PREVIEW_CACHE_DIR, "*/*_*.*", PREVIEW_CACHE_MAX_MB * 1024 * 1024)
+    return path
+
+def get_or_render(source: Path, mime_type: str, key: str, width: int, image_format: str) -> Optional[Path]:
+    """
+    Return a cached preview variant, rendering it on first use.
+
+    Rendering goes to a temporary file that is renamed into place, so
+    concurrent requests for the same variant never see a partial image.
+    At most PREVIEW_RENDER_CONCURRENCY renders run at once; a request that
+    waits longer than PREVIEW_RENDER_WAIT for a slot gets a 503. The cache
+    is trimmed to PREVIEW_CACHE_MAX_MB (least recently used first) after
+    each new variant.
+
+    Args:
+        source: Stored file
+        mime_type: Its MIME type
+        key: Content key (sha256) the variant is cached under
+        width: Width from PREVIEW_WIDTHS
+        image_format: Key of IMAGE_FORMATS
+
+    Returns:
+        Path of the variant, or None if the file cannot be previewed
+    """
+    return _get_or_create(
+        cache_path(key, width, image_format),
+        lambda tmp: render_preview(source, mime_type, width, image_format, tmp),
+    )
+
+def get_or_render_page(source: Path, key: str, page_number: int, width: int, image_format: str) -> Optional[Path]:
+    """
+    Return a cached PDF page image, rendering only that page on first use.
+
+    Args:
+        source: Stored PDF
+        key: Content key (sha256) the page is cached under
+        page_number: One-based page number
+        width: Width from PREVIEW_WIDTHS
+        image_format: Key of IMAGE_FORMATS
+
+    Returns:
+        Path of the image, or None if the page cannot be rendered
+    """
+    return _get_or_create(
+        page_cache_path(key, page_number, width, image_format),
+        lambda tmp: render_page(source, page_number, width, image_format, tmp),
+    )
+
+def prerender(source: Path, mime_type: str, key: str) -> bool:
+    """
+    Warm the cache with the thumbnail and preview variants of a new upload.
+
+    The variants are ordinary cache entries and may be evicted later, so
+    callers must not keep their paths; /files/{id}/preview renders them
+    again on demand.
+
+    Returns:
+        True if at least one variant could be rendered
+    """
+    rendered = [get_or_render(source, mime_type, key, width, "jpeg") for width in (THUMBNAIL_WIDTH, PREVIEW_WIDTH)]
+    return any(rendered)
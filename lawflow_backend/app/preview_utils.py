@@ -1,5 +1,4 @@
 import os
-import io
 from pathlib import Path
 from typing import Optional, Tuple
 from PIL import Image
@@ -16,6 +15,71 @@ THUMBNAIL_DIR.mkdir(parents=True, exist_ok=True)
 THUMBNAIL_SIZE = (200, 200)
 PREVIEW_SIZE = (800, 600)
 
+# Upper bound for the height when only a width is targeted
+UNBOUNDED = 65000
+
+def load_image_for_box(image_path: Path, box: Tuple[int, int]) -> Image.Image:
+    """
+    Decode an image only as far as needed to fit it into ``box``.
+
+    JPEGs are decoded in draft mode, letting libjpeg scale by 1/2, 1/4 or 1/8
+    while decoding, so a 24 MP scan never has to be fully materialised for
+    a thumbnail. Images are never upscaled.
+
+    Args:
+        image_path: Path to the source image
+        box: (width, height) the result must fit into
+
+    Returns:
+        RGB (or greyscale) image fitting the box
+    """
+    img = Image.open(image_path)
+    scale = min(box[0] / img.width, box[1] / img.height, 1.0)
+    target = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    if img.mode in ("P", "1", "RGBA", "LA", "PA"):
+        # Palette/bilevel images can't be resampled smoothly and alpha must be flattened first
+        img = img.convert("RGB")
+    elif img.format == "JPEG":
+        img.draft("RGB", target)  # decodes to the smallest 1/2^n scale still >= target
+    img.thumbnail(box, Image.Resampling.LANCZOS)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    return img
+
+def render_pdf_page(pdf_path: Path, box: Tuple[int, int], page_number: int = 0) -> Optional[Image.Image]:
+    """
+    Rasterise a PDF page straight to the size it is needed at.
+
+    The render matrix is chosen so MuPDF produces a pixmap that already
+    fits ``box``, and its RGB samples are handed to PIL directly; there is
+    no oversized render, PNG encode/decode round trip or resample.
+
+    Args:
+        pdf_path: Path to the PDF file
+        box: (width, height) the page must fit into
+        page_number: Zero-based page to render
+
+    Returns:
+        RGB image, or None if the page does not exist
+    """
+    with fitz.open(pdf_path) as doc:
+        if page_number >= doc.page_count:
+            return None
+        return rasterise_page(doc[page_number], box)
+
+def rasterise_page(page: "fitz.Page", box: Tuple[int, int]) -> Image.Image:
+    """Render an already loaded PDF page so that it fits ``box`` (see render_pdf_page)."""
+    zoom = min(box[0] / page.rect.width, box[1] / page.rect.height)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB, alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples_mv)
+
+def save_image(img: Image.Image, image_format: str, output_path: Path) -> None:
+    """Encode a rendered preview as "webp" or "jpeg"."""
+    if image_format == "webp":
+        img.save(output_path, "WEBP", quality=80, method=4)
+    else:
+        img.save(output_path, "JPEG", quality=85, optimize=True, progressive=True)
+
 def generate_image_thumbnail(image_path: Path, output_path: Path) -> bool:
     """
     Generate a thumbnail for an image file.
@@ -28,15 +92,7 @@ def generate_image_thumbnail(image_path: Path, output_path: Path) -> bool:
         True if successful, False otherwise
     """
     try:
-        with Image.open(image_path) as img:
-            # Convert to RGB if necessary
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-
-            # Create thumbnail
-            img.thumbnail(THUMBNAIL_SIZE)
-
-            # Save as JPEG
+        with load_image_for_box(image_path, THUMBNAIL_SIZE) as img:
             img.save(output_path, "JPEG", quality=85)
             return True
     except Exception as e:
@@ -55,15 +111,7 @@ def generate_image_preview(image_path: Path, output_path: Path) -> bool:
         True if successful, False otherwise
     """
     try:
-        with Image.open(image_path) as img:
-            # Convert to RGB if necessary
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-
-            # Resize maintaining aspect ratio
-            img.thumbnail(PREVIEW_SIZE, Image.Resampling.LANCZOS)
-
-            # Save as JPEG
+        with load_image_for_box(image_path, PREVIEW_SIZE) as img:
             img.save(output_path, "JPEG", quality=90)
             return True
     except Exception as e:
@@ -82,26 +130,11 @@ def generate_pdf_preview(pdf_path: Path, output_path: Path) -> bool:
         True if successful, False otherwise
     """
     try:
-        doc = fitz.open(pdf_path)
-        if doc.page_count == 0:
+        img = render_pdf_page(pdf_path, PREVIEW_SIZE)
+        if img is None:
             return False
-
-        # Get first page
-        page = doc[0]
-
-        # Render page to image
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x scaling for better quality
-
-        # Convert to PIL Image
-        img = Image.open(io.BytesIO(pix.tobytes("png")))
-
-        # Resize maintaining aspect ratio
-        img.thumbnail(PREVIEW_SIZE, Image.Resampling.LANCZOS)
-
-        # Save as JPEG
-        img.save(output_path, "JPEG", quality=90)
-
-        doc.close()
+        with img:
+            img.save(output_path, "JPEG", quality=90)
         return True
     except Exception as e:
         print(f"Error generating PDF preview for {pdf_path}: {e}")
@@ -150,6 +183,41 @@ def generate_previews(file_path: Path, mime_type: str, base_filename: str) -> Tu
 
     return thumbnail_path, preview_path
 
+def render_preview(file_path: Path, mime_type: str, width: int, image_format: str, output_path: Path) -> bool:
+    """
+    Render a file (an image, or the first page of a PDF) at a given width.
+
+    Images are never upscaled. PDF pages are rasterised directly at the
+    requested width (see render_pdf_page).
+
+    Args:
+        file_path: Path to the source file
+        mime_type: MIME type of the file
+        width: Target width in pixels
+        image_format: "webp" or "jpeg"
+        output_path: Path where to save the image
+
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        box = (width, UNBOUNDED)
+        if is_pdf_file(mime_type):
+            img = render_pdf_page(file_path, box)
+            if img is None:
+                return False
+        elif is_image_file(mime_type):
+            img = load_image_for_box(file_path, box)
+        else:
+            return False
+
+        with img:
+            save_image(img, image_format, output_path)
+        return True
+    except Exception as e:
+        print(f"Error rendering {width}px preview for {file_path}: {e}")
+        return False
+
 def cleanup_previews(thumbnail_path: Optional[str], preview_path: Optional[str]):
     """
     Clean up preview files.
@@ -0,0 +1,231 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import select, update
+from .db import SessionLocal
+from .etag import bump_project_version
+from .file_utils import is_image_file, is_pdf_file
+from .models import FileItem
+
+logger = logging.getLogger(__name__)
+
+# Concurrent render processes (0 disables the worker; jobs stay pending)
+PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", "2"))
+PREVIEW_TIMEOUT = float(os.getenv("PREVIEW_TIMEOUT", "60"))  # seconds per job
+PREVIEW_MAX_ATTEMPTS = int(os.getenv("PREVIEW_MAX_ATTEMPTS", "3"))
+PREVIEW_RETRY_DELAY = float(os.getenv("PREVIEW_RETRY_DELAY", "30"))  # seconds, multiplied by the attempt number
+# A "processing" claim older than this belongs to a worker that died; keep it above PREVIEW_TIMEOUT
+PREVIEW_CLAIM_TIMEOUT = float(os.getenv("PREVIEW_CLAIM_TIMEOUT", "600"))
+
+# preview_status values
+PREVIEW_PENDING = "pending"
+PREVIEW_PROCESSING = "processing"
+PREVIEW_READY = "ready"
+PREVIEW_FAILED = "failed"
+PREVIEW_SKIPPED = "skipped"  # type has no preview
+
+_jobs: "queue.Queue[Optional[int]]" = queue.Queue()
+_threads: list[threading.Thread] = []
+_stopping = threading.Event()
+_mp_context = None
+
+def is_previewable(mime_type: Optional[str]) -> bool:
+    return bool(mime_type) and (is_image_file(mime_type) or is_pdf_file(mime_type))
+
+def initial_preview_status(mime_type: Optional[str]) -> str:
+    """preview_status for a newly stored file."""
+    return PREVIEW_PENDING if is_previewable(mime_type) else PREVIEW_SKIPPED
+
+def _render(file_path: str, mime_type: str, key: str, conn) -> None:
+    # Runs in the child process
+    from .preview_cache import prerender
+    try:
+        conn.send(("ok", prerender(Path(file_path), mime_type, key)))
+    except Exception as e:
+        conn.send(("error", repr(e)))
+    finally:
+        conn.close()
+
+def _get_context():
+    # Children come from a forkserver that has already imported PIL and PyMuPDF, so
+    # starting one per job is cheap, and a job past its timeout can simply be killed.
+    global _mp_context
+    if _mp_context is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _mp_context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            _mp_context.set_forkserver_preload(["app.preview_cache"])
+    return _mp_context
+
+def render_in_subprocess(file_path: str, mime_type: str, key: str, timeout: float) -> None:
+    """
+    Render a file's thumbnail and preview into the preview cache in a separate process.
+
+    Args:
+        file_path: Stored file to render
+        mime_type: Its MIME type
+        key: Content key the images are cached under
+        timeout: Seconds before the process is killed
+
+    Raises:
+        TimeoutError: If rendering took longer than ``timeout``
+        RuntimeError: If the child failed or produced nothing
+    """
+    ctx = _get_context()
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_render, args=(file_path, mime_type, key, child_conn), daemon=True)
+    proc.start()
+    child_conn.close()
+    try:
+        if not parent_conn.poll(timeout):
+            raise TimeoutError(f"preview timed out after {timeout:.0f}s")
+        status, payload = parent_conn.recv()
+    except EOFError:
+        raise RuntimeError(f"preview process exited with code {proc.exitcode}")
+    finally:
+        parent_conn.close()
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+    if status != "ok":
+        raise RuntimeError(payload)
+    if not payload:
+        raise RuntimeError("no preview could be generated")
+
+def _claim(db, file_id: int) -> Optional[FileItem]:
+    project_id = db.execute(
+        update(FileItem)
+        .where(FileItem.id == file_id, FileItem.preview_status == PREVIEW_PENDING)
+        .values(
+            preview_status=PREVIEW_PROCESSING,
+            preview_attempts=FileItem.preview_attempts + 1,
+            preview_claimed_at=datetime.utcnow(),
+        )
+        .returning(FileItem.project_id)
+    ).scalar()
+    if project_id is None:
+        db.rollback()
+        return None
+    # preview_status is part of the file lists, whose ETags follow the project version
+    bump_project_version(db, project_id)
+    db.commit()
+    return db.get(FileItem, file_id)
+
+def process_job(file_id: int) -> None:
+    """Render one file's previews and record the outcome, scheduling a retry on failure."""
+    db = SessionLocal()
+    try:
+        item = _claim(db, file_id)
+        if item is None:
+            return  # already handled (or claimed by another worker process)
+
+        # Identical content uploaded before: the cache is keyed by sha256, so its images are ours
+        if item.sha256:
+            done = db.execute(
+                select(FileItem.id).where(
+                    FileItem.sha256 == item.sha256,
+                    FileItem.id != item.id,
+                    FileItem.preview_status == PREVIEW_READY,
+                ).limit(1)
+            ).first()
+            if done:
+                item.preview_status = PREVIEW_READY
+                bump_project_version(db, item.project_id)
+                db.commit()
+                return
+
+        try:
+            base = item.sha256 or f"file{item.id}"  # the key /files/{id}/preview looks up
+            render_in_subprocess(item.stored_path, item.mime_type, base, PREVIEW_TIMEOUT)
+        except Exception as e:
+            retry = item.preview_attempts < PREVIEW_MAX_ATTEMPTS
+            item.preview_status = PREVIEW_PENDING if retry else PREVIEW_FAILED
+            item.preview_error = str(e)[:1000]
+            bump_project_version(db, item.project_id)
+            db.commit()
+            logger.warning("Preview for file %s failed (attempt %s): %s", file_id, item.preview_attempts, e)
+            if retry:
+                timer = threading.Timer(PREVIEW_RETRY_DELAY * item.preview_attempts, enqueue_preview, args=(file_id,))
+                timer.daemon = True
+                timer.start()
+            return
+
+        # No image paths are stored: cache entries can be evicted, and /files/{id}/preview re-renders them
+        item.preview_status = PREVIEW_READY
+        item.preview_error = None
+        bump_project_version(db, item.project_id)
+        db.commit()
+    finally:
+        db.close()
+
+def _worker_loop():
+    while True:
+        file_id = _jobs.get()
+        if file_id is None or _stopping.is_set():
+            return
+        try:
+            process_job(file_id)
+        except Exception:
+            logger.exception("Preview job for file %s crashed", file_id)
+
+def enqueue_preview(file_id: int) -> None:
+    """Queue a file for preview generation. Call after the row has been committed."""
+    if not _stopping.is_set():
+        _jobs.put(file_id)
+
+def requeue_unfinished() -> int:
+    """
+    Put back every file whose preview never completed.
+
+    Rows claimed more than PREVIEW_CLAIM_TIMEOUT ago and still "processing"
+    belong to a worker that died mid-job (e.g. a restart) and are reset to
+    pending first. Fresher claims are left to the worker process holding them.
+    """
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=PREVIEW_CLAIM_TIMEOUT)
+        project_ids = db.execute(
+            update(FileItem)
+            .where(
+                FileItem.preview_status == PREVIEW_PROCESSING,
+                (FileItem.preview_claimed_at.is_(None)) | (FileItem.preview_claimed_at < cutoff),
+            )
+            .values(preview_status=PREVIEW_PENDING)
+            .returning(FileItem.project_id)
+        ).scalars().all()
+        for project_id in sorted(set(project_ids)):
+            bump_project_version(db, project_id)
+        db.commit()
+        ids = db.execute(
+            select(FileItem.id).where(FileItem.preview_status == PREVIEW_PENDING).order_by(FileItem.id)
+        ).scalars().all()
+    finally:
+        db.close()
+    for file_id in ids:
+        enqueue_preview(file_id)
+    return len(ids)
+
+def start_preview_workers() -> None:
+    """Start the worker threads (each drives one render process at a time) and requeue unfinished jobs."""
+    if PREVIEW_WORKERS <= 0 or _threads:
+        return
+    _stopping.clear()
+    for i in range(PREVIEW_WORKERS):
+        t = threading.Thread(target=_worker_loop, name=f"preview-worker-{i}", daemon=True)
+        t.start()
+        _threads.append(t)
+    requeue_unfinished()
+
+def stop_preview_workers() -> None:
+    """Stop taking jobs; jobs still queued are picked up again by requeue_unfinished on the next start."""
+    _stopping.set()
+    for _ in _threads:
+        _jobs.put(None)
+    for t in _threads:
+        t.join(timeout=5)  # a render in flight stays "processing" until its claim times out (PREVIEW_CLAIM_TIMEOUT)
+    _threads.clear()
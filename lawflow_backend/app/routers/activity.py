@@ -1,11 +1,35 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..db import get_db
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import get_async_db
+from ..etag import conditional_get
 from ..models import Activity
+from ..pagination import CursorParams, SortKey, cursor_params, keyset_paginate, set_page_headers
 from ..schemas import ActivityOut
 
 router = APIRouter(prefix="/activity", tags=["activity"])
 
+ACTIVITY_PAGE_SIZE = 100
+
+ACTIVITY_SORT_FIELDS = {
+    "created_at": SortKey(Activity.created_at),
+    "id": SortKey(Activity.id),
+}
+
 @router.get("", response_model=list[ActivityOut])
-def list_activity(project_id: int, db: Session = Depends(get_db)):
-    return db.query(Activity).filter(Activity.project_id == project_id).order_by(Activity.created_at.desc()).limit(100).all()
+async def list_activity(
+    request: Request,
+    response: Response,
+    project_id: int,
+    params: CursorParams = Depends(cursor_params),
+    db: AsyncSession = Depends(get_async_db),
+):
+    cached = await db.run_sync(conditional_get, request, response, "activity", project_id)
+    if cached is not None:
+        return cached
+    if params.limit is None:
+        params.limit = ACTIVITY_PAGE_SIZE
+    stmt = select(Activity).where(Activity.project_id == project_id)
+    page = await db.run_sync(keyset_paginate, stmt, params, ACTIVITY_SORT_FIELDS, Activity.id, default_sort="created_at", default_order="desc")
+    set_page_headers(response, page)
+    return page.items
@@ -0,0 +1,198 @@
+from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from ..change_stream import record_written
+from ..db import get_db
+from ..etag import bump_project_version
+from ..models import Activity, ChecklistItem, Project, Task
+from ..schemas import (
+    BatchIn, BatchOut, BatchResultOut, ChecklistItemOut, ChecklistToggleOp, ProjectOut, ProjectUpdateOp,
+    TaskCreateOp, TaskOut, TaskUpdateOp,
+)
+
+# Several edits in one request and one transaction: moving cards across the board,
+# ticking a whole checklist stage. Statements are shared across operations: one
+# UPDATE ... RETURNING per distinct change, one INSERT for new tasks, one for activity.
+# Non-atomic batches run each statement in a savepoint; when a shared statement fails,
+# its rows and then their operations are retried one by one, in order, so that only the
+# failing operations are reported.
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+BATCH_MAX_OPERATIONS = 500
+
+def load_rows(db: Session, model, ids) -> dict:
+    if not ids:
+        return {}
+    return {row.id: row for row in db.execute(select(model).where(model.id.in_(ids))).scalars()}
+
+def op_values(op) -> dict:
+    # Column values an update operation sets
+    if isinstance(op, ChecklistToggleOp):
+        return {"is_done": op.is_done}
+    return op.patch.model_dump(exclude_unset=True)
+
+def attempt(db: Session, atomic: bool, fn):
+    """
+    Run ``fn``; in a non-atomic batch inside a savepoint, so a database error
+    only undoes what ``fn`` did.
+
+    Returns:
+        (result of fn, None) or (None, error message)
+    """
+    if atomic:
+        return fn(), None
+    try:
+        with db.begin_nested():
+            return fn(), None
+    except SQLAlchemyError as e:
+        return None, f"Database error: {getattr(e, 'orig', None) or e}"[:300]
+
+def update_grouped(db: Session, model, changes: dict[int, dict], atomic: bool = True) -> tuple[list, dict]:
+    """
+    Apply per-row column values with as few statements as possible.
+
+    Rows receiving identical values share one ``UPDATE ... WHERE id IN (...)
+    RETURNING`` (ten cards moved to "Hecho" are one statement). Loaded
+    instances are synchronised from the returned rows. In a non-atomic
+    batch, a group whose statement fails is retried row by row.
+
+    Args:
+        db: Database session
+        model: Mapped class
+        changes: Row id -> column values to set
+        atomic: Let database errors propagate instead of isolating them
+
+    Returns:
+        (the updated instances, row id -> error for rows that could not be updated)
+    """
+    groups = defaultdict(list)
+    for row_id, values in changes.items():
+        if values:
+            groups[tuple(sorted(values.items(), key=lambda kv: kv[0]))].append(row_id)
+
+    def run(values, ids):
+        return db.execute(update(model).where(model.id.in_(ids)).values(dict(values)).returning(model)).scalars().all()
+
+    rows, failed = [], {}
+    for values, ids in groups.items():
+        got, error = attempt(db, atomic, lambda: run(values, ids))
+        if error is None:
+            rows += got
+            continue
+        for row_id in ids:
+            got, error = attempt(db, atomic, lambda: run(values, [row_id]))
+            if error is None:
+                rows += got
+            else:
+                failed[row_id] = error
+    return rows, failed
+
+def insert_tasks(db: Session, creates: list[tuple[int, dict]], atomic: bool = True) -> tuple[dict, dict]:
+    # One INSERT ... RETURNING for all new tasks; in a non-atomic batch a failure is retried task by task
+    def run(values):
+        return db.execute(insert(Task).returning(Task, sort_by_parameter_order=True), values).scalars().all()
+
+    if not creates:
+        return {}, {}
+    got, error = attempt(db, atomic, lambda: run([values for _, values in creates]))
+    if error is None:
+        return {i: t for (i, _), t in zip(creates, got)}, {}
+    created, failed = {}, {}
+    for i, values in creates:
+        got, error = attempt(db, atomic, lambda: run([values]))
+        if error is None:
+            created[i] = got[0]
+        else:
+            failed[i] = error
+    return created, failed
+
+@router.post("", response_model=BatchOut)
+def run_batch(payload: BatchIn, db: Session = Depends(get_db)):
+    ops = payload.operations
+    if len(ops) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_OPERATIONS} operations per batch")
+
+    tasks = load_rows(db, Task, {op.id for op in ops if isinstance(op, TaskUpdateOp)})
+    items = load_rows(db, ChecklistItem, {op.id for op in ops if isinstance(op, ChecklistToggleOp)})
+    projects = load_rows(db, Project, {op.id for op in ops if isinstance(op, ProjectUpdateOp)} | {op.task.project_id for op in ops if isinstance(op, TaskCreateOp)})
+
+    errors = {}
+    for i, op in enumerate(ops):
+        if isinstance(op, TaskUpdateOp) and op.id not in tasks:
+            errors[i] = "Task not found"
+        elif isinstance(op, ChecklistToggleOp) and op.id not in items:
+            errors[i] = "Checklist item not found"
+        elif isinstance(op, ProjectUpdateOp) and op.id not in projects:
+            errors[i] = "Project not found"
+        elif isinstance(op, TaskCreateOp) and op.task.project_id not in projects:
+            errors[i] = "Project not found"
+    if errors and payload.atomic:
+        raise HTTPException(status_code=400, detail=[{"index": i, "error": e} for i, e in errors.items()])
+    valid = [(i, op) for i, op in enumerate(ops) if i not in errors]
+
+    # Later operations on the same row win, as if the PATCHes had run in order
+    task_changes, item_changes, project_changes = defaultdict(dict), {}, defaultdict(dict)
+    ops_by_row = defaultdict(list)  # (model, row id) -> indexes of the operations merged into its change
+    for i, op in valid:
+        if isinstance(op, TaskUpdateOp):
+            task_changes[op.id].update(op_values(op))
+            ops_by_row[(Task, op.id)].append(i)
+        elif isinstance(op, ChecklistToggleOp):
+            item_changes[op.id] = op_values(op)
+            ops_by_row[(ChecklistItem, op.id)].append(i)
+        elif isinstance(op, ProjectUpdateOp):
+            project_changes[op.id].update(op_values(op))
+            ops_by_row[(Project, op.id)].append(i)
+    written = []
+    for model, changes in ((Task, task_changes), (ChecklistItem, item_changes), (Project, project_changes)):
+        rows, failed = update_grouped(db, model, changes, payload.atomic)
+        written += rows
+        for row_id, error in failed.items():
+            indexes = ops_by_row[(model, row_id)]
+            if len(indexes) == 1:
+                errors[indexes[0]] = error
+                continue
+            # Several operations were merged into the failed change: apply them one at a time
+            for i in indexes:
+                rows, failed_op = update_grouped(db, model, {row_id: op_values(ops[i])}, payload.atomic)
+                written += rows
+                if failed_op:
+                    errors[i] = failed_op[row_id]
+
+    created, failed = insert_tasks(db, [(i, op.task.model_dump()) for i, op in valid if isinstance(op, TaskCreateOp)], payload.atomic)
+    errors.update(failed)
+
+    results, activity, touched = [], [], set()
+    for i, op in enumerate(ops):
+        if i in errors:
+            results.append(BatchResultOut(index=i, ok=False, error=errors[i]))
+            continue
+        if isinstance(op, TaskUpdateOp):
+            t = tasks[op.id]
+            activity.append({"project_id": t.project_id, "actor": "Ana López", "verb": "Updated task", "detail": t.title})
+            results.append(BatchResultOut(index=i, ok=True, task=TaskOut.model_validate(t)))
+        elif isinstance(op, ChecklistToggleOp):
+            it = items[op.id]
+            activity.append({"project_id": it.project_id, "actor": "Ana López", "verb": "Checklist updated", "detail": it.label})
+            results.append(BatchResultOut(index=i, ok=True, checklist_item=ChecklistItemOut.model_validate(it)))
+        elif isinstance(op, ProjectUpdateOp):
+            p = projects[op.id]
+            detail = ", ".join(op.patch.model_dump(exclude_unset=True).keys()) or "—"
+            activity.append({"project_id": p.id, "actor": "System", "verb": "Updated project", "detail": detail})
+            results.append(BatchResultOut(index=i, ok=True, project=ProjectOut.model_validate(p)))
+        else:
+            t = created[i]
+            written.append(t)
+            activity.append({"project_id": t.project_id, "actor": op.task.assignee, "verb": "Created task", "detail": t.title})
+            results.append(BatchResultOut(index=i, ok=True, task=TaskOut.model_validate(t)))
+        touched.add(activity[-1]["project_id"])
+
+    if activity:
+        written += db.execute(insert(Activity).returning(Activity), activity).scalars().all()
+    for project_id in sorted(touched):
+        bump_project_version(db, project_id)  # the stats triggers already refreshed the rollups
+    record_written(db, written)
+    db.commit()
+    return BatchOut(results=results)
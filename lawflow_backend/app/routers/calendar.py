@@ -1,50 +1,56 @@
-from fastapi import APIRouter, Depends, Response
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from datetime import datetime
-from ..db import get_db
-from ..models import Task, TimelineItem, Project
+from ..db import get_db, SessionLocal
+from ..calendar_utils import FeedFilters, feed_etag, iter_feed
+from ..etag import etag_matches, not_modified
 
 router = APIRouter(prefix="/calendar", tags=["calendar"])
 
-def ics_escape(s: str) -> str:
-    return s.replace('\\', '\\\\').replace(';','\\;').replace(',','\\,').replace('\n','\\n')
+# Default start of the feed's date window, relative to today
+FEED_LOOKBACK_DAYS = 90
 
-@router.get("/ics")
-def project_ics(project_id: int, db: Session = Depends(get_db)):
-    p = db.get(Project, project_id)
-    tasks = db.query(Task).filter(Task.project_id == project_id).all()
-    milestones = db.query(TimelineItem).filter(TimelineItem.project_id == project_id).all()
+def stream_feed(request: Request, db: Session, filters: FeedFilters):
+    etag = feed_etag(db, filters)
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    now = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//LawFlow//Calendar//EN",
-        "CALSCALE:GREGORIAN",
-        "METHOD:PUBLISH",
-    ]
+    def body():
+        # Own session: the request's session is closed before the body has been sent
+        feed_db = SessionLocal()
+        try:
+            yield from iter_feed(feed_db, filters)
+        finally:
+            feed_db.close()
 
-    def add_event(uid: str, title: str, date_str: str):
-        # All-day event
-        ds = date_str.replace("-", "")
-        lines.extend([
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTAMP:{now}",
-            f"DTSTART;VALUE=DATE:{ds}",
-            f"DTEND;VALUE=DATE:{ds}",
-            f"SUMMARY:{ics_escape(title)}",
-            "END:VEVENT",
-        ])
+    return StreamingResponse(
+        body(),
+        media_type="text/calendar; charset=utf-8",
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
 
-    if p:
-        for t in tasks:
-            if t.due_date:
-                add_event(f"task-{t.id}@lawflow", f"[Task] {t.title} · {t.assignee}", str(t.due_date))
-        for m in milestones:
-            if m.kind == "Milestone" and m.start_date:
-                add_event(f"milestone-{m.id}@lawflow", f"[Milestone] {m.label}", str(m.start_date))
+@router.get("/feed.ics")
+def feed_ics(
+    request: Request,
+    project_id: list[int] | None = Query(None),
+    project_status: list[str] | None = Query(None, description="Only matters in these statuses"),
+    assignee: list[str] | None = Query(None, description="Only tasks for these assignees (omits milestones)"),
+    task_status: list[str] | None = Query(None, description="Only tasks in these statuses (omits milestones)"),
+    date_from: date | None = Query(None, description=f"Defaults to {FEED_LOOKBACK_DAYS} days ago"),
+    date_to: date | None = None,
+    db: Session = Depends(get_db),
+):
+    filters = FeedFilters(
+        project_id=project_id,
+        project_status=project_status,
+        assignee=assignee,
+        task_status=task_status,
+        date_from=date_from or date.today() - timedelta(days=FEED_LOOKBACK_DAYS),
+        date_to=date_to,
+    )
+    return stream_feed(request, db, filters)
 
-    lines.append("END:VCALENDAR")
-    ics = "\r\n".join(lines) + "\r\n"
-    return Response(content=ics, media_type="text/calendar")
+@router.get("/ics")
+def project_ics(project_id: int, request: Request, db: Session = Depends(get_db)):
+    return stream_feed(request, db, FeedFilters(project_id=[project_id]))
@@ -0,0 +1,47 @@
+import asyncio
+import json
+import os
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from ..change_stream import RESYNC, broker
+from ..db import AsyncSessionLocal
+from ..etag import project_version_query
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+CHANGE_STREAM_HEARTBEAT = float(os.getenv("CHANGE_STREAM_HEARTBEAT", "15"))  # seconds; keeps proxies from closing idle streams
+SSE_RETRY_MS = 3000
+
+def sse_event(event: str, data: str, event_id=None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {data}\n\n"
+
+@router.get("")
+async def stream_changes(project_id: int):
+    # Read the current version on a short-lived session; the stream itself holds no connection
+    async with AsyncSessionLocal() as db:
+        version = (await db.execute(project_version_query(project_id))).scalar()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    sub = broker.subscribe(project_id)
+
+    async def events():
+        try:
+            # "hello" carries the version to compare with; after a reconnect the client resyncs from it
+            yield f"retry: {SSE_RETRY_MS}\n" + sse_event("hello", json.dumps({"project_id": project_id, "version": version}), version)
+            while True:
+                try:
+                    data = await asyncio.wait_for(sub.queue.get(), CHANGE_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if data is RESYNC:
+                    yield sse_event("resync", "{}")
+                    continue
+                message_version, message = data
+                yield sse_event("change", message, message_version)
+        finally:
+            broker.unsubscribe(sub)
+
+    # X-Accel-Buffering: nginx must pass events through as they are written
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
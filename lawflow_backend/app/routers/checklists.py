@@ -1,22 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..db import get_db
-from ..models import ChecklistItem, Activity
+from ..db import get_db, get_async_db
+from ..etag import conditional_get
+from ..models import ChecklistItem
 from ..schemas import ChecklistItemOut, ChecklistUpdate
+from ..writes import ActivityEntry, update_row
 
 router = APIRouter(prefix="/checklists", tags=["checklists"])
 
 @router.get("", response_model=list[ChecklistItemOut])
-def list_items(project_id: int, db: Session = Depends(get_db)):
-    return db.query(ChecklistItem).filter(ChecklistItem.project_id == project_id).order_by(ChecklistItem.id.asc()).all()
+async def list_items(request: Request, response: Response, project_id: int, db: AsyncSession = Depends(get_async_db)):
+    cached = await db.run_sync(conditional_get, request, response, "checklists", project_id)
+    if cached is not None:
+        return cached
+    stmt = select(ChecklistItem).where(ChecklistItem.project_id == project_id).order_by(ChecklistItem.id.asc())
+    return (await db.execute(stmt)).scalars().all()
 
 @router.patch("/{item_id}", response_model=ChecklistItemOut)
 def toggle_item(item_id: int, payload: ChecklistUpdate, db: Session = Depends(get_db)):
-    it = db.get(ChecklistItem, item_id)
+    activity = ActivityEntry("Ana López", "Checklist updated", ChecklistItem.label)
+    it = update_row(db, ChecklistItem, item_id, {"is_done": payload.is_done}, activity, bump_version=True)
     if not it:
         raise HTTPException(status_code=404, detail="Checklist item not found")
-    it.is_done = payload.is_done
-    db.add(Activity(project_id=it.project_id, actor="Ana López", verb="Checklist updated", detail=it.label))
+    out = ChecklistItemOut.model_validate(it)
     db.commit()
-    db.refresh(it)
-    return it
+    return out
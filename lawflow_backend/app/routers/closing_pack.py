@@ -1,73 +1,43 @@
-from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from io import BytesIO
-from zipfile import ZipFile, ZIP_DEFLATED
-from datetime import datetime
 from ..db import get_db
-from ..models import Project, Task, ChecklistItem
+from ..closing_pack_utils import pack_fingerprint, load_pack_snapshot, stream_pack
+from ..closing_pack_cache import lookup, build, tee_to_cache
+from ..etag import etag_matches, not_modified
 
 router = APIRouter(prefix="/closing-pack", tags=["closing-pack"])
 
-def md(title: str, body: str) -> str:
-    return f"# {title}\n\n{body}\n"
-
 @router.get("/{project_id}")
-def generate(project_id: int, db: Session = Depends(get_db)):
-    p = db.get(Project, project_id)
-    if not p:
-        return {"error": "Project not found"}
-
-    tasks = db.query(Task).filter(Task.project_id == project_id).all()
-    checklist = db.query(ChecklistItem).filter(ChecklistItem.project_id == project_id).all()
-
-    buf = BytesIO()
-    with ZipFile(buf, "w", ZIP_DEFLATED) as z:
-        z.writestr("00_Project_Summary.md", md("Project summary", f"""**Matter:** {p.title}
-**Client:** {(p.client.name if p.client else '—')}
-**Type:** {p.transaction_type}
-**Location:** {p.location}
-**Status:** {p.status}
-**Target close:** {p.target_close_date}
-"""))
-
-        # Completion agenda
-        agenda = "\n".join([
-            "- Confirm notary appointment (Escritura) time & attendees",
-            "- Confirm funds routing / completion statement approved",
-            "- Confirm IDs/NIE and powers of attorney if applicable",
-            "- Confirm taxes filing plan (ITP/AJD / Plusvalía)",
-            "- Confirm post-completion: Land Registry submission + utilities/HOA notifications",
-        ])
-        z.writestr("01_Notary_Agenda.md", md("Notary agenda (Escritura)", agenda))
-
-        # Checklist export
-        by_stage = {}
-        for it in checklist:
-            by_stage.setdefault(it.stage, []).append(it)
-        lines = []
-        for stage, items in by_stage.items():
-            lines.append(f"## {stage}")
-            for it in items:
-                lines.append(f"- [{'x' if it.is_done else ' '}] {it.label} (due: {it.due_date})")
-            lines.append("")
-        z.writestr("02_Conveyancing_Checklist.md", "# Conveyancing checklist\n\n" + "\n".join(lines))
-
-        # Open tasks
-        open_tasks = [t for t in tasks if t.status != "Done"]
-        tlines = ["| Task | Assignee | Due | Priority |", "|---|---|---|---|"]
-        for t in open_tasks:
-            tlines.append(f"| {t.title} | {t.assignee} | {t.due_date} | {t.priority} |")
-        z.writestr("03_Open_Tasks.md", "# Open tasks\n\n" + "\n".join(tlines) + "\n")
+def generate(project_id: int, request: Request, db: Session = Depends(get_db)):
+    fingerprint = pack_fingerprint(db, project_id)
+    if fingerprint is None:
+        raise HTTPException(status_code=404, detail="Project not found")
 
-        # Closing pack manifest
-        z.writestr("manifest.json", f"""{{
-  "generated_at": "{datetime.utcnow().isoformat()}Z",
-  "project_id": {p.id},
-  "title": "{p.title.replace('"','\\\"')}",
-  "includes": ["00_Project_Summary.md","01_Notary_Agenda.md","02_Conveyancing_Checklist.md","03_Open_Tasks.md"]
-}}""")
+    etag = f'"closing-pack-{project_id}-{fingerprint[:32]}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    buf.seek(0)
     filename = f"closing_pack_project_{project_id}.zip"
-    return StreamingResponse(buf, media_type="application/zip", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    # Unchanged matter: serve the cached pack (FileResponse handles Range/If-Range)
+    cached = lookup(project_id, fingerprint)
+    if cached:
+        return FileResponse(cached, media_type="application/zip", filename=filename, headers=headers)
+
+    snapshot = load_pack_snapshot(db, project_id)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # A ranged request needs the finished file; otherwise stream while the cache copy is written
+    if "range" in request.headers:
+        path = build(project_id, fingerprint, snapshot)
+        return FileResponse(path, media_type="application/zip", filename=filename, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(
+        tee_to_cache(stream_pack(snapshot), project_id, fingerprint),
+        media_type="application/zip",
+        headers=headers,
+    )
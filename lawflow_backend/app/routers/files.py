@@ -1,54 +1,181 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pathlib import Path
-import shutil
-from ..db import get_db
+from ..db import get_db, get_async_db
+from ..etag import bump_project_version, conditional_get, etag_matches
+from ..file_delivery import file_download
+from ..file_utils import StoredUpload, is_pdf_file, receive_multipart_upload
 from ..models import FileItem, Activity
-from ..schemas import FileItemOut
+from ..pdf_pages import page_count, page_sizes
+from ..preview_cache import IMAGE_FORMATS, get_or_render, get_or_render_page, negotiate_format, snap_width
+from ..preview_worker import PREVIEW_PENDING, enqueue_preview, initial_preview_status, is_previewable
+from ..text_extraction import EXTRACT_PENDING, enqueue_extraction, initial_extract_status
+from ..pagination import CursorParams, SortKey, cursor_params, keyset_paginate, set_page_headers
+from ..schemas import FileItemOut, PdfPageOut, PdfPagesOut
 
 router = APIRouter(prefix="/files", tags=["files"])
 
-UPLOAD_DIR = Path("./uploads")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# A file's content never changes (new uploads are new rows), so rendered images are immutable
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+FILE_SORT_FIELDS = {
+    "uploaded_at": SortKey(FileItem.uploaded_at),
+    "filename": SortKey(FileItem.filename),
+    "id": SortKey(FileItem.id),
+}
 
 @router.get("", response_model=list[FileItemOut])
-def list_files(project_id: int, db: Session = Depends(get_db)):
-    return db.query(FileItem).filter(FileItem.project_id == project_id).order_by(FileItem.uploaded_at.desc()).all()
-
-@router.post("/upload", response_model=FileItemOut)
-def upload_file(
-    project_id: int = Form(...),
-    uploader: str = Form("Ana López"),
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+async def list_files(
+    request: Request,
+    response: Response,
+    project_id: int,
+    params: CursorParams = Depends(cursor_params),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="Missing filename")
-    safe_name = file.filename.replace("/", "_").replace("\\", "_")
-    dest = UPLOAD_DIR / f"{project_id}__{safe_name}"
-    with dest.open("wb") as f:
-        shutil.copyfileobj(file.file, f)
+    cached = await db.run_sync(conditional_get, request, response, "files", project_id)
+    if cached is not None:
+        return cached
+    stmt = select(FileItem).where(FileItem.project_id == project_id)
+    page = await db.run_sync(keyset_paginate, stmt, params, FILE_SORT_FIELDS, FileItem.id, default_sort="uploaded_at", default_order="desc")
+    set_page_headers(response, page)
+    return page.items
 
+def add_upload(db: Session, project_id: int, filename: str, uploader: str, stored: StoredUpload) -> FileItem:
     item = FileItem(
         project_id=project_id,
-        filename=safe_name,
-        stored_path=str(dest),
-        mime_type=file.content_type,
+        filename=filename,
+        stored_path=stored.path,
+        mime_type=stored.mime_type,
         uploader=uploader,
+        file_size=stored.size,
+        sha256=stored.sha256,
+        preview_status=initial_preview_status(stored.mime_type),
+        extract_status=initial_extract_status(stored.mime_type),
     )
     db.add(item)
-    db.add(Activity(project_id=project_id, actor=uploader, verb="Uploaded file", detail=safe_name))
+    db.add(Activity(project_id=project_id, actor=uploader, verb="Uploaded file", detail=filename))
+    bump_project_version(db, project_id)
+    return item
+
+def enqueue_processing(item: FileItem) -> None:
+    # Background work for a committed upload: preview rendering and text extraction for search
+    if item.preview_status == PREVIEW_PENDING:
+        enqueue_preview(item.id)
+    if item.extract_status == EXTRACT_PENDING:
+        enqueue_extraction(item.id)
+
+def record_upload(db: Session, project_id: int, filename: str, uploader: str, stored: StoredUpload) -> FileItem:
+    item = add_upload(db, project_id, filename, uploader, stored)
     db.commit()
     db.refresh(item)
     return item
 
-@router.get("/download/{file_id}")
-def download(file_id: int, db: Session = Depends(get_db)):
+# The form is parsed by hand (see below), so describe it for the OpenAPI docs
+UPLOAD_FORM_SCHEMA = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object",
+    "required": ["project_id", "file"],
+    "properties": {
+        "project_id": {"type": "integer"},
+        "uploader": {"type": "string", "default": "Ana López"},
+        "file": {"type": "string", "format": "binary"},
+    },
+}}}}}
+
+@router.post("/upload", response_model=FileItemOut, openapi_extra=UPLOAD_FORM_SCHEMA)
+async def upload_file(request: Request, db: Session = Depends(get_db)):
+    # One pass over the body as it arrives (size limit, type sniffing, SHA-256, commit into
+    # the blob store), without the framework spooling it to disk first. If the database
+    # write fails the blob is left for blob_store.gc, since another file may share it.
+    fields, safe_name, stored = await receive_multipart_upload(request)
+    try:
+        project_id = int(fields["project_id"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=422, detail="project_id must be an integer")
+    uploader = fields.get("uploader") or "Ana López"
+    item = await run_in_threadpool(record_upload, db, project_id, safe_name, uploader, stored)
+    enqueue_processing(item)
+    return item
+
+def load_stored_file(db: Session, file_id: int) -> tuple[FileItem, Path]:
     item = db.get(FileItem, file_id)
     if not item:
         raise HTTPException(status_code=404, detail="File not found")
     path = Path(item.stored_path)
     if not path.exists():
         raise HTTPException(status_code=404, detail="File content not available (seed metadata only). Upload a real file to preview/download.")
-    return FileResponse(path, filename=item.filename, media_type=item.mime_type or "application/octet-stream")
+    return item, path
+
+@router.get("/download/{file_id}")
+def download(file_id: int, request: Request, db: Session = Depends(get_db)):
+    # With FILE_ACCEL_REDIRECT_PREFIX set, nginx sends the bytes and this worker is freed immediately
+    item, path = load_stored_file(db, file_id)
+    return file_download(request, item, path)
+
+@router.get("/{file_id}/preview")
+def preview(file_id: int, request: Request, w: int = Query(320, ge=1, le=4096), db: Session = Depends(get_db)):
+    item, source = load_stored_file(db, file_id)
+    if not is_previewable(item.mime_type):
+        raise HTTPException(status_code=404, detail="No preview for this file type")
+
+    width, image_format = snap_width(w), negotiate_format(request.headers.get("accept"))
+    key = item.sha256 or f"file{item.id}"
+    etag = f'"{key[:32]}-{width}-{image_format}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE, "Vary": "Accept"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    path = get_or_render(source, item.mime_type, key, width, image_format)
+    if not path:
+        raise HTTPException(status_code=422, detail="Preview could not be generated for this file")
+    return FileResponse(path, media_type=IMAGE_FORMATS[image_format], headers=headers)
+
+def load_pdf(db: Session, file_id: int) -> tuple[FileItem, Path]:
+    item, source = load_stored_file(db, file_id)
+    if not is_pdf_file(item.mime_type or ""):
+        raise HTTPException(status_code=404, detail="File is not a PDF")
+    return item, source
+
+@router.get("/{file_id}/pages", response_model=PdfPagesOut)
+def pages(file_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    item, source = load_pdf(db, file_id)
+    key = item.sha256 or f"file{item.id}"
+    etag = f'"{key[:32]}-pages"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": IMMUTABLE})
+    try:
+        sizes = page_sizes(source)
+    except Exception:
+        raise HTTPException(status_code=422, detail="PDF could not be opened")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = IMMUTABLE
+    return PdfPagesOut(
+        file_id=item.id,
+        page_count=len(sizes),
+        pages=[PdfPageOut(number=n, width=w, height=h) for n, (w, h) in enumerate(sizes, start=1)],
+    )
+
+@router.get("/{file_id}/pages/{page_number}")
+def page_image(file_id: int, page_number: int, request: Request, w: int = Query(1280, ge=1, le=4096), db: Session = Depends(get_db)):
+    # Renders just this page, from a cached open document, into the preview cache
+    item, source = load_pdf(db, file_id)
+    width, image_format = snap_width(w), negotiate_format(request.headers.get("accept"))
+    key = item.sha256 or f"file{item.id}"
+    etag = f'"{key[:32]}-p{page_number}-{width}-{image_format}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE, "Vary": "Accept"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        count = page_count(source)
+    except Exception:
+        raise HTTPException(status_code=422, detail="PDF could not be opened")
+    if not 1 <= page_number <= count:
+        raise HTTPException(status_code=404, detail="Page not found")
+    path = get_or_render_page(source, key, page_number, width, image_format)
+    if not path:
+        raise HTTPException(status_code=422, detail="Page could not be rendered")
+    return FileResponse(path, media_type=IMAGE_FORMATS[image_format], headers=headers)
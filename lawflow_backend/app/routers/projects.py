@@ -1,40 +1,159 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..db import get_db
-from ..models import Activity, Project
-from ..schemas import ProjectOut, ProjectCreate, ProjectUpdate, ProjectDetail
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from datetime import date
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload, raiseload
+from sqlalchemy.orm.attributes import set_committed_value
+from ..db import get_db, get_async_db
+from ..etag import conditional_get
+from ..models import Activity, Project, Task, ChecklistItem, TimelineItem, FileItem, ProjectStats
+from ..pagination import CursorParams, SortKey, cursor_params, keyset_paginate, set_page_headers
+from ..schemas import ProjectOut, ProjectCreate, ProjectUpdate, ProjectDetail, WorkspaceOut, ProjectStatsOut
+from ..stats import deadlines_as_of
+from ..writes import ActivityEntry, insert_row, update_row
+from .activity import ACTIVITY_SORT_FIELDS
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
+WORKSPACE_SECTIONS = ("tasks", "checklist_items", "timeline_items", "activities", "files")
+
+PROJECT_SORT_FIELDS = {
+    "id": SortKey(Project.id),
+    "title": SortKey(Project.title),
+    "status": SortKey(Project.status),
+    "target_close_date": SortKey(Project.target_close_date, null_value=date.max),
+    "created_at": SortKey(Project.created_at),
+    "updated_at": SortKey(Project.updated_at),
+}
+
 @router.get("", response_model=list[ProjectOut])
-def list_projects(db: Session = Depends(get_db)):
-    return db.query(Project).order_by(Project.id.desc()).all()
+async def list_projects(
+    response: Response,
+    status: list[str] | None = Query(None),
+    risk: list[str] | None = Query(None),
+    location: list[str] | None = Query(None),
+    transaction_type: str | None = None,
+    client_id: int | None = None,
+    target_close_from: date | None = None,
+    target_close_to: date | None = None,
+    params: CursorParams = Depends(cursor_params),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Every filter maps onto an indexed column; clients arrive in one batched SELECT.
+    stmt = select(Project).options(selectinload(Project.client))
+    if status:
+        stmt = stmt.where(Project.status.in_(status))
+    if risk:
+        stmt = stmt.where(Project.risk.in_(risk))
+    if location:
+        stmt = stmt.where(Project.location.in_(location))
+    if transaction_type:
+        stmt = stmt.where(Project.transaction_type == transaction_type)
+    if client_id is not None:
+        stmt = stmt.where(Project.client_id == client_id)
+    if target_close_from:
+        stmt = stmt.where(Project.target_close_date >= target_close_from)
+    if target_close_to:
+        stmt = stmt.where(Project.target_close_date <= target_close_to)
+    page = await db.run_sync(keyset_paginate, stmt, params, PROJECT_SORT_FIELDS, Project.id, default_sort="id", default_order="desc")
+    set_page_headers(response, page)
+    return page.items
+
+@router.get("/stats", response_model=list[ProjectStatsOut])
+def list_project_stats(project_id: list[int] | None = Query(None), db: Session = Depends(get_db)):
+    # Served from the project_stats rollup: one row per matter, no task/checklist scans.
+    # Overdue counts that went stale overnight are recomputed for the response only;
+    # the refresh job rewrites the rows, so this GET never writes.
+    stmt = select(ProjectStats).order_by(ProjectStats.project_id.desc())
+    if project_id:
+        stmt = stmt.where(ProjectStats.project_id.in_(project_id))
+    rows = db.execute(stmt).scalars().all()
+    current = deadlines_as_of(db, rows)
+    return [ProjectStatsOut.model_validate(r).model_copy(update=current.get(r.project_id, {})) for r in rows]
 
 @router.get("/{project_id}", response_model=ProjectDetail)
-def get_project(project_id: int, db: Session = Depends(get_db)):
-    p = db.get(Project, project_id)
+async def get_project(
+    request: Request,
+    response: Response,
+    project_id: int,
+    activities_limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # A fixed number of queries however large the matter is: the project and its client,
+    # one batched SELECT per child collection, and a single page of the newest activity.
+    # Older activity is reached through /activity with activities_next_cursor.
+    cached = await db.run_sync(conditional_get, request, response, "project", project_id)
+    if cached is not None:
+        return cached
+
+    stmt = select(Project).where(Project.id == project_id).options(
+        joinedload(Project.client),
+        selectinload(Project.tasks),
+        selectinload(Project.checklist_items),
+        selectinload(Project.timeline_items),
+        raiseload(Project.activities),  # only the newest page, loaded below
+    )
+    p = (await db.execute(stmt)).scalar()
+    if not p:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    params = CursorParams(limit=activities_limit)
+    activities = select(Activity).where(Activity.project_id == project_id)
+    page = await db.run_sync(keyset_paginate, activities, params, ACTIVITY_SORT_FIELDS, Activity.id, default_sort="created_at", default_order="desc")
+    set_committed_value(p, "activities", page.items)
+    return ProjectDetail.model_validate(p).model_copy(update={"activities_next_cursor": page.next_cursor})
+
+@router.get("/{project_id}/workspace", response_model=WorkspaceOut)
+async def get_workspace(request: Request, response: Response, project_id: int, include: str | None = None, db: AsyncSession = Depends(get_async_db)):
+    # Everything the matter screens need in one request: the project header plus the
+    # per-project lists, each loaded with a single query on the same session.
+    sections = WORKSPACE_SECTIONS
+    if include is not None:
+        sections = tuple(s.strip() for s in include.split(",") if s.strip())
+        unknown = [s for s in sections if s not in WORKSPACE_SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown workspace section(s): {', '.join(unknown)}")
+
+    cached = await db.run_sync(conditional_get, request, response, "workspace", project_id)
+    if cached is not None:
+        return cached
+
+    p = (await db.execute(select(Project).options(joinedload(Project.client)).where(Project.id == project_id))).scalar()
     if not p:
         raise HTTPException(status_code=404, detail="Project not found")
-    return p
+
+    async def rows(stmt):
+        return (await db.execute(stmt)).scalars().all()
+
+    out = WorkspaceOut(project=p)
+    if "tasks" in sections:
+        out.tasks = await rows(select(Task).where(Task.project_id == project_id).order_by(Task.due_date.is_(None), Task.due_date.asc()))
+    if "checklist_items" in sections:
+        out.checklist_items = await rows(select(ChecklistItem).where(ChecklistItem.project_id == project_id).order_by(ChecklistItem.id.asc()))
+    if "timeline_items" in sections:
+        out.timeline_items = await rows(select(TimelineItem).where(TimelineItem.project_id == project_id).order_by(TimelineItem.start_date.asc()))
+    if "activities" in sections:
+        out.activities = await rows(select(Activity).where(Activity.project_id == project_id).order_by(Activity.created_at.desc()).limit(100))
+    if "files" in sections:
+        out.files = await rows(select(FileItem).where(FileItem.project_id == project_id).order_by(FileItem.uploaded_at.desc()))
+    return out
 
 @router.post("", response_model=ProjectOut)
 def create_project(payload: ProjectCreate, db: Session = Depends(get_db)):
-    p = Project(**payload.model_dump())
-    db.add(p)
-    db.add(Activity(project_id=0, actor="System", verb="Created project", detail=p.title))
+    activity = ActivityEntry("System", "Created project", Project.title, project_id=0)
+    p = insert_row(db, Project, payload.model_dump(), activity, related=("client",))
+    out = ProjectOut.model_validate(p)
     db.commit()
-    db.refresh(p)
-    return p
+    return out
 
 @router.patch("/{project_id}", response_model=ProjectOut)
 def update_project(project_id: int, payload: ProjectUpdate, db: Session = Depends(get_db)):
-    p = db.get(Project, project_id)
+    data = payload.model_dump(exclude_unset=True)
+    activity = ActivityEntry("System", "Updated project", ", ".join(data.keys()) or "—")
+    # change_version is bumped by the same UPDATE; the client comes with the row
+    p = update_row(db, Project, project_id, data, activity, bump_version=True, related=("client",))
     if not p:
         raise HTTPException(status_code=404, detail="Project not found")
-    data = payload.model_dump(exclude_unset=True)
-    for k, v in data.items():
-        setattr(p, k, v)
-    db.add(Activity(project_id=p.id, actor="System", verb="Updated project", detail=", ".join(data.keys()) or "—"))
+    out = ProjectOut.model_validate(p)
     db.commit()
-    db.refresh(p)
-    return p
+    return out
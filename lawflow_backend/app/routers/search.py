@@ -0,0 +1,29 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import get_async_db
+from ..schemas import SearchHitOut, SearchResultsOut
+from ..search_index import KINDS, search
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("", response_model=SearchResultsOut)
+async def search_all(
+    q: str = Query(..., min_length=1, max_length=200),
+    project_id: Optional[int] = None,
+    kinds: Optional[str] = Query(None, description="Comma-separated subset of: " + ", ".join(KINDS)),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    kind_list = [k.strip() for k in kinds.split(",") if k.strip()] if kinds else []
+    unknown = set(kind_list) - set(KINDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown kinds: {', '.join(sorted(unknown))}")
+    # One extra row tells whether there is a next page without counting all matches
+    hits = await db.run_sync(search, q, project_id, kind_list, limit + 1, offset)
+    return SearchResultsOut(
+        query=q,
+        items=[SearchHitOut(**hit._asdict()) for hit in hits[:limit]],
+        next_offset=offset + limit if len(hits) > limit else None,
+    )
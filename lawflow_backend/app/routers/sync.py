@@ -0,0 +1,53 @@
+import base64
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from ..db import get_db
+from ..models import Task, ChecklistItem, TimelineItem, Activity, FileItem
+from ..schemas import SyncOut
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+SYNC_MODELS = {
+    "tasks": Task,
+    "checklist_items": ChecklistItem,
+    "timeline_items": TimelineItem,
+    "activities": Activity,
+    "files": FileItem,
+}
+
+# updated_at is stamped at flush time, so a transaction that flushed before a cursor was
+# issued can still commit after it. Re-sending this window on every delta keeps those rows
+# from being missed; clients apply rows as upserts, so the repeats are harmless.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+def encode_cursor(ts: datetime) -> str:
+    return base64.urlsafe_b64encode(ts.isoformat().encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> datetime:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return datetime.fromisoformat(base64.urlsafe_b64decode(padded).decode())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+
+@router.get("", response_model=SyncOut)
+def sync(project_id: int, since: str | None = None, db: Session = Depends(get_db)):
+    # Without a cursor the client gets a full snapshot; with one, only rows created,
+    # changed or soft-deleted since then. Either way the response carries the next cursor.
+    now = datetime.utcnow()
+    since_ts = decode_cursor(since) - SYNC_OVERLAP if since else None
+
+    out = SyncOut(cursor=encode_cursor(now), full=since_ts is None)
+    for key, model in SYNC_MODELS.items():
+        q = db.query(model).filter(model.project_id == project_id)
+        if since_ts is None:
+            q = q.filter(model.is_deleted.isnot(True))
+        else:
+            q = q.filter(model.updated_at >= since_ts)
+        rows = q.order_by(model.id.asc()).all()
+        setattr(out, key, [r for r in rows if not r.is_deleted])
+        gone = [r.id for r in rows if r.is_deleted]
+        if gone:
+            out.deleted[key] = gone
+    return out
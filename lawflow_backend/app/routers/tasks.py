@@ -1,36 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..db import get_db
-from ..models import Task, Activity
+from ..db import get_db, get_async_db
+from ..etag import conditional_get
+from ..models import Task
+from ..pagination import CursorParams, SortKey, cursor_params, keyset_paginate, set_page_headers
 from ..schemas import TaskOut, TaskCreate, TaskUpdate
+from ..writes import ActivityEntry, insert_row, update_row
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+TASK_SORT_FIELDS = {
+    "due_date": SortKey(Task.due_date, null_value=date.max),  # undated tasks last
+    "title": SortKey(Task.title),
+    "status": SortKey(Task.status),
+    "priority": SortKey(Task.priority),
+    "created_at": SortKey(Task.created_at),
+    "updated_at": SortKey(Task.updated_at),
+    "id": SortKey(Task.id),
+}
+
 @router.get("", response_model=list[TaskOut])
-def list_tasks(project_id: int | None = None, db: Session = Depends(get_db)):
-    q = db.query(Task)
+async def list_tasks(
+    request: Request,
+    response: Response,
+    project_id: int | None = None,
+    params: CursorParams = Depends(cursor_params),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = select(Task)
     if project_id is not None:
-        q = q.filter(Task.project_id == project_id)
-    return q.order_by(Task.due_date.is_(None), Task.due_date.asc()).all()
+        cached = await db.run_sync(conditional_get, request, response, "tasks", project_id)
+        if cached is not None:
+            return cached
+        stmt = stmt.where(Task.project_id == project_id)
+    page = await db.run_sync(keyset_paginate, stmt, params, TASK_SORT_FIELDS, Task.id, default_sort="due_date")
+    set_page_headers(response, page)
+    return page.items
 
 @router.patch("/{task_id}", response_model=TaskOut)
 def update_task(task_id: int, payload: TaskUpdate, db: Session = Depends(get_db)):
-    t = db.get(Task, task_id)
+    # UPDATE ... RETURNING both finds the task and hands back its new state, with the activity
+    # entry and version bump in the same statement on Postgres; the response is built before
+    # commit, which would otherwise expire it and cost another SELECT
+    activity = ActivityEntry("Ana López", "Updated task", Task.title)
+    t = update_row(db, Task, task_id, payload.model_dump(exclude_unset=True), activity, bump_version=True)
     if not t:
         raise HTTPException(status_code=404, detail="Task not found")
-    data = payload.model_dump(exclude_unset=True)
-    for k, v in data.items():
-        setattr(t, k, v)
-    db.add(Activity(project_id=t.project_id, actor="Ana López", verb="Updated task", detail=t.title))
+    out = TaskOut.model_validate(t)
     db.commit()
-    db.refresh(t)
-    return t
+    return out
 
 @router.post("", response_model=TaskOut)
 def create_task(payload: TaskCreate, db: Session = Depends(get_db)):
-    t = Task(**payload.model_dump())
-    db.add(t)
-    db.add(Activity(project_id=t.project_id, actor=payload.assignee, verb="Created task", detail=t.title))
+    activity = ActivityEntry(payload.assignee, "Created task", Task.title)
+    t = insert_row(db, Task, payload.model_dump(), activity, bump_version=True)
+    out = TaskOut.model_validate(t)
     db.commit()
-    db.refresh(t)
-    return t
+    return out
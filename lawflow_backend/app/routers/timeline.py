@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..db import get_db
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import get_async_db
+from ..etag import conditional_get
 from ..models import TimelineItem
 from ..schemas import TimelineItemOut
 
 router = APIRouter(prefix="/timeline", tags=["timeline"])
 
 @router.get("", response_model=list[TimelineItemOut])
-def list_timeline(project_id: int, db: Session = Depends(get_db)):
-    return db.query(TimelineItem).filter(TimelineItem.project_id == project_id).order_by(TimelineItem.start_date.asc()).all()
+async def list_timeline(request: Request, response: Response, project_id: int, db: AsyncSession = Depends(get_async_db)):
+    cached = await db.run_sync(conditional_get, request, response, "timeline", project_id)
+    if cached is not None:
+        return cached
+    stmt = select(TimelineItem).where(TimelineItem.project_id == project_id).order_by(TimelineItem.start_date.asc())
+    return (await db.execute(stmt)).scalars().all()
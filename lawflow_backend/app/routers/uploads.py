@@ -0,0 +1,276 @@
+import fcntl
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .. import blob_store
+from ..db import get_db
+from ..file_utils import ALLOWED_MIME_TYPES, MAX_FILE_SIZE, StoredUpload, get_safe_filename, inspect_assembled_upload
+from ..models import FileItem, Project, UploadChunk, UploadSession
+from ..schemas import FileItemOut, UploadSessionCreate, UploadSessionOut
+from .files import add_upload, enqueue_processing
+
+# Resumable uploads: create a session, PUT byte ranges in any order (or in parallel),
+# then POST .../complete. Chunks are written in place into a preallocated file inside
+# the blob store, and finalizing renames that file to its content address. Chunk writes
+# hold a shared flock on that file and finalize an exclusive one, so no chunk can land in
+# a file that is being hashed or is already a (possibly shared) blob.
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+# Seconds after which a finalize that never finished (worker died) may be taken over
+UPLOAD_FINALIZE_TIMEOUT = int(os.getenv("UPLOAD_FINALIZE_TIMEOUT", "600"))
+UPLOAD_FINALIZE_LOCK_WAIT = 30  # seconds finalize waits for chunk writes in flight
+FINALIZE_STATUSES = ("finalizing", "linking")
+ALLOWED_EXTENSIONS = {ext for exts in ALLOWED_MIME_TYPES.values() for ext in exts}
+
+def missing_ranges(session: UploadSession) -> list[list[int]]:
+    # Chunks may overlap (retries) and arrive in any order; merge them and report the gaps
+    gaps, covered = [], 0
+    for chunk in sorted(session.chunks, key=lambda c: c.offset):
+        if chunk.offset > covered:
+            gaps.append([covered, chunk.offset])
+        covered = max(covered, chunk.offset + chunk.length)
+    if covered < session.size:
+        gaps.append([covered, session.size])
+    return gaps
+
+def session_out(session: UploadSession) -> UploadSessionOut:
+    gaps = missing_ranges(session) if session.status != "complete" else []
+    return UploadSessionOut(
+        id=session.id,
+        project_id=session.project_id,
+        filename=session.filename,
+        size=session.size,
+        status=session.status,
+        received=session.size - sum(end - start for start, end in gaps),
+        missing=gaps,
+        expires_at=session.expires_at,
+        file_id=session.file_id,
+    )
+
+def expire_upload_sessions(db: Session) -> int:
+    expired = db.execute(
+        select(UploadSession).where(UploadSession.expires_at < datetime.utcnow())
+    ).scalars().all()
+    for session in expired:
+        blob_store.session_path(session.id).unlink(missing_ok=True)
+        db.delete(session)
+    db.commit()
+    return len(expired)
+
+def load_session(db: Session, session_id: str) -> UploadSession:
+    session = db.get(UploadSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=410, detail="Upload session expired")
+    return session
+
+def load_open_session(db: Session, session_id: str) -> UploadSession:
+    session = load_session(db, session_id)
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload session is {session.status}")
+    return session
+
+@router.post("", response_model=UploadSessionOut)
+def create_session(payload: UploadSessionCreate, db: Session = Depends(get_db)):
+    expire_upload_sessions(db)
+    if not db.get(Project, payload.project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    if payload.size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024*1024):.0f}MB"
+        )
+    safe_name = get_safe_filename(payload.filename)
+    if Path(safe_name).suffix.lower() not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"File extension '{Path(safe_name).suffix}' not allowed")
+
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        project_id=payload.project_id,
+        filename=safe_name,
+        mime_type=payload.mime_type,
+        uploader=payload.uploader,
+        size=payload.size,
+        sha256=payload.sha256,
+        status="open",
+        expires_at=datetime.utcnow() + timedelta(hours=UPLOAD_SESSION_TTL_HOURS),
+    )
+    # Preallocate (sparse) so chunks can be written at their offsets in any order
+    with blob_store.session_path(session.id).open("wb") as f:
+        f.truncate(payload.size)
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session_out(session)
+
+@router.get("/{session_id}", response_model=UploadSessionOut)
+def get_session(session_id: str, db: Session = Depends(get_db)):
+    return session_out(load_session(db, session_id))
+
+def record_chunk(db: Session, session_id: str, offset: int, length: int) -> UploadSessionOut:
+    session = load_open_session(db, session_id)
+    # Upsert: a retried range may be recorded by two requests at once
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(UploadChunk).values(session_id=session_id, offset=offset, length=length)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UploadChunk.session_id, UploadChunk.offset],
+        set_={"length": case((stmt.excluded.length > UploadChunk.length, stmt.excluded.length), else_=UploadChunk.length)},
+    ))
+    db.commit()
+    db.refresh(session)
+    return session_out(session)
+
+def reload_open_session(db: Session, session_id: str) -> UploadSession:
+    # Fresh read in a new transaction, not the state cached when the request started
+    db.rollback()
+    return load_open_session(db, session_id)
+
+@router.put("/{session_id}", response_model=UploadSessionOut)
+async def put_chunk(session_id: str, offset: int, request: Request, db: Session = Depends(get_db)):
+    session = await run_in_threadpool(load_open_session, db, session_id)
+    size = session.size
+    if offset < 0 or offset >= size:
+        raise HTTPException(status_code=416, detail=f"Offset must be in [0, {size})")
+
+    # The raw body is written where it belongs as it arrives; a dropped connection
+    # keeps nothing of this chunk and the client simply re-sends it.
+    try:
+        fd = os.open(blob_store.session_path(session_id), os.O_WRONLY)
+    except FileNotFoundError:
+        raise HTTPException(status_code=409, detail="Upload session is no longer open")
+    written = 0
+    try:
+        # Finalize changes the status before it takes its exclusive lock, so a status
+        # that is still "open" once we hold the shared lock means the file is still ours
+        await run_in_threadpool(fcntl.flock, fd, fcntl.LOCK_SH)
+        await run_in_threadpool(reload_open_session, db, session_id)
+        async for piece in request.stream():
+            if not piece:
+                continue
+            if offset + written + len(piece) > size:
+                raise HTTPException(status_code=416, detail="Chunk extends past the declared file size")
+            await run_in_threadpool(os.pwrite, fd, piece, offset + written)
+            written += len(piece)
+        if written == 0:
+            raise HTTPException(status_code=400, detail="Empty chunk")
+        return await run_in_threadpool(record_chunk, db, session_id, offset, written)
+    finally:
+        os.close(fd)
+
+def claim_session(db: Session, session: UploadSession, claimed_status: str) -> None:
+    # Parallel finalize calls must not both consume the file. A finalize that died mid-way
+    # leaves its claim behind; it is taken over once older than UPLOAD_FINALIZE_TIMEOUT.
+    now = datetime.utcnow()
+    if session.status in FINALIZE_STATUSES and session.claimed_at and session.claimed_at > now - timedelta(seconds=UPLOAD_FINALIZE_TIMEOUT):
+        raise HTTPException(status_code=409, detail="Upload session is already being finalized")
+    same_claim = UploadSession.claimed_at.is_(None) if session.claimed_at is None else UploadSession.claimed_at == session.claimed_at
+    claimed = db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session.id, UploadSession.status == session.status, same_claim)
+        .values(status=claimed_status, claimed_at=now)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Upload session is already being finalized")
+
+def lock_for_finalize(fd: int) -> None:
+    # Wait for chunk writes that passed their status check before the claim
+    deadline = time.monotonic() + UPLOAD_FINALIZE_LOCK_WAIT
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            if time.monotonic() > deadline:
+                raise HTTPException(status_code=409, detail="Chunks are still being written; retry")
+            time.sleep(0.1)
+
+def stored_blob(session: UploadSession) -> StoredUpload:
+    return StoredUpload(
+        path=str(blob_store.blob_path(session.sha256)), mime_type=session.mime_type, size=session.size, sha256=session.sha256,
+    )
+
+def store_session_file(db: Session, session: UploadSession) -> StoredUpload:
+    # Verify the assembled file and rename it to its content address. The verified hash and
+    # type are committed before the rename, so a finalize that dies after it finds the blob.
+    part = blob_store.session_path(session.id)
+    if not part.exists():
+        if session.sha256 and blob_store.blob_path(session.sha256).exists():
+            return stored_blob(session)
+        raise HTTPException(status_code=410, detail="Upload data is gone; start a new upload")
+    try:
+        with part.open("rb") as f:
+            lock_for_finalize(f.fileno())
+            inspected = inspect_assembled_upload(part, session.filename, session.mime_type, session.sha256)
+            session.sha256, session.mime_type = inspected.sha256, inspected.mime_type
+            db.commit()
+            blob_store.commit(part, inspected.sha256)
+    except Exception:
+        if part.exists():
+            set_session_status(db, session, "open")
+        raise
+    return stored_blob(session)
+
+def set_session_status(db: Session, session: UploadSession, status: str) -> None:
+    db.rollback()
+    session.status = status
+    db.commit()
+
+def finalize_session(db: Session, session_id: str) -> FileItem:
+    # open -> finalizing -> stored -> linking -> complete. Once the assembled file has been
+    # renamed into the blob store the session holds its verified hash and type, so a finalize
+    # that fails after that point ("stored") can be retried and links the blob again, and one
+    # that died ("finalizing"/"linking" with a stale claim) is picked up where it stopped.
+    session = load_session(db, session_id)
+    if session.status == "complete":
+        return db.get(FileItem, session.file_id)  # retried finalize: same result
+    if session.status in ("stored", "linking"):
+        claim_session(db, session, "linking")
+        stored = stored_blob(session)
+    else:
+        if session.status == "open":
+            gaps = missing_ranges(session)
+            if gaps:
+                raise HTTPException(status_code=409, detail={"message": "Upload incomplete", "missing": gaps})
+        claim_session(db, session, "finalizing")
+        stored = store_session_file(db, session)
+        session.status = "linking"
+        db.commit()
+
+    try:
+        item = add_upload(db, session.project_id, session.filename, session.uploader, stored)
+        db.flush()
+        session.status = "complete"
+        session.file_id = item.id
+        session.chunks.clear()
+        db.commit()
+    except Exception:
+        set_session_status(db, session, "stored")
+        raise
+    db.refresh(item)
+    return item
+
+@router.post("/{session_id}/complete", response_model=FileItemOut)
+async def complete_session(session_id: str, db: Session = Depends(get_db)):
+    # Hashing the assembled file takes a while for large scans; keep it off the event loop
+    item = await run_in_threadpool(finalize_session, db, session_id)
+    enqueue_processing(item)
+    return item
+
+@router.delete("/{session_id}")
+def abort_session(session_id: str, db: Session = Depends(get_db)):
+    session = load_open_session(db, session_id)
+    blob_store.session_path(session.id).unlink(missing_ok=True)
+    db.delete(session)
+    db.commit()
+    return {"ok": True}
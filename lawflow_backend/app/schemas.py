@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date, datetime
-from typing import Optional, List
+from typing import Annotated, Literal, Optional, List, Union
 
 class ClientOut(BaseModel):
     id: int
@@ -79,7 +79,8 @@ class ProjectDetail(ProjectOut):
     tasks: List[TaskOut] = []
     checklist_items: List[ChecklistItemOut] = []
     timeline_items: List[TimelineItemOut] = []
-    activities: List[ActivityOut] = []
+    activities: List[ActivityOut] = []  # newest page only, see activities_next_cursor
+    activities_next_cursor: Optional[str] = None
 
 class FileItemOut(BaseModel):
     id: int
@@ -89,6 +90,84 @@ class FileItemOut(BaseModel):
     mime_type: Optional[str] = None
     uploaded_at: datetime
     uploader: str
+    file_size: Optional[int] = None
+    sha256: Optional[str] = None
+    preview_status: Optional[str] = None
+    class Config: from_attributes = True
+
+class PdfPageOut(BaseModel):
+    number: int
+    width: float  # PDF points; the aspect ratio is what viewers need to lay out pages
+    height: float
+
+class PdfPagesOut(BaseModel):
+    file_id: int
+    page_count: int
+    pages: List[PdfPageOut]
+
+class SearchHitOut(BaseModel):
+    kind: str  # task | checklist | timeline | file | document | activity
+    id: int
+    project_id: int
+    project_title: str
+    title: str  # HTML-escaped, matches wrapped in <mark>
+    snippet: Optional[str] = None
+    score: float
+
+class SearchResultsOut(BaseModel):
+    query: str
+    items: List[SearchHitOut]
+    next_offset: Optional[int] = None
+
+class UploadSessionCreate(BaseModel):
+    project_id: int
+    filename: str
+    size: int = Field(gt=0)
+    mime_type: Optional[str] = None
+    uploader: str = "Ana López"
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-f]{64}$")
+
+class UploadSessionOut(BaseModel):
+    id: str
+    project_id: int
+    filename: str
+    size: int
+    status: str
+    received: int
+    missing: List[List[int]] = []  # [start, end) byte ranges still to send
+    expires_at: datetime
+    file_id: Optional[int] = None
+
+class WorkspaceOut(BaseModel):
+    project: ProjectOut
+    tasks: Optional[List[TaskOut]] = None
+    checklist_items: Optional[List[ChecklistItemOut]] = None
+    timeline_items: Optional[List[TimelineItemOut]] = None
+    activities: Optional[List[ActivityOut]] = None
+    files: Optional[List[FileItemOut]] = None
+
+class SyncOut(BaseModel):
+    cursor: str
+    full: bool
+    tasks: List[TaskOut] = []
+    checklist_items: List[ChecklistItemOut] = []
+    timeline_items: List[TimelineItemOut] = []
+    activities: List[ActivityOut] = []
+    files: List[FileItemOut] = []
+    deleted: dict[str, List[int]] = {}
+
+class ProjectStatsOut(BaseModel):
+    project_id: int
+    status: str
+    risk: str
+    target_close_date: Optional[date] = None
+    open_tasks: int
+    done_tasks: int
+    overdue_tasks: int
+    next_due_date: Optional[date] = None
+    checklist_total: int
+    checklist_done: int
+    checklist_by_stage: dict[str, dict[str, int]] = {}
     class Config: from_attributes = True
 
 class TemplateOut(BaseModel):
@@ -122,3 +201,40 @@ class TaskCreate(BaseModel):
     priority: str = "Medium"
     tags: Optional[str] = None
     description: Optional[str] = None
+
+# POST /batch: typed operations, told apart by "op"
+class TaskUpdateOp(BaseModel):
+    op: Literal["task.update"]
+    id: int
+    patch: TaskUpdate
+
+class ChecklistToggleOp(BaseModel):
+    op: Literal["checklist.toggle"]
+    id: int
+    is_done: bool
+
+class ProjectUpdateOp(BaseModel):
+    op: Literal["project.update"]
+    id: int
+    patch: ProjectUpdate
+
+class TaskCreateOp(BaseModel):
+    op: Literal["task.create"]
+    task: TaskCreate
+
+BatchOp = Annotated[Union[TaskUpdateOp, ChecklistToggleOp, ProjectUpdateOp, TaskCreateOp], Field(discriminator="op")]
+
+class BatchIn(BaseModel):
+    operations: List[BatchOp]
+    atomic: bool = True  # False: apply the valid operations, report the others
+
+class BatchResultOut(BaseModel):
+    index: int
+    ok: bool
+    error: Optional[str] = None
+    task: Optional[TaskOut] = None
+    checklist_item: Optional[ChecklistItemOut] = None
+    project: Optional[ProjectOut] = None
+
+class BatchOut(BaseModel):
+    results: List[BatchResultOut]
@@ -0,0 +1,330 @@
+"""
+Full-text search across all matters.
+
+SQLite: a single FTS5 table, ``search_index``, kept up to date by triggers on
+the source tables. A row's rowid is ``source id * 8 + kind code``, so a
+trigger can find the entry it maintains without a mapping table.
+
+Postgres: no extra table. Each source table has a GIN index on exactly the
+``to_tsvector`` expression the search query uses, so Postgres maintains the
+index on every write and the query's UNION ALL branches are index scans.
+
+Either way, writes need no application code to keep the index current.
+After restoring or editing a SQLite database outside the app, rebuild with::
+
+    python -m app.search_index rebuild
+"""
+import argparse
+import html
+import os
+import re
+import unicodedata
+from typing import NamedTuple, Optional, Sequence
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+FTS_TABLE = "search_index"
+TS_CONFIG = "simple"  # matters mix Spanish and English; no stemming either way
+MAX_QUERY_TERMS = 8
+
+# Ranking only considers this many of the most recent matches (0 ranks all of them)
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "2000"))
+SNIPPET_WORDS = 16
+
+class SearchSource(NamedTuple):
+    kind: str
+    code: int  # rowid = id * 8 + code on SQLite, so codes must stay below 8
+    table: str
+    title: tuple[str, ...]  # columns, weighted above the body
+    body: tuple[str, ...]
+    ref: str = "id"  # column holding the id a hit points to
+    soft_delete: bool = True  # table has is_deleted
+    parent: Optional[str] = None  # table ``ref`` points into; its soft-deleted rows hide the hit
+
+SOURCES = (
+    SearchSource("task", 1, "tasks", ("title",), ("description", "tags")),
+    SearchSource("checklist", 2, "checklist_items", ("label",), ("stage",)),
+    SearchSource("timeline", 3, "timeline_items", ("label",), ("kind",)),
+    SearchSource("file", 4, "files", ("filename",), ()),
+    SearchSource("activity", 5, "activities", ("detail",), ("verb", "actor")),
+    # Extracted document text (app/text_extraction.py); hits point to the file and are titled with its name
+    SearchSource("document", 6, "document_chunks", (), ("text",), ref="file_id", soft_delete=False, parent="files"),
+)
+SOURCE_BY_KIND = {s.kind: s for s in SOURCES}
+KINDS = tuple(SOURCE_BY_KIND)
+
+def _concat(columns: Sequence[str], row: str = "") -> str:
+    # SQL text expression joining nullable columns with spaces (identical on both backends)
+    if not columns:
+        return "''"
+    return " || ' ' || ".join(f"coalesce({row}{col}, '')" for col in columns)
+
+def _live(source: SearchSource, row: str = "") -> str:
+    # SQL condition for rows that belong in the index
+    return f"coalesce({row}is_deleted, 0) = 0" if source.soft_delete else "1 = 1"
+
+def _pg_document(source: SearchSource, row: str = "") -> str:
+    # Must match the GIN index expression character for character to be used by the planner
+    return (
+        f"setweight(to_tsvector('{TS_CONFIG}', {_concat(source.title, row)}), 'A') || "
+        f"setweight(to_tsvector('{TS_CONFIG}', {_concat(source.body, row)}), 'B')"
+    )
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+def _sqlite_ddl(sources: Sequence[SearchSource]) -> list[str]:
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "kind UNINDEXED, ref_id UNINDEXED, project_id UNINDEXED, title, body, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ]
+    for s in sources:
+        values = (
+            f"new.id * 8 + {s.code}, '{s.kind}', new.{s.ref}, new.project_id, "
+            f"{_concat(s.title, 'new.')}, {_concat(s.body, 'new.')}"
+        )
+        insert = f"INSERT INTO {FTS_TABLE}(rowid, kind, ref_id, project_id, title, body)"
+        watched = ", ".join((*s.title, *s.body, "project_id", *(("is_deleted",) if s.soft_delete else ())))
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {s.table}_search_ai AFTER INSERT ON {s.table} "
+            f"WHEN {_live(s, 'new.')} BEGIN {insert} VALUES ({values}); END",
+            # Only edits to indexed text (or deletion/moves) touch the index, not status flips
+            f"CREATE TRIGGER IF NOT EXISTS {s.table}_search_au AFTER UPDATE OF {watched} ON {s.table} BEGIN "
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 8 + {s.code}; "
+            f"{insert} SELECT {values} WHERE {_live(s, 'new.')}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {s.table}_search_ad AFTER DELETE ON {s.table} BEGIN "
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 8 + {s.code}; END",
+        ]
+    return statements
+
+def _sqlite_backfill(sources: Sequence[SearchSource]) -> list[str]:
+    return [
+        f"INSERT INTO {FTS_TABLE}(rowid, kind, ref_id, project_id, title, body) "
+        f"SELECT id * 8 + {s.code}, '{s.kind}', {s.ref}, project_id, {_concat(s.title)}, {_concat(s.body)} "
+        f"FROM {s.table} WHERE {_live(s)}"
+        for s in sources
+    ]
+
+def _postgres_ddl(sources: Sequence[SearchSource]) -> list[str]:
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_{s.table}_search ON {s.table} USING gin (({_pg_document(s)}))"
+        for s in sources
+    ]
+
+def create_search_index(conn: Connection, sources: Sequence[SearchSource] = SOURCES) -> None:
+    """
+    Create the index (and on SQLite its triggers), filling it from existing rows.
+
+    Safe to run repeatedly: an existing index is left as it is. Migrations
+    pass ``sources`` explicitly, so that adding a source later does not
+    change what an old revision creates.
+    """
+    if conn.dialect.name == "postgresql":
+        for statement in _postgres_ddl(sources):
+            conn.exec_driver_sql(statement)
+        return
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).first()
+    for statement in _sqlite_ddl(sources):
+        conn.exec_driver_sql(statement)
+    if not exists:
+        for statement in _sqlite_backfill(sources):
+            conn.exec_driver_sql(statement)
+
+def drop_search_index(conn: Connection, sources: Sequence[SearchSource] = SOURCES) -> None:
+    """Remove the index, its triggers and (on Postgres) the GIN indexes."""
+    if conn.dialect.name == "postgresql":
+        for s in sources:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS ix_{s.table}_search")
+        return
+    for s in sources:
+        for suffix in ("ai", "au", "ad"):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {s.table}_search_{suffix}")
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+def rebuild_search_index(conn: Connection) -> None:
+    """Refill the SQLite index from the source tables (Postgres indexes need no rebuild)."""
+    if conn.dialect.name == "postgresql":
+        return
+    drop_search_index(conn)
+    create_search_index(conn)
+
+def ensure_search_index(engine: Engine) -> None:
+    """Startup hook: create the index for databases that don't have it yet."""
+    with engine.begin() as conn:
+        create_search_index(conn)
+
+# ---------------------------------------------------------------------------
+# Querying
+# ---------------------------------------------------------------------------
+
+class SearchHit(NamedTuple):
+    kind: str
+    id: int
+    project_id: int
+    project_title: str
+    title: str  # HTML, matches wrapped in <mark>
+    snippet: Optional[str]  # HTML excerpt of the body around the first match
+    score: float  # higher is better; only comparable within one response
+
+def fold(value: str) -> str:
+    """Lowercase and strip diacritics ("Cédula" -> "cedula"), like FTS5's remove_diacritics."""
+    return "".join(c for c in unicodedata.normalize("NFKD", value) if not unicodedata.combining(c)).lower()
+
+def query_terms(q: str) -> list[str]:
+    """Words of a user query, lowercased; punctuation and operators are dropped."""
+    return [t.lower() for t in re.findall(r"[^\W_]+", q)][:MAX_QUERY_TERMS]
+
+def highlight(value: str, terms: Sequence[str]) -> str:
+    """HTML-escape ``value`` and wrap words starting with one of the (folded) ``terms`` in <mark>."""
+    out, pos = [], 0
+    for m in re.finditer(r"[^\W_]+", value):
+        if fold(m.group()).startswith(tuple(terms)):
+            out += [html.escape(value[pos:m.start()]), "<mark>", html.escape(m.group()), "</mark>"]
+            pos = m.end()
+    out.append(html.escape(value[pos:]))
+    return "".join(out)
+
+def snippet(value: str, terms: Sequence[str], words: int = SNIPPET_WORDS) -> Optional[str]:
+    """Highlighted excerpt of ``words`` words around the first match (or from the start)."""
+    tokens = list(re.finditer(r"\S+", value))
+    if not tokens:
+        return None
+    first = next((i for i, t in enumerate(tokens) if any(fold(w).startswith(tuple(terms)) for w in re.findall(r"[^\W_]+", t.group()))), 0)
+    start = max(0, first - words // 4)
+    end = min(len(tokens), start + words)
+    excerpt = highlight(value[tokens[start].start():tokens[end - 1].end()], terms)
+    return ("…" if start > 0 else "") + excerpt + ("…" if end < len(tokens) else "")
+
+def _filters(table: str, project_id, kinds, params: dict) -> str:
+    sql = ""
+    if project_id is not None:
+        sql += f" AND {table}.project_id = :project_id"
+        params["project_id"] = project_id
+    if kinds:
+        sql += f" AND {table}.kind IN ({', '.join(f':kind{i}' for i in range(len(kinds)))})"
+        params.update({f"kind{i}": k for i, k in enumerate(kinds)})
+    return sql
+
+def _sqlite_parents_live() -> str:
+    # Entries of live chunk rows whose file was soft-deleted stay in the FTS table; skip them here
+    return "".join(
+        f" AND NOT ({FTS_TABLE}.kind = '{s.kind}' AND {FTS_TABLE}.ref_id IN (SELECT id FROM {s.parent} WHERE is_deleted = 1))"
+        for s in SOURCES if s.parent
+    )
+
+def _sqlite_search(terms, project_id, kinds, limit, offset):
+    # Every word must match; the last one as a prefix, so results appear while typing
+    match = " ".join(f'"{fold(t)}"' for t in terms) + "*"
+    params = {"match": match, "limit": limit, "offset": offset}
+    where = f"{FTS_TABLE} MATCH :match" + _filters(FTS_TABLE, project_id, kinds, params)
+    if SEARCH_RANK_WINDOW > 0:
+        # Walking matches in rowid order stops early; bm25 over all of them does not
+        params["window"] = SEARCH_RANK_WINDOW
+        where += (
+            f" AND {FTS_TABLE}.rowid >= coalesce((SELECT {FTS_TABLE}.rowid FROM {FTS_TABLE} WHERE {where}"
+            f" ORDER BY {FTS_TABLE}.rowid DESC LIMIT 1 OFFSET :window - 1), 0)"
+        )
+    # Rank first, then read the stored text of the page's rows by rowid only
+    sql = f"""
+        WITH top AS (
+            SELECT {FTS_TABLE}.rowid AS rid, -bm25({FTS_TABLE}, 0, 0, 0, 10.0, 1.0) AS score
+            FROM {FTS_TABLE}
+            WHERE {where} AND {FTS_TABLE}.project_id NOT IN (SELECT id FROM projects WHERE is_deleted = 1){_sqlite_parents_live()}
+            ORDER BY score DESC LIMIT :limit OFFSET :offset
+        )
+        SELECT s.kind, s.ref_id, s.project_id, p.title, coalesce(f.filename, s.title), s.body, top.score
+        FROM top JOIN {FTS_TABLE} s ON s.rowid = top.rid JOIN projects p ON p.id = s.project_id
+        LEFT JOIN files f ON s.kind = 'document' AND f.id = s.ref_id
+        ORDER BY top.score DESC
+    """
+    return text(sql), params
+
+def _pg_live(source: SearchSource, row: str = "") -> str:
+    live = f"coalesce({row}is_deleted, false) = false" if source.soft_delete else "true"
+    if source.parent:
+        live += f" AND NOT EXISTS (SELECT 1 FROM {source.parent} par WHERE par.id = {row}{source.ref} AND par.is_deleted)"
+    return live
+
+def _postgres_search(terms, project_id, kinds, limit, offset):
+    params = {"tsquery": " & ".join(terms) + ":*", "limit": limit, "offset": offset, "window": SEARCH_RANK_WINDOW or None}
+    project_filter = ""
+    if project_id is not None:
+        project_filter = " AND src.project_id = :project_id"
+        params["project_id"] = project_id
+    # Newest SEARCH_RANK_WINDOW matches per kind, then ts_rank over those only
+    branches = [
+        f"(SELECT '{s.kind}' AS kind, src.{s.ref} AS ref_id, src.project_id, p.title AS project_title, "
+        f"{_concat(s.title, 'src.')} AS title, {_concat(s.body, 'src.')} AS body, "
+        f"{_pg_document(s, 'src.')} AS document "
+        f"FROM {s.table} src JOIN projects p ON p.id = src.project_id CROSS JOIN q "
+        f"WHERE {_pg_document(s, 'src.')} @@ q.query "
+        f"AND {_pg_live(s, 'src.')} AND coalesce(p.is_deleted, false) = false{project_filter} "
+        f"ORDER BY src.id DESC LIMIT :window)"
+        for s in SOURCES if not kinds or s.kind in kinds
+    ]
+    sql = f"""
+        WITH q AS (SELECT to_tsquery('{TS_CONFIG}', :tsquery) AS query)
+        SELECT hits.kind, hits.ref_id, hits.project_id, hits.project_title,
+               coalesce(f.filename, hits.title), hits.body, ts_rank(hits.document, q.query) AS score
+        FROM ({" UNION ALL ".join(branches)}) hits CROSS JOIN q
+        LEFT JOIN files f ON hits.kind = 'document' AND f.id = hits.ref_id
+        ORDER BY score DESC LIMIT :limit OFFSET :offset
+    """
+    return text(sql), params
+
+def search(
+    db: Session,
+    q: str,
+    project_id: Optional[int] = None,
+    kinds: Optional[Sequence[str]] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> list[SearchHit]:
+    """
+    Ranked full-text search over tasks, checklist items, timeline items,
+    files (by name and extracted text) and activity of every live matter.
+
+    Ranking looks at the SEARCH_RANK_WINDOW most recently created matches
+    (per kind on Postgres), which keeps a query that matches half the
+    database ("nota") as fast as a selective one. Highlighting is done here
+    rather than in SQL, for the returned rows only.
+
+    Args:
+        db: Database session
+        q: User query; every word must match, the last one as a prefix
+        project_id: Restrict to one matter
+        kinds: Restrict to these kinds (see KINDS)
+        limit: Page size
+        offset: Rows to skip
+
+    Returns:
+        Hits, best first
+    """
+    terms = query_terms(q)
+    if not terms:
+        return []
+    builder = _postgres_search if db.get_bind().dialect.name == "postgresql" else _sqlite_search
+    stmt, params = builder(terms, project_id, list(kinds or ()), limit, offset)
+    folded = [fold(t) for t in terms]
+    return [
+        SearchHit(kind, ref_id, pid, project_title, highlight(title, folded), snippet(body, folded), float(score))
+        for kind, ref_id, pid, project_title, title, body, score in db.execute(stmt, params)
+    ]
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.search_index", description="Maintain the full-text search index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="refill the index from the source tables")
+    parser.parse_args(argv)
+
+    from .db import engine
+    with engine.begin() as conn:
+        rebuild_search_index(conn)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import logging
+import os
+import threading
+from datetime import date, datetime
+from typing import Optional, Iterable, Sequence
+from sqlalchemy import Date, DateTime, and_, case, func, literal, literal_column, select, text, true
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .db import SessionLocal
+from .models import Project, Task, ChecklistItem, ProjectStats
+
+logger = logging.getLogger(__name__)
+
+# Task statuses counted as finished (seed data uses English, the UI Spanish)
+DONE_TASK_STATUSES = ("Done", "Hecho")
+# Seconds between runs of the job that rewrites rollups gone stale overnight; 0 disables it
+PROJECT_STATS_REFRESH_INTERVAL = int(os.getenv("PROJECT_STATS_REFRESH_INTERVAL", "3600"))
+
+# Columns whose changes move the rollup; edits to anything else (titles,
+# assignees, the change_version bump) don't fire the stats triggers
+STATS_PROJECT_COLUMNS = ("status", "risk", "target_close_date")
+STATS_SOURCES = {
+    "tasks": ("project_id", "status", "due_date", "is_deleted"),
+    "checklist_items": ("project_id", "stage", "is_done", "is_deleted"),
+}
+
+_refresh_stop = threading.Event()
+_refresh_thread: Optional[threading.Thread] = None
+
+def stats_upsert(dialect: str, project_id, today, now):
+    """
+    Statement rewriting one project's rollup row from its current data.
+
+    A single ``INSERT ... SELECT ... ON CONFLICT DO UPDATE``: one aggregate
+    per child table, each restricted by the indexed project_id, so the cost
+    depends on the size of this matter only. Nothing is written if the
+    project does not exist.
+
+    Args:
+        dialect: "postgresql" or "sqlite"
+        project_id, today, now: SQL expressions; bound values when run from
+            Python, the trigger row and the database clock inside triggers
+
+    Returns:
+        The upsert statement
+    """
+    is_open = Task.status.notin_(DONE_TASK_STATUSES)
+    tasks = (
+        select(
+            func.coalesce(func.sum(case((is_open, 1), else_=0)), 0).label("open_tasks"),
+            func.coalesce(func.sum(case((is_open, 0), else_=1)), 0).label("done_tasks"),
+            func.coalesce(func.sum(case((and_(is_open, Task.due_date < today), 1), else_=0)), 0).label("overdue_tasks"),
+            func.min(case((and_(is_open, Task.due_date >= today), Task.due_date))).label("next_due_date"),
+        )
+        .where(Task.project_id == project_id, Task.is_deleted.isnot(True))
+        .subquery()
+    )
+    stages = (
+        select(
+            ChecklistItem.stage,
+            func.count().label("total"),
+            func.coalesce(func.sum(case((ChecklistItem.is_done.is_(True), 1), else_=0)), 0).label("done"),
+        )
+        .where(ChecklistItem.project_id == project_id, ChecklistItem.is_deleted.isnot(True))
+        .group_by(ChecklistItem.stage)
+        .subquery()
+    )
+    if dialect == "postgresql":
+        by_stage = func.coalesce(
+            func.json_object_agg(stages.c.stage, func.json_build_object("done", stages.c.done, "total", stages.c.total)),
+            text("'{}'::json"),
+        )
+    else:
+        by_stage = func.json_group_object(stages.c.stage, func.json_object("done", stages.c.done, "total", stages.c.total))
+    checklist = select(
+        func.coalesce(func.sum(stages.c.total), 0).label("checklist_total"),
+        func.coalesce(func.sum(stages.c.done), 0).label("checklist_done"),
+        by_stage.label("checklist_by_stage"),
+    ).subquery()
+
+    source = (
+        select(
+            Project.id.label("project_id"),
+            Project.status,
+            Project.risk,
+            Project.target_close_date,
+            *tasks.c,
+            *checklist.c,
+            today.label("computed_on"),
+            now.label("updated_at"),
+        )
+        .select_from(Project)
+        .join(tasks, true())
+        .join(checklist, true())
+        .where(Project.id == project_id)  # also keeps SQLite from reading ON CONFLICT as a join constraint
+    )
+    columns = [c.name for c in source.selected_columns]
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    stmt = insert(ProjectStats).from_select(columns, source, include_defaults=False)
+    return stmt.on_conflict_do_update(
+        index_elements=[ProjectStats.project_id],
+        set_={name: stmt.excluded[name] for name in columns if name != "project_id"},
+    )
+
+def refresh_project_stats(db: Session, project_id: int, today: Optional[date] = None) -> None:
+    """
+    Rewrite a project's rollup row from its current data.
+
+    Writes don't need this: the stats triggers refresh the row in the same
+    statement as the change. It is for re-evaluating overdue counts against
+    a later day (refresh_stale_stats) and for backfills.
+
+    Args:
+        db: Database session
+        project_id: Project whose rollup should be refreshed
+        today: Reference day for overdue/next deadline (defaults to today)
+    """
+    db.execute(stats_upsert(
+        db.get_bind().dialect.name,
+        literal(project_id),
+        literal(today or date.today(), Date),
+        literal(datetime.utcnow(), DateTime),
+    ))
+
+# ---------------------------------------------------------------------------
+# Triggers
+# ---------------------------------------------------------------------------
+
+def _trigger_upsert(dialect, project_id: str) -> str:
+    if dialect.name == "postgresql":
+        today, now = func.current_date(), func.timezone("UTC", func.now())
+    else:
+        today, now = func.date("now", "localtime"), func.datetime("now")
+    stmt = stats_upsert(dialect.name, literal_column(project_id), today, now)
+    return str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+def _sqlite_trigger_ddl(dialect) -> list[str]:
+    statements = [
+        f"CREATE TRIGGER IF NOT EXISTS projects_stats_ai AFTER INSERT ON projects BEGIN {_trigger_upsert(dialect, 'new.id')}; END",
+        f"CREATE TRIGGER IF NOT EXISTS projects_stats_au AFTER UPDATE OF {', '.join(STATS_PROJECT_COLUMNS)} ON projects "
+        f"BEGIN {_trigger_upsert(dialect, 'new.id')}; END",
+    ]
+    for table, columns in STATS_SOURCES.items():
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_stats_ai AFTER INSERT ON {table} "
+            f"BEGIN {_trigger_upsert(dialect, 'new.project_id')}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_stats_au AFTER UPDATE OF {', '.join(columns)} ON {table} "
+            f"BEGIN {_trigger_upsert(dialect, 'new.project_id')}; END",
+            # A row moved to another matter also changes the one it left
+            f"CREATE TRIGGER IF NOT EXISTS {table}_stats_am AFTER UPDATE OF project_id ON {table} "
+            f"WHEN old.project_id IS NOT new.project_id BEGIN {_trigger_upsert(dialect, 'old.project_id')}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_stats_ad AFTER DELETE ON {table} "
+            f"BEGIN {_trigger_upsert(dialect, 'old.project_id')}; END",
+        ]
+    return statements
+
+def _postgres_trigger_ddl(dialect) -> list[str]:
+    statements = [
+        "CREATE OR REPLACE FUNCTION project_stats_refresh(p_project_id integer) RETURNS void LANGUAGE sql AS $$ "
+        f"{_trigger_upsert(dialect, 'p_project_id')} $$",
+        "CREATE OR REPLACE FUNCTION project_stats_project_changed() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        "PERFORM project_stats_refresh(NEW.id); RETURN NULL; END $$",
+        "CREATE OR REPLACE FUNCTION project_stats_child_changed() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        "IF TG_OP = 'DELETE' THEN PERFORM project_stats_refresh(OLD.project_id); RETURN NULL; END IF; "
+        "PERFORM project_stats_refresh(NEW.project_id); "
+        "IF TG_OP = 'UPDATE' THEN IF OLD.project_id IS DISTINCT FROM NEW.project_id THEN "
+        "PERFORM project_stats_refresh(OLD.project_id); END IF; END IF; "
+        "RETURN NULL; END $$",
+        f"CREATE OR REPLACE TRIGGER projects_stats AFTER INSERT OR UPDATE OF {', '.join(STATS_PROJECT_COLUMNS)} ON projects "
+        "FOR EACH ROW EXECUTE FUNCTION project_stats_project_changed()",
+    ]
+    for table, columns in STATS_SOURCES.items():
+        statements.append(
+            f"CREATE OR REPLACE TRIGGER {table}_stats AFTER INSERT OR DELETE OR UPDATE OF {', '.join(columns)} ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION project_stats_child_changed()"
+        )
+    return statements
+
+def create_stats_triggers(conn: Connection) -> None:
+    """
+    Create the triggers that keep project_stats current.
+
+    Every write to a project's tracked columns, or to its tasks and
+    checklist items, rewrites the rollup inside the writing statement, so
+    the rollup commits (or rolls back) with the data and request handlers
+    spend no round trips on it. Safe to run repeatedly.
+    """
+    if conn.dialect.name == "postgresql":
+        statements = _postgres_trigger_ddl(conn.dialect)
+    else:
+        statements = _sqlite_trigger_ddl(conn.dialect)
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+
+def drop_stats_triggers(conn: Connection) -> None:
+    """Remove the stats triggers (and on Postgres their functions)."""
+    if conn.dialect.name == "postgresql":
+        for table in ("projects", *STATS_SOURCES):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table}_stats ON {table}")
+        for function in ("project_stats_child_changed()", "project_stats_project_changed()", "project_stats_refresh(integer)"):
+            conn.exec_driver_sql(f"DROP FUNCTION IF EXISTS {function}")
+        return
+    names = ["projects_stats_ai", "projects_stats_au"]
+    names += [f"{table}_stats_{suffix}" for table in STATS_SOURCES for suffix in ("ai", "au", "am", "ad")]
+    for name in names:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+
+def ensure_stats_triggers(engine: Engine) -> None:
+    """Startup hook: create the stats triggers for databases that don't have them yet."""
+    with engine.begin() as conn:
+        create_stats_triggers(conn)
+
+def is_stale(row: ProjectStats, today: date) -> bool:
+    # Overdue counts only change with the calendar when an open task's due date passes,
+    # i.e. when next_due_date is now in the past; every other rollup is still exact
+    return row.computed_on < today and row.next_due_date is not None and row.next_due_date < today
+
+def deadlines_as_of(db: Session, rows: Sequence[ProjectStats], today: Optional[date] = None) -> dict[int, dict]:
+    """
+    Current overdue count and next deadline for the rollups that went stale.
+
+    Read-only: one grouped aggregate over the open tasks of the stale
+    matters, so a GET never has to rewrite the rollup. The stored rows are
+    brought up to date by the refresh job (refresh_stale_stats).
+
+    Args:
+        db: Database session
+        rows: Rollup rows about to be served
+        today: Reference day (defaults to today)
+
+    Returns:
+        Project id -> {"overdue_tasks", "next_due_date"}, for stale rows only
+    """
+    today = today or date.today()
+    stale = [r.project_id for r in rows if is_stale(r, today)]
+    if not stale:
+        return {}
+    current = {project_id: {"overdue_tasks": 0, "next_due_date": None} for project_id in stale}
+    for project_id, overdue, next_due in db.execute(
+        select(
+            Task.project_id,
+            func.coalesce(func.sum(case((Task.due_date < today, 1), else_=0)), 0),
+            func.min(case((Task.due_date >= today, Task.due_date))),
+        )
+        .where(Task.project_id.in_(stale), Task.status.notin_(DONE_TASK_STATUSES), Task.is_deleted.isnot(True))
+        .group_by(Task.project_id)
+    ):
+        current[project_id] = {"overdue_tasks": int(overdue), "next_due_date": next_due}
+    return current
+
+def refresh_stale_stats(db: Session, project_ids: Optional[Iterable[int]] = None, today: Optional[date] = None) -> int:
+    """
+    Re-evaluate rollups whose overdue count has gone out of date.
+
+    Returns:
+        Number of rows refreshed
+    """
+    today = today or date.today()
+    stmt = select(ProjectStats.project_id).where(
+        ProjectStats.computed_on < today,
+        ProjectStats.next_due_date.isnot(None),
+        ProjectStats.next_due_date < today,
+    )
+    if project_ids is not None:
+        stmt = stmt.where(ProjectStats.project_id.in_(list(project_ids)))
+    stale = db.execute(stmt).scalars().all()
+    for project_id in stale:
+        refresh_project_stats(db, project_id, today)
+    return len(stale)
+
+def _refresh_loop():
+    while not _refresh_stop.is_set():
+        db = SessionLocal()
+        try:
+            refreshed = refresh_stale_stats(db)
+            db.commit()
+            if refreshed:
+                logger.info("Refreshed %d stale project rollup(s)", refreshed)
+        except Exception:
+            logger.exception("Project stats refresh failed")
+        finally:
+            db.close()
+        _refresh_stop.wait(PROJECT_STATS_REFRESH_INTERVAL)
+
+def start_stats_refresher() -> None:
+    """Start the background thread that rewrites stale rollups (no-op when the interval is 0)."""
+    global _refresh_thread
+    if PROJECT_STATS_REFRESH_INTERVAL <= 0 or _refresh_thread is not None:
+        return
+    _refresh_stop.clear()
+    _refresh_thread = threading.Thread(target=_refresh_loop, name="project-stats-refresh", daemon=True)
+    _refresh_thread.start()
+
+def stop_stats_refresher() -> None:
+    """Signal the refresh thread to exit and wait briefly for it."""
+    global _refresh_thread
+    _refresh_stop.set()
+    if _refresh_thread is not None:
+        _refresh_thread.join(timeout=5)
+        _refresh_thread = None
+
+def backfill_project_stats(db: Session) -> int:
+    """Create rollup rows for projects that do not have one yet."""
+    missing = db.execute(
+        select(Project.id).outerjoin(ProjectStats, ProjectStats.project_id == Project.id).where(ProjectStats.project_id.is_(None))
+    ).scalars().all()
+    for project_id in missing:
+        refresh_project_stats(db, project_id)
+    db.commit()
+    return len(missing)
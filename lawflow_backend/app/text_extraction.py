@@ -0,0 +1,320 @@
+"""
+Background text extraction from uploaded documents into DocumentChunk rows,
+which the search index picks up (kind "document", see app/search_index.py).
+
+One low-priority worker thread processes files one chunk at a time, pausing
+between chunks and committing in small batches so it never holds the
+database or the GIL for long. Work is:
+
+- idempotent per content hash: a file whose sha256 was already extracted
+  gets a copy of those chunks instead of being parsed again;
+- resumable: chunking is deterministic, so a file interrupted by a restart
+  continues after the chunks it already stored.
+"""
+import codecs
+import csv
+import logging
+import os
+import queue
+import threading
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Optional
+from xml.etree import ElementTree
+import fitz  # PyMuPDF
+from sqlalchemy import case, delete, func, insert, literal, select, update
+from .db import SessionLocal
+from .models import DocumentChunk, FileItem
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTRACT_ENABLED = os.getenv("TEXT_EXTRACT_ENABLED", "true").lower() in ("1", "true", "yes")
+TEXT_EXTRACT_PAUSE = float(os.getenv("TEXT_EXTRACT_PAUSE", "0.05"))  # seconds between chunks
+TEXT_EXTRACT_BATCH = int(os.getenv("TEXT_EXTRACT_BATCH", "8"))  # chunks per commit
+TEXT_EXTRACT_MAX_CHUNKS = int(os.getenv("TEXT_EXTRACT_MAX_CHUNKS", "2000"))  # per file; the rest is not indexed
+# A "processing" claim not renewed for this long belongs to a worker that died (renewed on every batch commit)
+TEXT_EXTRACT_CLAIM_TIMEOUT = float(os.getenv("TEXT_EXTRACT_CLAIM_TIMEOUT", "600"))
+TEXT_CHUNK_CHARS = 4000
+PDF_PAGE_MAX_CHARS = 20000
+
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+EXTRACTABLE_MIME_TYPES = {"application/pdf", DOCX_MIME_TYPE, "text/plain", "text/csv"}
+
+# extract_status values
+EXTRACT_PENDING = "pending"
+EXTRACT_PROCESSING = "processing"
+EXTRACT_READY = "ready"
+EXTRACT_FAILED = "failed"
+EXTRACT_SKIPPED = "skipped"  # type has no extractable text
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_jobs: "queue.Queue[Optional[int]]" = queue.Queue()
+_thread: Optional[threading.Thread] = None
+_stopping = threading.Event()
+
+def initial_extract_status(mime_type: Optional[str]) -> str:
+    """extract_status for a newly stored file."""
+    return EXTRACT_PENDING if mime_type in EXTRACTABLE_MIME_TYPES else EXTRACT_SKIPPED
+
+# ---------------------------------------------------------------------------
+# Extractors: each yields text chunks in a fixed order and can start at any chunk
+# ---------------------------------------------------------------------------
+
+class _Chunker:
+    """Accumulates text and cuts it into ~TEXT_CHUNK_CHARS pieces at whitespace."""
+
+    def __init__(self):
+        self.parts: list[str] = []
+        self.size = 0
+
+    def add(self, text: str) -> Iterator[str]:
+        self.parts.append(text)
+        self.size += len(text)
+        while self.size >= TEXT_CHUNK_CHARS:
+            buffered = "".join(self.parts)
+            cut = buffered.rfind(" ", 0, TEXT_CHUNK_CHARS)
+            cut = cut if cut > TEXT_CHUNK_CHARS // 2 else TEXT_CHUNK_CHARS
+            yield buffered[:cut]
+            rest = buffered[cut:]
+            self.parts, self.size = [rest], len(rest)
+
+    def flush(self) -> Iterator[str]:
+        buffered = "".join(self.parts)
+        self.parts, self.size = [], 0
+        if buffered.strip():
+            yield buffered
+
+def _pdf_chunks(path: Path, start: int) -> Iterator[str]:
+    # One chunk per page, so resuming opens the document at the right page directly
+    with fitz.open(path) as doc:
+        for page_number in range(start, doc.page_count):
+            yield doc[page_number].get_text("text")[:PDF_PAGE_MAX_CHARS]
+
+def _docx_chunks(path: Path) -> Iterator[str]:
+    # Stream word/document.xml instead of loading the whole tree
+    chunker = _Chunker()
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        for _, elem in ElementTree.iterparse(xml, events=("end",)):
+            if elem.tag == f"{_W}t" and elem.text:
+                yield from chunker.add(elem.text)
+            elif elem.tag in (f"{_W}tab", f"{_W}br"):
+                yield from chunker.add(" ")
+            elif elem.tag == f"{_W}p":
+                yield from chunker.add("\n")
+                elem.clear()
+    yield from chunker.flush()
+
+def _text_encoding(path: Path) -> str:
+    # Uploads accept non-UTF-8 text (file_utils.sniff_mime_types); read it as Windows-1252,
+    # which is what Excel and other Windows tools export and a superset of latin-1's printable range
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with path.open("rb") as raw:
+        try:
+            while block := raw.read(64 * 1024):
+                decoder.decode(block)
+        except UnicodeDecodeError:
+            return "cp1252"
+    return "utf-8"
+
+def _text_chunks(path: Path) -> Iterator[str]:
+    chunker = _Chunker()
+    with path.open("rb") as raw:
+        reader = codecs.getreader(_text_encoding(path))(raw, errors="replace")
+        while block := reader.read(64 * 1024):
+            yield from chunker.add(block)
+    yield from chunker.flush()
+
+def _csv_chunks(path: Path) -> Iterator[str]:
+    chunker = _Chunker()
+    with path.open(encoding=_text_encoding(path), errors="replace", newline="") as f:
+        for row in csv.reader(f):
+            yield from chunker.add(" ".join(cell for cell in row if cell) + "\n")
+    yield from chunker.flush()
+
+def iter_chunks(path: Path, mime_type: str, start: int = 0) -> Iterator[str]:
+    """
+    Text of a document, cut into chunks.
+
+    The sequence is deterministic for a given file, which is what makes
+    extraction resumable: ``start`` skips chunks stored by an earlier run.
+
+    Args:
+        path: Stored file
+        mime_type: One of EXTRACTABLE_MIME_TYPES
+        start: Index of the first chunk to produce
+
+    Yields:
+        Chunk texts, from chunk ``start`` on
+    """
+    if mime_type == "application/pdf":
+        yield from _pdf_chunks(path, start)
+        return
+    if mime_type == DOCX_MIME_TYPE:
+        chunks = _docx_chunks(path)
+    elif mime_type == "text/csv":
+        chunks = _csv_chunks(path)
+    else:
+        chunks = _text_chunks(path)
+    for i, chunk in enumerate(chunks):
+        if i >= start:
+            yield chunk
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+def _claim(db, file_id: int) -> Optional[FileItem]:
+    claimed = db.execute(
+        update(FileItem)
+        .where(FileItem.id == file_id, FileItem.extract_status == EXTRACT_PENDING)
+        .values(extract_status=EXTRACT_PROCESSING, extract_claimed_at=datetime.utcnow())
+    ).rowcount
+    db.commit()
+    return db.get(FileItem, file_id) if claimed else None
+
+def _renew_claim(db, file_id: int) -> None:
+    # Core UPDATE: keeps the heartbeat out of the change stream
+    db.execute(update(FileItem).where(FileItem.id == file_id).values(extract_claimed_at=datetime.utcnow()))
+
+def _copy_chunks(db, item: FileItem) -> bool:
+    # Same content extracted before (possibly in another matter): copy its rows
+    source_id = db.execute(
+        select(FileItem.id).where(
+            FileItem.sha256 == item.sha256,
+            FileItem.id != item.id,
+            FileItem.extract_status == EXTRACT_READY,
+        ).limit(1)
+    ).scalar()
+    if source_id is None:
+        return False
+    db.execute(delete(DocumentChunk).where(DocumentChunk.file_id == item.id))
+    db.execute(
+        insert(DocumentChunk).from_select(
+            ["file_id", "project_id", "seq", "text"],
+            select(literal(item.id), literal(item.project_id), DocumentChunk.seq, DocumentChunk.text)
+            .where(DocumentChunk.file_id == source_id)
+            .order_by(DocumentChunk.seq),
+        )
+    )
+    return True
+
+def extract_file(file_id: int) -> None:
+    """Extract one file's text into DocumentChunk rows and record the outcome."""
+    db = SessionLocal()
+    try:
+        item = _claim(db, file_id)
+        if item is None:
+            return  # already handled
+        if item.sha256 and _copy_chunks(db, item):
+            item.extract_status = EXTRACT_READY
+            db.commit()
+            return
+
+        path = Path(item.stored_path)
+        if not path.exists():
+            item.extract_status = EXTRACT_SKIPPED  # metadata-only row (seed data)
+            db.commit()
+            return
+        done = db.execute(select(func.count()).where(DocumentChunk.file_id == item.id)).scalar_one()
+        pending = 0
+        try:
+            for seq, chunk in enumerate(iter_chunks(path, item.mime_type, done), start=done):
+                if _stopping.is_set():
+                    item.extract_status = EXTRACT_PENDING  # the next start resumes it after `seq`
+                    db.commit()
+                    return
+                if seq >= TEXT_EXTRACT_MAX_CHUNKS:
+                    break
+                # Blank pages are stored too (as ""): resuming counts rows, so numbering must stay dense
+                text = chunk if chunk.strip() else ""
+                db.add(DocumentChunk(file_id=item.id, project_id=item.project_id, seq=seq, text=text))
+                pending += 1
+                if pending >= TEXT_EXTRACT_BATCH:
+                    _renew_claim(db, item.id)
+                    db.commit()
+                    pending = 0
+                _stopping.wait(TEXT_EXTRACT_PAUSE)  # yield to request handling
+        except Exception as e:
+            db.rollback()
+            item.extract_status = EXTRACT_FAILED
+            db.commit()
+            logger.warning("Text extraction for file %s failed: %s", file_id, e)
+            return
+        item.extract_status = EXTRACT_READY
+        db.commit()
+    finally:
+        db.close()
+
+def _worker_loop():
+    while True:
+        file_id = _jobs.get()
+        if file_id is None or _stopping.is_set():
+            return
+        try:
+            extract_file(file_id)
+        except Exception:
+            logger.exception("Text extraction job for file %s crashed", file_id)
+
+def enqueue_extraction(file_id: int) -> None:
+    """Queue a file for text extraction. Call after the row has been committed."""
+    if not _stopping.is_set():
+        _jobs.put(file_id)
+
+def requeue_unfinished() -> int:
+    """
+    Put back every file whose extraction never completed; stored chunks are
+    kept and extraction resumes after them. Files uploaded before extraction
+    existed (no extract_status) are queued too.
+
+    A "processing" file is only reset once its claim is older than
+    TEXT_EXTRACT_CLAIM_TIMEOUT; until then another worker process may still
+    be extracting it, and resuming it twice would store duplicate chunks.
+    """
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(FileItem)
+            .where(FileItem.extract_status.is_(None))
+            .values(extract_status=case(
+                (FileItem.mime_type.in_(EXTRACTABLE_MIME_TYPES), EXTRACT_PENDING), else_=EXTRACT_SKIPPED,
+            ))
+        )
+        cutoff = datetime.utcnow() - timedelta(seconds=TEXT_EXTRACT_CLAIM_TIMEOUT)
+        db.execute(
+            update(FileItem)
+            .where(
+                FileItem.extract_status == EXTRACT_PROCESSING,
+                (FileItem.extract_claimed_at.is_(None)) | (FileItem.extract_claimed_at < cutoff),
+            )
+            .values(extract_status=EXTRACT_PENDING)
+        )
+        db.commit()
+        ids = db.execute(
+            select(FileItem.id).where(FileItem.extract_status == EXTRACT_PENDING).order_by(FileItem.id)
+        ).scalars().all()
+    finally:
+        db.close()
+    for file_id in ids:
+        enqueue_extraction(file_id)
+    return len(ids)
+
+def start_extractor() -> None:
+    """Start the extraction thread and requeue unfinished files (no-op when disabled)."""
+    global _thread
+    if not TEXT_EXTRACT_ENABLED or _thread is not None:
+        return
+    _stopping.clear()
+    _thread = threading.Thread(target=_worker_loop, name="text-extraction", daemon=True)
+    _thread.start()
+    requeue_unfinished()
+
+def stop_extractor() -> None:
+    """Stop after the current chunk; the file in progress is set back to pending and resumes on the next start."""
+    global _thread
+    _stopping.set()
+    _jobs.put(None)
+    if _thread is not None:
+        _thread.join(timeout=5)
+        _thread = None
@@ -0,0 +1,179 @@
+from datetime import datetime
+from typing import NamedTuple, Optional, Sequence, TypeVar, Union
+from sqlalchemy import insert, literal, select, true, update
+from sqlalchemy.orm import Session, aliased, joinedload, selectinload
+from sqlalchemy.orm.attributes import QueryableAttribute
+from .change_stream import record_written
+from .etag import bump_project_version, remember_project_version
+from .models import Activity, Project
+
+T = TypeVar("T")
+
+class ActivityEntry(NamedTuple):
+    """Activity feed entry written together with a row."""
+    actor: str
+    verb: str
+    detail: Union[str, QueryableAttribute, None]  # fixed text, or a column of the written row (Task.title)
+    project_id: Optional[int] = None  # defaults to the written row's project
+
+def update_row(
+    db: Session,
+    model: type[T],
+    row_id: int,
+    values: dict,
+    activity: Optional[ActivityEntry] = None,
+    bump_version: bool = False,
+    related: Sequence[str] = (),
+) -> Optional[T]:
+    """
+    Update one row by primary key with ``UPDATE ... RETURNING``.
+
+    Replaces the load / setattr / flush / refresh sequence: the statement
+    both checks that the row exists and returns its new state, including
+    columns set by the database or by ``onupdate`` defaults. For a project,
+    the change_version bump is part of the same UPDATE.
+
+    Args:
+        db: Database session carrying the write
+        model: Mapped class
+        row_id: Primary key
+        values: Column values to set (nothing is written when empty)
+        activity: Feed entry to log with the change (see write_row)
+        bump_version: Also bump the project's change version
+        related: Relationships to load along with the row
+
+    Returns:
+        The updated instance, or None if there is no such row
+    """
+    if bump_version and model is Project:
+        values = {**values, "change_version": Project.change_version + 1}
+    if not values:
+        row = db.get(model, row_id, options=[selectinload(getattr(model, name)) for name in related])
+        if row is not None and activity is not None:
+            log_written(db, model, row, activity, bump_version)
+        return row
+    return write_row(db, model, update(model).where(model.id == row_id).values(values), activity, bump_version, related)
+
+def insert_row(
+    db: Session,
+    model: type[T],
+    values: dict,
+    activity: Optional[ActivityEntry] = None,
+    bump_version: bool = False,
+    related: Sequence[str] = (),
+) -> T:
+    """
+    Insert one row with ``INSERT ... RETURNING``.
+
+    Args:
+        db: Database session carrying the write
+        model: Mapped class
+        values: Column values; Python-side column defaults fill in the rest
+        activity: Feed entry to log with the new row (see write_row)
+        bump_version: Also bump the project's change version
+        related: Relationships to load along with the row
+
+    Returns:
+        The new instance, with its primary key and defaults
+    """
+    return write_row(db, model, insert(model).values(values), activity, bump_version, related)
+
+def write_row(db: Session, model: type[T], stmt, activity: Optional[ActivityEntry] = None, bump_version: bool = False, related: Sequence[str] = ()) -> Optional[T]:
+    """
+    Run a single-row INSERT or UPDATE together with its activity entry and version bump.
+
+    On Postgres this is one statement: the write is a data-modifying CTE
+    whose RETURNING row feeds the activity INSERT and the change_version
+    UPDATE, and the final SELECT joins in ``related``. SQLite has no
+    data-modifying CTEs, so there the write, the INSERT and the bump are
+    consecutive statements and ``related`` comes in one selectin query.
+
+    Returns:
+        The written instance, or None if the UPDATE matched no row
+    """
+    if activity is not None and db.get_bind().dialect.name == "postgresql":
+        return _write_in_one_statement(db, model, stmt, activity, bump_version, related)
+    row = db.execute(stmt.returning(model).options(*[selectinload(getattr(model, name)) for name in related])).scalar()
+    if row is None:
+        return None
+    record_written(db, [row])
+    if activity is not None:
+        log_written(db, model, row, activity, bump_version)
+    return row
+
+def _project_key(model, columns):
+    return columns.id if model is Project else columns.project_id
+
+def logged_write_statement(model, stmt, activity: ActivityEntry, bump_version: bool = False, related: Sequence[str] = ()):
+    """
+    The single Postgres statement behind write_row.
+
+    Selects the written row, its activity entry and, when another row's
+    project is bumped, the new change_version.
+    """
+    now = datetime.utcnow()
+    written = stmt.returning(*model.__table__.c).cte("written")
+    if isinstance(activity.detail, QueryableAttribute):
+        detail = written.c[activity.detail.key]
+    else:
+        detail = literal(activity.detail, Activity.detail.type)
+    project_id = _project_key(model, written.c) if activity.project_id is None else literal(activity.project_id)
+    logged = (
+        insert(Activity)
+        .from_select(
+            ["project_id", "actor", "verb", "detail", "created_at", "updated_at", "is_deleted"],
+            select(project_id, literal(activity.actor), literal(activity.verb), detail, literal(now), literal(now), literal(False))
+            .select_from(written),
+            include_defaults=False,  # the defaults are spelled out above; bound defaults can't go inside a CTE
+        )
+        .returning(*Activity.__table__.c)
+        .cte("logged")
+    )
+    row, entry = aliased(model, written), aliased(Activity, logged)
+    query = (
+        select(row, entry)
+        .select_from(written)
+        .join(logged, true())
+        .options(*[joinedload(getattr(row, name)) for name in related])
+        .execution_options(populate_existing=True)
+    )
+    if bump_version and model is not Project:  # a project's own UPDATE already bumped it
+        bumped = (
+            update(Project)
+            .where(Project.id == written.c.project_id)
+            .values(change_version=Project.change_version + 1, updated_at=now)
+            .returning(Project.change_version)
+            .cte("bumped")
+        )
+        query = query.add_columns(bumped.c.change_version).join(bumped, true())
+    return query
+
+def _write_in_one_statement(db: Session, model, stmt, activity: ActivityEntry, bump_version: bool, related: Sequence[str]):
+    result = db.execute(logged_write_statement(model, stmt, activity, bump_version, related)).first()
+    if result is None:
+        return None
+    row, entry = result[0], result[1]
+    record_written(db, [row, entry])
+    if bump_version and model is Project:
+        remember_project_version(db, row.id, row.change_version)
+    elif bump_version:
+        remember_project_version(db, row.project_id, result[2])
+    return row
+
+def log_written(db: Session, model, row, activity: ActivityEntry, bump_version: bool = False) -> None:
+    """Log ``activity`` for a row already written, and bump its project's version."""
+    detail = getattr(row, activity.detail.key) if isinstance(activity.detail, QueryableAttribute) else activity.detail
+    project_id = _project_key(model, row) if activity.project_id is None else activity.project_id
+    log_activity(db, project_id, activity.actor, activity.verb, detail)
+    if not bump_version:
+        return
+    if model is Project:
+        remember_project_version(db, row.id, row.change_version)  # bumped by the row's own UPDATE
+    else:
+        bump_project_version(db, _project_key(model, row))
+
+def log_activity(db: Session, project_id: int, actor: str, verb: str, detail: Optional[str]) -> Activity:
+    """Insert an activity entry in the current transaction."""
+    row = db.execute(insert(Activity).values(project_id=project_id, actor=actor, verb=verb, detail=detail).returning(Activity)).scalar_one()
+    record_written(db, [row])
+    return row
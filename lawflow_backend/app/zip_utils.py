@@ -0,0 +1,100 @@
+import io
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple, Union
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
+
+# Read size for files added from disk, and how much compressed output may
+# accumulate before it is handed to the response.
+READ_CHUNK_SIZE = 256 * 1024
+FLUSH_THRESHOLD = 256 * 1024
+
+# Formats that are already compressed; deflating them again only burns CPU.
+STORED_SUFFIXES = {
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".tif", ".tiff",
+    ".zip", ".rar", ".7z", ".docx", ".xlsx", ".pptx",
+}
+
+ZipMember = Tuple[str, Union[str, bytes, Path]]
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only, non-seekable buffer that ZipFile writes into.
+
+    Because it cannot seek, ZipFile falls back to data descriptors after each
+    member, so nothing already produced ever needs to be rewritten and the
+    buffered bytes can be drained and sent as soon as they exist.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._pending = 0
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pending += len(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self._pending = 0
+        return data
+
+def stream_zip(members: Iterable[ZipMember], date_time: Optional[Tuple[int, int, int, int, int, int]] = None) -> Iterator[bytes]:
+    """
+    Produce a ZIP archive incrementally.
+
+    Members are either in-memory content (str/bytes) or a Path, which is
+    read from disk in chunks. Compressed output is yielded as soon as
+    roughly FLUSH_THRESHOLD bytes are ready, so memory use does not depend
+    on the archive size. ZIP64 records are written automatically for large
+    members and for archives over 4 GB.
+
+    With ``date_time`` given, in-memory members carry that timestamp
+    instead of the current time (files from disk keep their mtime), so the
+    same members always produce the same bytes.
+
+    Args:
+        members: Iterable of (archive name, content or path) pairs
+        date_time: Timestamp for in-memory members, as in ZipInfo.date_time
+
+    Yields:
+        Consecutive chunks of the ZIP file
+    """
+    sink = _ChunkSink()
+    with ZipFile(sink, "w", ZIP_DEFLATED) as z:
+        for arcname, source in members:
+            if isinstance(source, Path):
+                zinfo = ZipInfo.from_file(source, arcname)
+                zinfo.compress_type = ZIP_STORED if source.suffix.lower() in STORED_SUFFIXES else ZIP_DEFLATED
+                with source.open("rb") as src, z.open(zinfo, "w") as dst:
+                    while chunk := src.read(READ_CHUNK_SIZE):
+                        dst.write(chunk)
+                        if sink.pending >= FLUSH_THRESHOLD:
+                            yield sink.drain()
+            elif date_time is not None:
+                zinfo = ZipInfo(arcname, date_time)
+                zinfo.compress_type = ZIP_DEFLATED
+                zinfo.external_attr = 0o600 << 16  # what writestr gives a bare name
+                z.writestr(zinfo, source)
+            else:
+                z.writestr(arcname, source)
+            if sink.pending:
+                yield sink.drain()
+    # Central directory, written when the ZipFile closes
+    if sink.pending:
+        yield sink.drain()
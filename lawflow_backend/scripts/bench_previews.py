@@ -0,0 +1,186 @@
+"""
+Benchmark preview rendering: the original PNG round-trip / full-decode code
+against the size-targeted rasteriser in app/preview_utils.py.
+
+Every (document, implementation) pair runs in a fresh interpreter so peak
+memory is measured in isolation. Run from lawflow_backend/:
+
+    python scripts/bench_previews.py                 # synthetic corpus
+    python scripts/bench_previews.py --corpus ~/scans --repeat 10
+"""
+import argparse
+import io
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+CORPUS_SUFFIXES = {".pdf", ".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp", ".gif"}
+
+PROC_STATUS = Path("/proc/self/status")
+
+def _reset_peak_rss() -> int:
+    """Reset the RSS high-water mark where the OS allows it and return the current RSS in KiB."""
+    if PROC_STATUS.exists():
+        Path("/proc/self/clear_refs").write_text("5")  # Linux: resets VmHWM to the current RSS
+        return _proc_status_kb("VmRSS")
+    return _peak_rss_kb()
+
+def _peak_rss_kb() -> int:
+    if PROC_STATUS.exists():
+        return _proc_status_kb("VmHWM")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # bytes on macOS, KiB elsewhere
+
+def _proc_status_kb(field: str) -> int:
+    for line in PROC_STATUS.read_text().splitlines():
+        if line.startswith(field + ":"):
+            return int(line.split()[1])
+    raise KeyError(field)
+
+# ---------------------------------------------------------------------------
+# Implementations under test
+# ---------------------------------------------------------------------------
+
+def legacy_render(path: Path, out: Path, box):
+    # The rasteriser as it was: fixed 2x render, PNG encode + decode, then downsample;
+    # images went through Image.thumbnail with its default draft/reducing_gap
+    import fitz
+    from PIL import Image
+    if path.suffix.lower() == ".pdf":
+        doc = fitz.open(path)
+        pix = doc[0].get_pixmap(matrix=fitz.Matrix(2, 2))
+        img = Image.open(io.BytesIO(pix.tobytes("png")))
+        img.thumbnail(box, Image.Resampling.LANCZOS)
+        img.save(out, "JPEG", quality=90)
+        doc.close()
+    else:
+        with Image.open(path) as img:
+            if img.mode in ("RGBA", "P"):
+                img = img.convert("RGB")
+            img.thumbnail(box, Image.Resampling.LANCZOS)
+            img.save(out, "JPEG", quality=90)
+
+def fast_render(path: Path, out: Path, box):
+    from app.preview_utils import load_image_for_box, render_pdf_page
+    if path.suffix.lower() == ".pdf":
+        img = render_pdf_page(path, box)
+    else:
+        img = load_image_for_box(path, box)
+    with img:
+        img.save(out, "JPEG", quality=90)
+
+IMPLEMENTATIONS = {"legacy": legacy_render, "fast": fast_render}
+
+def measure(impl: str, path: Path, box, repeat: int) -> dict:
+    """Child side: time ``repeat`` renders and report the peak RSS growth."""
+    import fitz  # noqa: F401  (import cost is not what we measure)
+    from PIL import Image  # noqa: F401
+    import app.preview_utils  # noqa: F401
+    fn = IMPLEMENTATIONS[impl]
+    baseline = _reset_peak_rss()
+    timings = []
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "out.jpg"
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(path, out, box)
+            timings.append((time.perf_counter() - start) * 1000)
+    return {"ms": statistics.median(timings), "peak_mb": (_peak_rss_kb() - baseline) / 1024}
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+def build_synthetic_corpus(directory: Path) -> list[Path]:
+    """A typical conveyancing mix: a text PDF, a scanned deed, phone and scanner images."""
+    import fitz
+    from PIL import Image, ImageDraw
+
+    def scan_image(size):
+        img = Image.new("RGB", size, (246, 244, 238))
+        draw = ImageDraw.Draw(img)
+        for y in range(120, size[1] - 120, 48):
+            draw.line([(150, y), (size[0] - 150, y)], fill=(40, 40, 40), width=6)
+        return img
+
+    paths = []
+    text_pdf = directory / "nota_simple_text.pdf"
+    doc = fitz.open()
+    for n in range(8):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(56, 56, 540, 790), ("Registro de la Propiedad. Finca numero %d. " % n) * 60)
+    doc.save(text_pdf)
+    paths.append(text_pdf)
+
+    scanned_pdf = directory / "escritura_scanned_300dpi.pdf"
+    buf = io.BytesIO()
+    scan_image((2480, 3508)).save(buf, "JPEG", quality=85)
+    doc = fitz.open()
+    for _ in range(4):
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, stream=buf.getvalue())
+    doc.save(scanned_pdf)
+    paths.append(scanned_pdf)
+
+    photo = directory / "property_photo_24mp.jpg"
+    scan_image((6000, 4000)).save(photo, "JPEG", quality=90)
+    paths.append(photo)
+
+    tiff = directory / "plan_scan.tiff"
+    scan_image((4960, 7016)).save(tiff, "TIFF")
+    paths.append(tiff)
+
+    png = directory / "screenshot.png"
+    scan_image((2560, 1440)).convert("P").save(png, "PNG")
+    paths.append(png)
+    return paths
+
+def run(corpus: list[Path], box, repeat: int) -> None:
+    header = f"{'document':38} {'legacy ms':>10} {'fast ms':>9} {'speedup':>8} {'legacy MB':>10} {'fast MB':>8}"
+    print(f"target box {box[0]}x{box[1]}, median of {repeat} runs, peak RSS growth per process")
+    print(header)
+    print("-" * len(header))
+    for path in corpus:
+        results = {}
+        for impl in IMPLEMENTATIONS:
+            proc = subprocess.run(
+                [sys.executable, __file__, "--measure", impl, str(path), "--box", f"{box[0]}x{box[1]}", "--repeat", str(repeat)],
+                capture_output=True, text=True, check=True, cwd=BACKEND_DIR,
+            )
+            results[impl] = json.loads(proc.stdout.strip().splitlines()[-1])
+        legacy, fast = results["legacy"], results["fast"]
+        print(
+            f"{path.name[:38]:38} {legacy['ms']:10.1f} {fast['ms']:9.1f} {legacy['ms'] / fast['ms']:7.1f}x "
+            f"{legacy['peak_mb']:10.1f} {fast['peak_mb']:8.1f}"
+        )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", type=Path, help="directory of sample PDFs and images (default: generated)")
+    parser.add_argument("--box", default="800x600", help="target size, WxH (default: PREVIEW_SIZE)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--measure", nargs=2, metavar=("IMPL", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    box = tuple(int(v) for v in args.box.lower().split("x"))
+
+    if args.measure:
+        impl, path = args.measure
+        print(json.dumps(measure(impl, Path(path), box, args.repeat)))
+        return
+
+    if args.corpus:
+        run(sorted(p for p in args.corpus.iterdir() if p.suffix.lower() in CORPUS_SUFFIXES), box, args.repeat)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(build_synthetic_corpus(Path(tmp)), box, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+# Point the app at a throwaway database and working directory before it is imported,
+# and keep the background workers from starting.
+_workdir = tempfile.mkdtemp(prefix="lawflow-tests-")
+os.chdir(_workdir)
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["CLOSING_PACK_PREBUILD_INTERVAL"] = "0"
+os.environ["PROJECT_STATS_REFRESH_INTERVAL"] = "0"
+os.environ["PREVIEW_WORKERS"] = "0"
+os.environ["TEXT_EXTRACT_ENABLED"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture
+def db(client):
+    from app.db import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import text
+from app.models import Project, Task
+
+@pytest.fixture
+def failing_title(db):
+    # Any task written with this title hits a database error
+    db.execute(text("CREATE TRIGGER fail_update BEFORE UPDATE ON tasks WHEN new.title = 'fail' BEGIN SELECT RAISE(ABORT, 'fail'); END"))
+    db.execute(text("CREATE TRIGGER fail_insert BEFORE INSERT ON tasks WHEN new.title = 'fail' BEGIN SELECT RAISE(ABORT, 'fail'); END"))
+    db.commit()
+    yield "fail"
+    db.execute(text("DROP TRIGGER fail_update"))
+    db.execute(text("DROP TRIGGER fail_insert"))
+    db.commit()
+
+def test_non_atomic_batch_reports_database_errors_per_operation(client, db, failing_title):
+    p = Project(title="Batch matter", transaction_type="Sale", location="Marbella", status="Intake")
+    p.tasks = [Task(title=f"Task {i}", status="Backlog", assignee="Ana López") for i in range(3)]
+    db.add(p)
+    db.commit()
+    a, b, c = (t.id for t in p.tasks)
+
+    r = client.post("/batch", json={"atomic": False, "operations": [
+        {"op": "task.update", "id": a, "patch": {"status": "Hecho"}},
+        {"op": "task.update", "id": b, "patch": {"status": "Hecho"}},
+        {"op": "task.update", "id": c, "patch": {"title": failing_title}},
+        {"op": "task.update", "id": c, "patch": {"status": "Hecho"}},
+        {"op": "task.create", "task": {"project_id": p.id, "title": "New task"}},
+        {"op": "task.create", "task": {"project_id": p.id, "title": failing_title}},
+    ]})
+    assert r.status_code == 200
+    assert [x["ok"] for x in r.json()["results"]] == [True, True, False, True, True, False]
+
+    db.expire_all()
+    assert {t.title: t.status for t in db.query(Task).filter(Task.project_id == p.id)} == {
+        "Task 0": "Hecho", "Task 1": "Hecho", "Task 2": "Hecho", "New task": "Backlog",
+    }
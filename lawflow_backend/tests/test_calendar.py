@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+import pytest
+from app.calendar_utils import ICS_LINE_LIMIT, fold_line
+from app.models import Project, Task
+
+def unfold(text: str) -> str:
+    return text.replace("\r\n ", "")
+
+@pytest.mark.parametrize("line", [
+    "SUMMARY:" + "x" * 200,
+    "SUMMARY:" + "Señora Muñoz · firma en notaría € " * 8,
+    "DESCRIPTION:" + "🏠📄✍️" * 40,
+    "SUMMARY:" + "a" * 66 + "é" * 5,  # a two-byte character straddling the first fold
+])
+def test_fold_line_keeps_lines_within_75_octets_and_characters_whole(line):
+    folded = fold_line(line)
+    physical = folded.split("\r\n")
+    assert all(len(p.encode("utf-8")) <= ICS_LINE_LIMIT for p in physical)
+    assert all(p.startswith(" ") for p in physical[1:])
+    assert unfold(folded) == line
+
+def test_short_line_is_not_folded():
+    assert fold_line("SUMMARY:Firma") == "SUMMARY:Firma"
+
+@pytest.fixture
+def project(db):
+    p = Project(title="Calendar matter", transaction_type="Purchase", location="Marbella", status="Intake")
+    p.tasks = [Task(title="Firma ante notario", status="Pendiente", assignee="Ana López", due_date=date.today() + timedelta(days=3))]
+    db.add(p)
+    db.commit()
+    return p
+
+def test_project_feed_is_stable_and_answers_if_none_match(client, project):
+    url = f"/calendar/ics?project_id={project.id}"
+    first, second = client.get(url), client.get(url)
+    assert first.status_code == 200
+    assert "SUMMARY:[Task] Firma ante notario · Ana López" in unfold(first.text)
+    assert (first.content, first.headers["ETag"]) == (second.content, second.headers["ETag"])
+
+    r = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert (r.status_code, r.content) == (304, b"")
+
+def test_feed_etag_changes_with_the_tasks(client, project):
+    url = f"/calendar/feed.ics?project_id={project.id}"
+    etag = client.get(url).headers["ETag"]
+    client.patch(f"/tasks/{project.tasks[0].id}", json={"title": "Firma aplazada"})
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert "Firma aplazada" in unfold(r.text)
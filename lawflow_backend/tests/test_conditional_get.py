@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import event
+from app.db import async_engine
+from app.models import Project, Task
+
+LISTS = ["/tasks?project_id={id}", "/checklists?project_id={id}", "/timeline?project_id={id}", "/activity?project_id={id}",
+         "/files?project_id={id}", "/projects/{id}", "/projects/{id}/workspace"]
+
+@pytest.fixture
+def project(db):
+    p = Project(title="ETag matter", transaction_type="Sale", location="Marbella", status="Intake")
+    p.tasks = [Task(title="Pedir nota simple", status="Pendiente", assignee="Ana López")]
+    db.add(p)
+    db.commit()
+    return p
+
+@pytest.mark.parametrize("path", LISTS)
+def test_unchanged_list_is_answered_from_the_project_version(client, project, path):
+    url = path.format(id=project.id)
+    r = client.get(url)
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        r = client.get(url, headers={"If-None-Match": etag})
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    assert (r.status_code, r.content, r.headers["ETag"]) == (304, b"", etag)
+    assert len(statements) == 1 and "FROM projects" in statements[0]
+
+def test_write_changes_the_etag(client, project):
+    url = f"/tasks?project_id={project.id}"
+    etag = client.get(url).headers["ETag"]
+    assert client.patch(f"/tasks/{project.tasks[0].id}", json={"status": "Hecho"}).status_code == 200
+
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert r.json()[0]["status"] == "Hecho"
+
+def test_etag_depends_on_the_query(client, project):
+    a = client.get(f"/tasks?project_id={project.id}").headers["ETag"]
+    b = client.get(f"/tasks?project_id={project.id}&limit=1").headers["ETag"]
+    assert a != b
+    assert client.get(f"/tasks?project_id={project.id}&limit=1", headers={"If-None-Match": a}).status_code == 200
@@ -0,0 +1,42 @@
+import os
+from pathlib import Path
+import pytest
+
+CONTENT = bytes(range(256)) * 40
+
+@pytest.fixture(scope="module")
+def stored(client):
+    r = client.post("/files/upload", data={"project_id": "1"}, files={"file": ("escritura.pdf", b"%PDF-1.4\n" + CONTENT, "application/pdf")})
+    assert r.status_code == 200
+    return r.json()
+
+def download(client, stored, **headers):
+    return client.get(f"/files/download/{stored['id']}", headers=headers)
+
+def test_download_answers_if_none_match(client, stored):
+    r = download(client, stored)
+    assert r.status_code == 200
+    assert r.headers["ETag"] == f'"{stored["sha256"][:32]}"'
+    assert download(client, stored, **{"If-None-Match": r.headers["ETag"]}).status_code == 304
+
+def test_download_serves_ranges_and_checks_if_range(client, stored):
+    etag = download(client, stored).headers["ETag"]
+    r = download(client, stored, Range="bytes=9-18")
+    assert (r.status_code, r.content) == (206, CONTENT[:10])
+    assert download(client, stored, Range="bytes=9-18", **{"If-Range": etag}).status_code == 206
+    r = download(client, stored, Range="bytes=9-18", **{"If-Range": '"stale"'})
+    assert (r.status_code, len(r.content)) == (200, len(CONTENT) + 9)
+
+def test_offloaded_download_uses_nginx_etag(client, stored, monkeypatch):
+    monkeypatch.setattr("app.file_delivery.FILE_ACCEL_REDIRECT_PREFIX", "/_files/")
+    monkeypatch.setattr("app.file_delivery.FILE_ACCEL_ROOT", Path("uploads"))
+    st = os.stat(stored["stored_path"])
+    nginx_etag = f'"{int(st.st_mtime):x}-{st.st_size:x}"'
+
+    r = download(client, stored, Range="bytes=0-9")
+    assert r.status_code == 200 and r.content == b""
+    assert r.headers["X-Accel-Redirect"] == "/_files/" + Path(stored["stored_path"]).resolve().relative_to(Path("uploads").resolve()).as_posix()
+    assert r.headers["ETag"] == nginx_etag
+    assert r.headers["Content-Type"] == "application/pdf"
+    assert r.headers["Content-Disposition"] == 'attachment; filename="escritura.pdf"'
+    assert download(client, stored, **{"If-None-Match": nginx_etag}).status_code == 304
@@ -0,0 +1,39 @@
+import hashlib
+
+def upload(client, content: bytes, filename: str, mime_type: str, **fields):
+    data = {"project_id": "1", **fields}
+    return client.post("/files/upload", data=data, files={"file": (filename, content, mime_type)})
+
+def test_upload_is_stored_and_downloadable(client):
+    content = "Nota simple\nFinca 1234\n".encode() * 1000
+    r = upload(client, content, "nota.txt", "text/plain", uploader="Marta")
+    assert r.status_code == 200
+    item = r.json()
+    assert (item["file_size"], item["sha256"], item["mime_type"], item["uploader"]) == (
+        len(content), hashlib.sha256(content).hexdigest(), "text/plain", "Marta",
+    )
+    assert client.get(f"/files/download/{item['id']}").content == content
+
+def test_windows_1252_csv_is_accepted(client):
+    content = "Año;Importe;Concepto\r\n2024;1.234,50;Café – 5 €\r\n".encode("cp1252")
+    r = upload(client, content, "export.csv", "text/csv")
+    assert r.status_code == 200
+    assert r.json()["mime_type"] == "text/csv"
+
+def test_content_must_match_the_extension(client):
+    r = upload(client, b"%PDF-1.7\n" + b"\x00" * 100, "contract.txt", "text/plain")
+    assert r.status_code == 400
+
+def test_project_id_is_required(client):
+    r = client.post("/files/upload", files={"file": ("a.txt", b"hello", "text/plain")})
+    assert r.status_code == 422
+
+def test_oversized_body_is_refused_before_it_is_read(client, monkeypatch):
+    monkeypatch.setattr("app.file_utils.MAX_FILE_SIZE", 1024)
+    r = upload(client, b"x" * (128 * 1024), "big.txt", "text/plain")
+    assert r.status_code == 413
+
+def test_oversized_file_part_is_refused(client, monkeypatch):
+    monkeypatch.setattr("app.file_utils.MAX_FILE_SIZE", 1024)
+    r = upload(client, b"x" * 2048, "big.txt", "text/plain")
+    assert r.status_code == 413
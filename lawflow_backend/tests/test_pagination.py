@@ -0,0 +1,27 @@
+import base64
+import json
+import pytest
+
+def forge(*parts) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(parts)).encode()).decode().rstrip("=")
+
+def test_cursor_pages_through_tasks(client):
+    first = client.get("/tasks", params={"limit": 2, "sort_by": "due_date"})
+    assert first.status_code == 200
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/tasks", params={"limit": 2, "sort_by": "due_date", "cursor": cursor})
+    assert second.status_code == 200
+    assert not {t["id"] for t in first.json()} & {t["id"] for t in second.json()}
+
+@pytest.mark.parametrize("sort_by, cursor", [
+    ("id", forge("id", "desc", {"a": 1}, 1)),
+    ("id", forge("id", "desc", [1, 2], 1)),
+    ("id", forge("id", "desc", "7", 1)),
+    ("id", forge("id", "desc", None, 1)),
+    ("id", forge("id", "desc", 7, {"a": 1})),
+    ("due_date", forge("due_date", "desc", {"dt": "2024-01-01T00:00:00"}, 1)),
+    ("id", "not-a-cursor"),
+])
+def test_forged_cursor_is_rejected(client, sort_by, cursor):
+    r = client.get("/tasks", params={"cursor": cursor, "sort_by": sort_by, "sort_order": "desc"})
+    assert r.status_code == 400
@@ -0,0 +1,50 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+from sqlalchemy import event
+from app.db import async_engine
+from app.models import Activity, ChecklistItem, Client, Project, Task, TimelineItem
+
+# conditional_get's version check, the project with its client, one SELECT per child
+# collection and the page of newest activity
+EXPECTED_QUERIES = 6
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def make_matter(db, size: int, with_client: bool) -> int:
+    today = date.today()
+    client = Client(name="Cliente de prueba") if with_client else None
+    p = Project(title=f"Matter with {size} of everything", transaction_type="Purchase", location="Marbella", status="Intake", client=client)
+    p.tasks = [Task(title=f"Task {i}", status="Backlog", assignee="Ana López") for i in range(size)]
+    p.checklist_items = [ChecklistItem(stage="Due diligence", label=f"Item {i}") for i in range(size)]
+    p.timeline_items = [TimelineItem(label=f"Milestone {i}", start_date=today, end_date=today + timedelta(days=i)) for i in range(size)]
+    p.activities = [Activity(actor="Ana López", verb="Updated task", detail=f"Task {i}") for i in range(size)]
+    db.add(p)
+    db.commit()
+    return p.id
+
+def test_project_detail_query_count_does_not_grow_with_the_matter(client, db):
+    small = make_matter(db, 1, with_client=False)
+    large = make_matter(db, 300, with_client=True)  # more activity than one page
+
+    counts = {}
+    for project_id in (small, large):
+        with count_queries() as statements:
+            r = client.get(f"/projects/{project_id}")
+        assert r.status_code == 200
+        counts[project_id] = len(statements)
+
+    assert r.json()["activities_next_cursor"] is not None
+    assert len(r.json()["tasks"]) == 300
+    assert counts[small] == counts[large] == EXPECTED_QUERIES
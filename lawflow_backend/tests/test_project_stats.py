@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+from sqlalchemy import event, select
+from app.db import engine
+from app.models import Project, ProjectStats, Task
+from app.stats import refresh_project_stats, refresh_stale_stats
+
+def test_stats_get_reports_deadlines_passed_since_the_rollup_without_writing(client, db):
+    today = date.today()
+    p = Project(title="Stats matter", transaction_type="Purchase", location="Marbella", status="Intake")
+    p.tasks = [
+        Task(title="Due two days ago", status="Backlog", assignee="Ana López", due_date=today - timedelta(days=2)),
+        Task(title="Due next week", status="Backlog", assignee="Ana López", due_date=today + timedelta(days=7)),
+    ]
+    db.add(p)
+    db.flush()
+    # Rollup as written three days ago, before the first deadline passed
+    refresh_project_stats(db, p.id, today - timedelta(days=3))
+    db.commit()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        r = client.get("/projects/stats", params={"project_id": p.id})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert r.status_code == 200
+    [stats] = r.json()
+    assert (stats["overdue_tasks"], stats["next_due_date"]) == (1, (today + timedelta(days=7)).isoformat())
+    assert all(s.lstrip().upper().startswith("SELECT") for s in statements)
+
+    assert refresh_stale_stats(db, [p.id]) == 1
+    db.commit()
+    db.expire_all()
+    row = db.execute(select(ProjectStats).where(ProjectStats.project_id == p.id)).scalar_one()
+    assert (row.overdue_tasks, row.computed_on) == (1, today)
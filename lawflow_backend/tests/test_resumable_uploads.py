@@ -0,0 +1,93 @@
+import fcntl
+import hashlib
+import os
+import threading
+from datetime import datetime, timedelta
+from app import blob_store
+from app.models import UploadSession
+
+CONTENT = b"%PDF-1.4\n" + bytes(range(256)) * 64
+
+def start(client, content=CONTENT, **extra):
+    r = client.post("/uploads", json={"project_id": 1, "filename": "escritura.pdf", "size": len(content), **extra})
+    assert r.status_code == 200
+    return r.json()["id"]
+
+def put(client, session_id, offset, data):
+    return client.put(f"/uploads/{session_id}", params={"offset": offset}, content=data)
+
+def test_chunks_in_any_order_then_complete(client):
+    session_id = start(client, sha256=hashlib.sha256(CONTENT).hexdigest())
+    half = len(CONTENT) // 2
+    assert put(client, session_id, half, CONTENT[half:]).json()["missing"] == [[0, half]]
+    assert put(client, session_id, 0, CONTENT[:half]).json()["missing"] == []
+    assert put(client, session_id, 0, CONTENT[:half]).status_code == 200  # re-sent range
+
+    r = client.post(f"/uploads/{session_id}/complete")
+    assert r.status_code == 200
+    item = r.json()
+    assert (item["sha256"], item["file_size"], item["mime_type"]) == (hashlib.sha256(CONTENT).hexdigest(), len(CONTENT), "application/pdf")
+    assert client.get(f"/files/download/{item['id']}").content == CONTENT
+    assert client.post(f"/uploads/{session_id}/complete").json()["id"] == item["id"]
+
+def test_incomplete_upload_is_not_finalized(client):
+    session_id = start(client)
+    put(client, session_id, 0, CONTENT[:100])
+    r = client.post(f"/uploads/{session_id}/complete")
+    assert r.status_code == 409
+    assert r.json()["detail"]["missing"] == [[100, len(CONTENT)]]
+
+def test_chunk_is_refused_once_finalize_has_claimed_the_session(client, db):
+    session_id = start(client)
+    put(client, session_id, 0, CONTENT)
+    # A finalize that has claimed the session and is about to read the file
+    db.get(UploadSession, session_id).status = "finalizing"
+    db.get(UploadSession, session_id).claimed_at = datetime.utcnow()
+    db.commit()
+    assert put(client, session_id, 0, b"X" * 16).status_code == 409
+    assert blob_store.session_path(session_id).read_bytes() == CONTENT
+
+def test_stale_finalize_claims_are_taken_over(client, db):
+    session_id = start(client)
+    put(client, session_id, 0, CONTENT)
+    session = db.get(UploadSession, session_id)
+    session.status, session.claimed_at = "finalizing", datetime.utcnow()
+    db.commit()
+    assert client.post(f"/uploads/{session_id}/complete").status_code == 409
+
+    session.claimed_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    r = client.post(f"/uploads/{session_id}/complete")
+    assert r.status_code == 200
+    assert r.json()["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+
+def test_finalize_that_died_after_storing_the_blob_is_resumed(client, db):
+    content = CONTENT + b"resumed"
+    session_id = start(client, content)
+    put(client, session_id, 0, content)
+    # The worker recorded the hash, moved the file into the store, then died
+    sha256 = hashlib.sha256(content).hexdigest()
+    blob_store.commit(blob_store.session_path(session_id), sha256)
+    session = db.get(UploadSession, session_id)
+    session.status, session.sha256, session.mime_type = "finalizing", sha256, "application/pdf"
+    session.claimed_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+
+    r = client.post(f"/uploads/{session_id}/complete")
+    assert r.status_code == 200
+    assert client.get(f"/files/download/{r.json()['id']}").content == content
+
+def test_finalize_waits_for_chunk_writes_in_flight(client):
+    session_id = start(client)
+    put(client, session_id, 0, CONTENT)
+    # Stand-in for a chunk PUT that passed its status check and is still writing
+    fd = os.open(blob_store.session_path(session_id), os.O_WRONLY)
+    fcntl.flock(fd, fcntl.LOCK_SH)
+    result = {}
+    finalize = threading.Thread(target=lambda: result.update(r=client.post(f"/uploads/{session_id}/complete")))
+    finalize.start()
+    finalize.join(timeout=1)
+    assert finalize.is_alive()
+    os.close(fd)
+    finalize.join(timeout=10)
+    assert result["r"].status_code == 200
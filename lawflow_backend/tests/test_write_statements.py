@@ -0,0 +1,74 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects import postgresql
+from app.db import engine
+from app.models import ChecklistItem, Client, Project, ProjectStats, Task
+from app.writes import ActivityEntry, logged_write_statement
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+@pytest.fixture
+def matter(db):
+    p = Project(title="Write matter", transaction_type="Purchase", location="Marbella", status="Intake", client=Client(name="Cliente"))
+    p.tasks = [Task(title="Draft deed", status="Backlog", assignee="Ana López")]
+    p.checklist_items = [ChecklistItem(stage="Due diligence", label="Nota simple")]
+    db.add(p)
+    db.commit()
+    return p
+
+# SQLite has no data-modifying CTEs: the row, its activity entry and the version bump
+# are one statement each (one in all on Postgres, see below). Triggers keep the rollup.
+@pytest.mark.parametrize("method, path, body, expected", [
+    ("patch", "/tasks/{task}", lambda ids: {"status": "Hecho"}, ["UPDATE tasks", "INSERT INTO activities", "UPDATE projects"]),
+    ("post", "/tasks", lambda ids: {"project_id": ids["project"], "title": "New task"}, ["INSERT INTO tasks", "INSERT INTO activities", "UPDATE projects"]),
+    ("patch", "/checklists/{item}", lambda ids: {"is_done": True}, ["UPDATE checklist_items", "INSERT INTO activities", "UPDATE projects"]),
+    # change_version is bumped by the project's own UPDATE; the client comes in one batched SELECT
+    ("patch", "/projects/{project}", lambda ids: {"status": "Closing"}, ["UPDATE projects", "SELECT clients.", "INSERT INTO activities"]),
+])
+def test_write_statement_budget(client, db, matter, method, path, body, expected):
+    ids = {"project": matter.id, "task": matter.tasks[0].id, "item": matter.checklist_items[0].id}
+    version = matter.change_version
+    with count_statements() as statements:
+        r = getattr(client, method)(path.format(**ids), json=body(ids))
+    assert r.status_code == 200
+    assert len(statements) == len(expected)
+    assert all(s.startswith(e) for s, e in zip(statements, expected)), statements
+
+    db.expire_all()
+    p = db.get(Project, matter.id)
+    stats = db.execute(select(ProjectStats).where(ProjectStats.project_id == p.id)).scalar_one()
+    tasks = db.query(Task).filter(Task.project_id == p.id).all()
+    assert (stats.status, stats.open_tasks + stats.done_tasks, stats.done_tasks) == (
+        p.status, len(tasks), sum(t.status == "Hecho" for t in tasks),
+    )
+    assert stats.checklist_done == sum(it.is_done for it in p.checklist_items)
+    assert p.change_version == version + 1
+    if path.startswith("/projects"):
+        assert r.json()["client"]["name"] == "Cliente"
+
+@pytest.mark.parametrize("model, stmt, activity", [
+    (Task, update(Task).where(Task.id == 1).values(status="Hecho"), ActivityEntry("Ana López", "Updated task", Task.title)),
+    (Project, update(Project).where(Project.id == 1).values(status="Closing", change_version=Project.change_version + 1),
+     ActivityEntry("System", "Updated project", "status")),
+])
+def test_postgres_write_is_one_statement(model, stmt, activity):
+    related = ("client",) if model is Project else ()
+    sql = str(logged_write_statement(model, stmt, activity, bump_version=True, related=related).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("WITH written AS")
+    assert sql.count("INSERT INTO activities") == 1
+    # Exactly one UPDATE of the project: the bump for a task, the row itself for a project
+    assert sql.count("UPDATE projects") == 1
+    if model is Project:
+        assert "JOIN clients" in sql
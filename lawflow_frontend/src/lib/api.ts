@@ -75,6 +75,7 @@ export const api = {
     http<ChecklistItem>(`/checklists/${id}`, { method: "PATCH", body: JSON.stringify({ is_done }) }),
   timeline: (projectId: number) => http<TimelineItem[]>(`/timeline?project_id=${projectId}`),
   activity: (projectId: number) => http<Activity[]>(`/activity?project_id=${projectId}`),
+  workspace: (projectId: number) => http<Workspace>(`/projects/${projectId}/workspace`),
 };
 
 export type FileItem = {
@@ -85,8 +86,38 @@ export type FileItem = {
   mime_type?: string | null;
   uploaded_at: string;
   uploader: string;
+  file_size?: number | null;
+  sha256?: string | null;
+  preview_status?: "pending" | "processing" | "ready" | "failed" | "skipped" | null;
 };
 
+export type Workspace = {
+  project: Project;
+  tasks: Task[];
+  checklist_items: ChecklistItem[];
+  timeline_items: TimelineItem[];
+  activities: Activity[];
+  files: FileItem[];
+};
+
+export type PdfPages = {
+  file_id: number;
+  page_count: number;
+  pages: { number: number; width: number; height: number }[];
+};
+
+export type SearchHit = {
+  kind: "task" | "checklist" | "timeline" | "file" | "document" | "activity"; // document: text inside a file, id is the file's
+  id: number;
+  project_id: number;
+  project_title: string;
+  title: string; // HTML-escaped by the server, matches wrapped in <mark>
+  snippet: string | null;
+  score: number;
+};
+
+export type SearchResults = { query: string; items: SearchHit[]; next_offset: number | null };
+
 export type Template = {
   municipality: string;
   transaction_type: string;
@@ -110,6 +141,12 @@ export const api2 = {
   calendarIcsUrl: (projectId: number) => `${API_BASE}/calendar/ics?project_id=${projectId}`,
   closingPackUrl: (projectId: number) => `${API_BASE}/closing-pack/${projectId}`,
   downloadFileUrl: (fileId: number) => `${API_BASE}/files/download/${fileId}`,
+  previewUrl: (fileId: number, width: number) => `${API_BASE}/files/${fileId}/preview?w=${width}`,
+  search: (q: string, offset = 0, limit = 24) =>
+    http<SearchResults>(`/search?q=${encodeURIComponent(q)}&limit=${limit}&offset=${offset}`),
+  pdfPages: (fileId: number) => http<PdfPages>(`/files/${fileId}/pages`),
+  pdfPageUrl: (fileId: number, page: number, width: number) => `${API_BASE}/files/${fileId}/pages/${page}?w=${width}`,
+  changesUrl: (projectId: number) => `${API_BASE}/changes?project_id=${projectId}`,
 };
 
 export type ProjectCreate = {
@@ -135,6 +172,21 @@ export type TaskCreate = {
   description?: string | null;
 };
 
+export type BatchOp =
+  | { op: "task.update"; id: number; patch: Partial<Task> }
+  | { op: "checklist.toggle"; id: number; is_done: boolean }
+  | { op: "project.update"; id: number; patch: ProjectUpdate }
+  | { op: "task.create"; task: TaskCreate };
+
+export type BatchResult = {
+  index: number;
+  ok: boolean;
+  error: string | null;
+  task: Task | null;
+  checklist_item: ChecklistItem | null;
+  project: Project | null;
+};
+
 export const api3 = {
   createProject: async (payload: ProjectCreate) => {
     const res = await fetch(`${API_BASE}/projects`, {
@@ -154,6 +206,9 @@ export const api3 = {
     if (!res.ok) throw new Error(await res.text());
     return (await res.json()) as Project;
   },
+  // One request and one transaction; atomic=false applies the valid operations and reports the rest
+  batch: (operations: BatchOp[], atomic = true) =>
+    http<{ results: BatchResult[] }>(`/batch`, { method: "POST", body: JSON.stringify({ operations, atomic }) }),
   createTask: async (payload: TaskCreate) => {
     const res = await fetch(`${API_BASE}/tasks`, {
       method: "POST",
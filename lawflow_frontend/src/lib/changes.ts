@@ -0,0 +1,62 @@
+import { api2 } from "./api";
+
+// Server-sent change stream for one matter (GET /changes). Each message lists the rows a
+// committed transaction wrote, in the same shape as the list endpoints.
+export type ChangeTable = "tasks" | "checklist_items" | "timeline_items" | "activities" | "files" | "projects";
+
+export type RowChange = { table: ChangeTable; op: "upsert" | "delete"; id: number; row?: any };
+
+export type ChangeMessage = {
+  project_id: number;
+  version: number | null; // null for background updates that don't bump the matter's version
+  partial?: boolean; // rows left out (too large to relay); refetch instead
+  changes: RowChange[];
+};
+
+export type ChangeSubscription = { close: () => void; isLive: () => boolean };
+
+// Apply one table's upserts and deletes to a list: updated rows stay in place, new ones go first.
+export function applyRowChanges<T extends { id: number }>(rows: T[], changes: RowChange[], table: ChangeTable): T[] {
+  const mine = changes.filter((c) => c.table === table);
+  if (!mine.length) return rows;
+  const deleted = new Set(mine.filter((c) => c.op === "delete").map((c) => c.id));
+  const upserts = new Map(mine.filter((c) => c.op === "upsert" && c.row).map((c) => [c.id, c.row as T] as const));
+  const next = rows.filter((r) => !deleted.has(r.id)).map((r) => {
+    const row = upserts.get(r.id);
+    if (!row) return r;
+    upserts.delete(r.id);
+    return { ...r, ...row };
+  });
+  return [...upserts.values(), ...next];
+}
+
+// onResync fires whenever local state may have missed something: on every (re)connect,
+// after a version gap, or when the server had to drop messages for this client.
+export function subscribeChanges(
+  projectId: number,
+  handlers: { onChanges: (msg: ChangeMessage) => void; onResync: () => void },
+): ChangeSubscription {
+  const source = new EventSource(api2.changesUrl(projectId));
+  let live = false;
+  let version: number | null = null;
+
+  source.addEventListener("hello", (e) => {
+    live = true;
+    version = JSON.parse((e as MessageEvent).data).version;
+    handlers.onResync();
+  });
+  source.addEventListener("change", (e) => {
+    const msg: ChangeMessage = JSON.parse((e as MessageEvent).data);
+    if (msg.project_id !== projectId) return;
+    const gap = msg.version !== null && version !== null && msg.version > version + 1;
+    if (msg.version !== null) version = Math.max(version ?? 0, msg.version);
+    if (msg.partial || gap) handlers.onResync();
+    else handlers.onChanges(msg);
+  });
+  source.addEventListener("resync", () => handlers.onResync());
+  source.onerror = () => {
+    live = false; // EventSource reconnects by itself; the next hello resyncs
+  };
+
+  return { close: () => source.close(), isLive: () => live };
+}
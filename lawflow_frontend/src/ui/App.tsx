@@ -1,7 +1,8 @@
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useEffect, useMemo, useRef, useState } from "react";
 import { useI18n } from "../lib/i18n";
 import { api, Project, Task, ChecklistItem, TimelineItem, Activity, FileItem } from "../lib/api";
 import { api2, api3 } from "../lib/api";
+import { applyRowChanges, ChangeSubscription, subscribeChanges } from "../lib/changes";
 import { formatProjectLabel, PROJECT_ID_OFFSET, daysUntil } from "../lib/formatting";
 import { Board } from "./Board";
 import { TasksTable } from "./TasksTable";
@@ -201,18 +202,12 @@ const activeProject = useMemo(
   );
 
   async function refreshAll(projectId: number) {
-    const [t, c, tl, a, f] = await Promise.all([
-      api.tasks(projectId),
-      api.checklist(projectId),
-      api.timeline(projectId),
-      api.activity(projectId),
-      api2.files(projectId),
-    ]);
-    setTasks(t);
-    setChecklist(c);
-    setTimeline(tl);
-    setActivity(a);
-    setFiles(f as any);
+    const ws = await api.workspace(projectId);
+    setTasks(ws.tasks);
+    setChecklist(ws.checklist_items);
+    setTimeline(ws.timeline_items);
+    setActivity(ws.activities);
+    setFiles(ws.files as any);
   }
 
   // Load projects and handle initial URL route
@@ -290,6 +285,33 @@ useEffect(() => {
   refreshAll(activeProjectId).catch(console.error);
 }, [activeProjectId]);
 
+// Live changes to the open matter (ours and other users'), patched into local state
+const changeStream = useRef<ChangeSubscription | null>(null);
+useEffect(() => {
+  if (!activeProjectId) return;
+  const sub = subscribeChanges(activeProjectId, {
+    onChanges: ({ changes }) => {
+      setTasks((prev) => applyRowChanges(prev, changes, "tasks"));
+      setChecklist((prev) => applyRowChanges(prev, changes, "checklist_items"));
+      setTimeline((prev) => applyRowChanges(prev, changes, "timeline_items"));
+      setActivity((prev) => applyRowChanges(prev, changes, "activities").slice(0, 100));
+      setFiles((prev) => applyRowChanges(prev, changes, "files"));
+      setProjects((prev) => applyRowChanges(prev, changes, "projects"));
+    },
+    onResync: () => refreshAll(activeProjectId).catch(console.error),
+  });
+  changeStream.current = sub;
+  return () => {
+    sub.close();
+    changeStream.current = null;
+  };
+}, [activeProjectId]);
+
+// After a mutation: the stream delivers the rows it wrote; reload only without it
+async function refreshUnlessLive(projectId: number) {
+  if (!changeStream.current?.isLive()) await refreshAll(projectId);
+}
+
 
   const filteredTasks = useMemo(() => {
     const qq = q.trim().toLowerCase();
@@ -604,7 +626,7 @@ useEffect(() => {
                         setTasks(prev => prev.map(t => t.id === taskId ? { ...t, ...patch } : t));
                         try {
                           await api.updateTask(taskId, patch);
-                          await refreshAll(activeProjectId);
+                          await refreshUnlessLive(activeProjectId);
                         } catch (error) {
                           // Revert on error
                           console.error('Failed to update task:', error);
@@ -612,14 +634,16 @@ useEffect(() => {
                         }
                       }}
                     />
-                    {/* <h3 style={{ marginTop: 30, marginBottom: 10 }}>Board</h3>
+                    <h3 style={{ marginTop: 30, marginBottom: 10 }}>Board</h3>
                     <Board
                       tasks={filteredTasks}
-                      onMove={async (taskId, nextStatus) => {
-                        await api.updateTask(taskId, { status: nextStatus });
-                        await refreshAll(activeProjectId);
+                      onMove={async (taskIds, nextStatus) => {
+                        const { results } = await api3.batch(taskIds.map((id) => ({ op: "task.update", id, patch: { status: nextStatus } })), false);
+                        const updated = new Map(results.flatMap((r) => (r.task ? [[r.task.id, r.task] as const] : [])));
+                        setTasks((prev) => prev.map((t) => updated.get(t.id) ?? t));
+                        await refreshUnlessLive(activeProjectId);
                       }}
-                    /> */}
+                    />
                   </>
                 )}
 
@@ -677,8 +701,15 @@ useEffect(() => {
                   <Checklist
                     items={checklist}
                     onToggle={async (itemId, is_done) => {
-                      await api.toggleChecklist(itemId, is_done);
-                      await refreshAll(activeProjectId);
+                      const it = await api.toggleChecklist(itemId, is_done);
+                      setChecklist((prev) => prev.map((c) => (c.id === it.id ? it : c)));
+                      await refreshUnlessLive(activeProjectId);
+                    }}
+                    onToggleMany={async (itemIds, is_done) => {
+                      const { results } = await api3.batch(itemIds.map((id) => ({ op: "checklist.toggle", id, is_done })));
+                      const updated = new Map(results.flatMap((r) => (r.checklist_item ? [[r.checklist_item.id, r.checklist_item] as const] : [])));
+                      setChecklist((prev) => prev.map((c) => updated.get(c.id) ?? c));
+                      await refreshUnlessLive(activeProjectId);
                     }}
                   />
                 )}
@@ -704,7 +735,7 @@ useEffect(() => {
   clientIdFallback={projects[0]?.client_id ?? 1}
   defaultBg={defaultBg}
   onCreated={(p) => {
-    setProjects((prev) => [p, ...prev]);
+    setProjects((prev) => [p, ...prev.filter((x) => x.id !== p.id)]);
     setActiveProjectId(p.id);
     setView("Tasks");
   }}
@@ -715,18 +746,14 @@ useEffect(() => {
   onClose={() => setQuickAddOpen(false)}
   projectId={activeProjectId ?? null}
   onCreated={(t) => {
-    setTasks((prev) => [t, ...prev]);
+    setTasks((prev) => [t, ...prev.filter((x) => x.id !== t.id)]);
   }}
 />
 
           <GlobalSearchModal
             open={globalSearchOpen}
             onClose={() => setGlobalSearchOpen(false)}
-            tasks={tasks}
-            files={files as any}
-            checklist={checklist}
-            timeline={timeline}
-            onNavigate={(v) => setView(v)}
+            onNavigate={(projectId, v) => { setActiveProjectId(projectId); setView(v); }}
           />      </main>
     </div>
   );
@@ -1,5 +1,5 @@
-import React, { useMemo } from "react";
-import { DndContext, DragEndEvent, useDroppable } from "@dnd-kit/core";
+import React, { useMemo, useState } from "react";
+import { DndContext, DragEndEvent, PointerSensor, useDroppable, useSensor, useSensors } from "@dnd-kit/core";
 import { SortableContext, verticalListSortingStrategy } from "@dnd-kit/sortable";
 import { Task } from "../lib/api";
 import { TaskCard } from "./TaskCard";
@@ -19,7 +19,12 @@ function Column({ status, tasks, children }: { status: Task["status"]; tasks: Ta
   );
 }
 
-export function Board({ tasks, onMove }: { tasks: Task[]; onMove: (taskId: number, next: Task["status"]) => Promise<void> }) {
+// Ctrl/⌘-click selects several cards; dragging one of them moves the whole selection in one call
+export function Board({ tasks, onMove }: { tasks: Task[]; onMove: (taskIds: number[], next: Task["status"]) => Promise<void> }) {
+  const [selected, setSelected] = useState<Set<number>>(new Set());
+  // A small drag threshold so that clicks (for selecting) reach the cards
+  const sensors = useSensors(useSensor(PointerSensor, { activationConstraint: { distance: 5 } }));
+
   const byStatus = useMemo(() => {
     const m: Record<Task["status"], Task[]> = { "Pendiente": [], "En curso": [], "Revisión": [], "Hecho": [] };
     for (const t of tasks) m[t.status].push(t);
@@ -35,20 +40,30 @@ export function Board({ tasks, onMove }: { tasks: Task[]; onMove: (taskId: numbe
     const nextStatus = String(overId) as Task["status"];
     if (!STATUSES.includes(nextStatus)) return;
 
-    const current = tasks.find((t) => t.id === taskId);
-    if (!current || current.status === nextStatus) return;
+    const dragged = selected.has(taskId) ? selected : new Set([taskId]);
+    const taskIds = tasks.filter((t) => dragged.has(t.id) && t.status !== nextStatus).map((t) => t.id);
+    setSelected(new Set());
+    if (!taskIds.length) return;
+
+    onMove(taskIds, nextStatus).catch(console.error);
+  }
 
-    onMove(taskId, nextStatus).catch(console.error);
+  function toggleSelected(taskId: number) {
+    setSelected((prev) => {
+      const next = new Set(prev);
+      if (!next.delete(taskId)) next.add(taskId);
+      return next;
+    });
   }
 
   return (
-    <DndContext onDragEnd={onDragEnd}>
+    <DndContext sensors={sensors} onDragEnd={onDragEnd}>
       <div className="columns">
         {STATUSES.map((s) => (
           <SortableContext key={s} items={byStatus[s].map((t) => t.id)} strategy={verticalListSortingStrategy}>
             <Column status={s} tasks={byStatus[s]}>
               {byStatus[s].map((t) => (
-                <TaskCard key={t.id} task={t} />
+                <TaskCard key={t.id} task={t} selected={selected.has(t.id)} onSelect={() => toggleSelected(t.id)} />
               ))}
             </Column>
           </SortableContext>
@@ -4,9 +4,11 @@ import { ChecklistItem } from "../lib/api";
 export function Checklist({
   items,
   onToggle,
+  onToggleMany,
 }: {
   items: ChecklistItem[];
   onToggle: (itemId: number, is_done: boolean) => Promise<void>;
+  onToggleMany?: (itemIds: number[], is_done: boolean) => Promise<void>;
 }) {
   const grouped = useMemo(() => {
     const m = new Map<string, ChecklistItem[]>();
@@ -25,6 +27,11 @@ export function Checklist({
           <div className="chkHead">
             <strong>{stage}</strong>
             <span className="pill">{stageItems.filter((s) => s.is_done).length}/{stageItems.length}</span>
+            {onToggleMany && stageItems.some((s) => !s.is_done) && (
+              <button className="btn ghost" onClick={() => onToggleMany(stageItems.filter((s) => !s.is_done).map((s) => s.id), true)}>
+                Mark all done
+              </button>
+            )}
           </div>
           {stageItems.map((it) => (
             <div className="chkItem" key={it.id}>
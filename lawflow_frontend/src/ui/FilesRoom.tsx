@@ -1,7 +1,7 @@
 import React, { useEffect, useMemo, useRef, useState } from "react";
 import { Drawer } from "./components/Drawer";
 import { useI18n } from "../lib/i18n";
-import { api2, FileItem } from "../lib/api";
+import { api2, FileItem, PdfPages } from "../lib/api";
 
 export function FilesRoom({ projectId }: { projectId: number }) {
   const { t } = useI18n();
@@ -102,15 +102,15 @@ export function FilesRoom({ projectId }: { projectId: number }) {
               {previewError ? <div className="small" style={{ color: "rgba(239,68,68,.9)" }}>{previewError}</div> : null}
 
               {(selected.mime_type ?? "").includes("pdf") ? (
-                <iframe
-                  title="pdf"
-                  src={api2.downloadFileUrl(selected.id)}
-                  style={{ width: "100%", height: 420, border: "1px solid var(--line)", borderRadius: 14 }}
+                <PdfPageViewer
+                  fileId={selected.id}
                   onError={() => setPreviewError("Preview unavailable. Seed rows are metadata-only — upload a real PDF to preview.")}
                 />
               ) : (selected.mime_type ?? "").startsWith("image/") ? (
                 <img
-                  src={api2.downloadFileUrl(selected.id)}
+                  src={api2.previewUrl(selected.id, 640)}
+                  srcSet={`${api2.previewUrl(selected.id, 640)} 640w, ${api2.previewUrl(selected.id, 1280)} 1280w`}
+                  sizes="(max-width: 700px) 100vw, 640px"
                   alt={selected.filename}
                   style={{ width: "100%", borderRadius: 14, border: "1px solid var(--line)" }}
                   onError={() => setPreviewError("Image preview unavailable. Upload a real image to preview.")}
@@ -128,3 +128,32 @@ export function FilesRoom({ projectId }: { projectId: number }) {
     </div>
   );
 }
+
+// Pages are rendered server-side one at a time; lazy <img>s mean only the pages
+// scrolled into view are requested, so opening page 40 costs one page render.
+function PdfPageViewer({ fileId, onError }: { fileId: number; onError: () => void }) {
+  const [doc, setDoc] = useState<PdfPages | null>(null);
+
+  useEffect(() => {
+    setDoc(null);
+    api2.pdfPages(fileId).then(setDoc).catch(onError);
+  }, [fileId]);
+
+  if (!doc) return <div className="small">Loading…</div>;
+  return (
+    <div style={{ display: "grid", gap: 8, maxHeight: 520, overflowY: "auto" }}>
+      <div className="small">{doc.page_count} pages</div>
+      {doc.pages.map((p) => (
+        <img
+          key={p.number}
+          loading="lazy"
+          src={api2.pdfPageUrl(fileId, p.number, 640)}
+          srcSet={`${api2.pdfPageUrl(fileId, p.number, 640)} 640w, ${api2.pdfPageUrl(fileId, p.number, 1280)} 1280w`}
+          sizes="(max-width: 700px) 100vw, 640px"
+          alt={`Page ${p.number}`}
+          style={{ width: "100%", aspectRatio: `${p.width} / ${p.height}`, borderRadius: 14, border: "1px solid var(--line)" }}
+        />
+      ))}
+    </div>
+  );
+}
@@ -1,27 +1,40 @@
-import React, { useEffect, useMemo, useState } from "react";
-import { ChecklistItem, FileItem, Task, TimelineItem } from "../lib/api";
+import React, { useEffect, useState } from "react";
+import { api2, SearchHit } from "../lib/api";
 import { useI18n } from "../lib/i18n";
-import { formatDate } from "../lib/formatting";
+
+type View = "Tasks" | "Timeline" | "Files" | "Templates" | "Closing Pack";
+
+const KIND_LABEL: Record<SearchHit["kind"], string> = {
+  task: "Task",
+  checklist: "Checklist",
+  timeline: "Timeline",
+  file: "File",
+  document: "Document",
+  activity: "Activity",
+};
+
+const KIND_VIEW: Record<SearchHit["kind"], View> = {
+  task: "Tasks",
+  checklist: "Tasks",
+  timeline: "Timeline",
+  file: "Files",
+  document: "Files",
+  activity: "Tasks",
+};
 
 export function GlobalSearchModal({
   open,
   onClose,
-  tasks,
-  files,
-  checklist,
-  timeline,
   onNavigate,
 }: {
   open: boolean;
   onClose: () => void;
-  tasks: Task[];
-  files: FileItem[];
-  checklist: ChecklistItem[];
-  timeline: TimelineItem[];
-  onNavigate: (view: "Tasks" | "Timeline" | "Files" | "Templates" | "Closing Pack") => void;
+  onNavigate: (projectId: number, view: View) => void;
 }) {
   const { t } = useI18n();
   const [q, setQ] = useState("");
+  const [hits, setHits] = useState<SearchHit[]>([]);
+  const [nextOffset, setNextOffset] = useState<number | null>(null);
 
   useEffect(() => {
     if (!open) return;
@@ -29,29 +42,31 @@ export function GlobalSearchModal({
     setTimeout(() => (document.getElementById("gs-input") as HTMLInputElement | null)?.focus(), 20);
   }, [open]);
 
-  const hits = useMemo(() => {
-    const qq = q.trim().toLowerCase();
-    if (!qq) return [];
-    const out: { kind: string; label: string; sub: string; go: () => void }[] = [];
-
-    for (const x of tasks) {
-      const hay = (x.title + " " + (x.tags ?? "") + " " + x.assignee).toLowerCase();
-      if (hay.includes(qq)) out.push({ kind: "Task", label: x.title, sub: `${x.status} · ${x.assignee} · ${x.due_date ?? "—"}`, go: () => onNavigate("Tasks") });
-    }
-    for (const x of files) {
-      const hay = (x.filename + " " + (x.mime_type ?? "") + " " + x.uploader).toLowerCase();
-      if (hay.includes(qq)) out.push({ kind: "File", label: x.filename, sub: `${x.mime_type ?? "—"} · ${x.uploader}`, go: () => onNavigate("Files") });
-    }
-    for (const x of checklist) {
-      const hay = (x.stage + " " + x.label).toLowerCase();
-      if (hay.includes(qq)) out.push({ kind: "Checklist", label: x.label, sub: `${x.stage} · ${x.is_done ? "Done" : "Open"}`, go: () => onNavigate("Tasks") });
-    }
-    for (const x of timeline) {
-      const hay = x.label.toLowerCase();
-      if (hay.includes(qq)) out.push({ kind: "Timeline", label: x.label, sub: `${formatDate(x.start_date)} - ${formatDate(x.end_date)}`, go: () => onNavigate("Timeline") });
+  // Search every matter on the server; debounce keystrokes and drop stale responses
+  useEffect(() => {
+    const qq = q.trim();
+    if (!qq) {
+      setHits([]);
+      setNextOffset(null);
+      return;
     }
-    return out.slice(0, 24);
-  }, [q, tasks, files, checklist, timeline, onNavigate]);
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      api2.search(qq).then((res) => {
+        if (cancelled) return;
+        setHits(res.items);
+        setNextOffset(res.next_offset);
+      }).catch(console.error);
+    }, 120);
+    return () => { cancelled = true; clearTimeout(timer); };
+  }, [q]);
+
+  async function loadMore() {
+    if (nextOffset == null) return;
+    const res = await api2.search(q.trim(), nextOffset);
+    setHits((prev) => [...prev, ...res.items]);
+    setNextOffset(res.next_offset);
+  }
 
   if (!open) return null;
 
@@ -66,13 +81,18 @@ export function GlobalSearchModal({
           <input id="gs-input" className="search" style={{ width: "100%" }} value={q} onChange={(e) => setQ(e.target.value)} placeholder={t("searchPlaceholder")} />
         </div>
         <div style={{ marginTop: 12, display: "grid", gap: 8, maxHeight: "55vh", overflow: "auto" }}>
-          {hits.map((h, idx) => (
-            <button key={idx} className="chipRow" onClick={() => { h.go(); onClose(); }} title={h.sub}>
-              <span className="pill" style={{ width: 78, textAlign: "center" }}>{h.kind}</span>
-              <span className="chipText" style={{ fontSize: 13 }}>{h.label}</span>
-              <span className="small" style={{ marginLeft: "auto" }}>{h.sub}</span>
+          {hits.map((h, i) => (
+            <button key={`${h.kind}-${h.id}-${i}`} className="chipRow" onClick={() => { onNavigate(h.project_id, KIND_VIEW[h.kind]); onClose(); }} title={h.project_title}>
+              <span className="pill" style={{ width: 78, textAlign: "center" }}>{KIND_LABEL[h.kind]}</span>
+              <span style={{ display: "grid", textAlign: "left" }}>
+                {/* title/snippet are escaped server-side; only <mark> tags are added */}
+                <span className="chipText" style={{ fontSize: 13 }} dangerouslySetInnerHTML={{ __html: h.title }} />
+                {h.snippet ? <span className="small" dangerouslySetInnerHTML={{ __html: h.snippet }} /> : null}
+              </span>
+              <span className="small" style={{ marginLeft: "auto" }}>{h.project_title}</span>
             </button>
           ))}
+          {nextOffset != null ? <button className="btn" onClick={() => loadMore().catch(console.error)}>More</button> : null}
           {q.trim() && hits.length === 0 ? <div className="small">{t("noResults")}</div> : null}
           {!q.trim() ? <div className="small">{t("demoBody")}</div> : null}
         </div>
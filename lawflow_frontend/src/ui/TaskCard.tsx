@@ -19,7 +19,7 @@ function dueTone(due?: string | null) {
   return "ok";
 }
 
-export function TaskCard({ task }: { task: Task }) {
+export function TaskCard({ task, selected, onSelect }: { task: Task; selected?: boolean; onSelect?: () => void }) {
   const { attributes, listeners, setNodeRef, transform, isDragging } = useDraggable({ id: task.id });
   const style: React.CSSProperties = {
     transform: transform ? `translate3d(${transform.x}px, ${transform.y}px, 0)` : undefined,
@@ -29,7 +29,15 @@ export function TaskCard({ task }: { task: Task }) {
   const dueClass = dueTone(task.due_date);
 
   return (
-    <div ref={setNodeRef} className="task" style={style} {...listeners} {...attributes} title={task.description ?? ""}>
+    <div
+      ref={setNodeRef}
+      className={selected ? "task selected" : "task"}
+      style={style}
+      {...listeners}
+      {...attributes}
+      onClick={(e) => (e.ctrlKey || e.metaKey) && onSelect?.()}
+      title={task.description ?? ""}
+    >
       <div className="taskTop">
         <div className="taskTitle">{task.title}</div>
         {dot(task.priority)}